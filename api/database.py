@@ -2,9 +2,9 @@
 Database models and setup for scoring history
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Text
+from sqlalchemy import create_engine, inspect, Column, Integer, BigInteger, String, Float, DateTime, JSON, Text, ForeignKey, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import os
 
@@ -14,6 +14,11 @@ Base = declarative_base()
 class ScoringHistory(Base):
     """Model for storing scoring history"""
     __tablename__ = "scoring_history"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id); humanscore rides along so
+        # score-range filters are checked in the index, without row lookups
+        Index("ix_scoring_history_created_id", "created_at", "id", "humanscore"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     text_hash = Column(String, index=True)  # Hash of text for deduplication
@@ -23,10 +28,95 @@ class ScoringHistory(Base):
     full_metadata = Column(JSON)  # Store full metadata as JSON (renamed from 'metadata' - SQLAlchemy reserved)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Packed marker detail arrays, loaded only when asked for
+    detail_blob = relationship("ScoringDetailBlob", uselist=False, lazy="select", cascade="all, delete-orphan")
+    
+    # Near-duplicate index entries (MinHash signature and LSH buckets)
+    minhash = relationship("MinHashSignature", uselist=False, lazy="select", cascade="all, delete-orphan")
+    minhash_buckets = relationship("MinHashBucket", lazy="select", cascade="all, delete-orphan")
+    
     def __repr__(self):
         return f"<ScoringHistory(id={self.id}, humanscore={self.humanscore})>"
 
 
+class ScoringDetailBlob(Base):
+    """Model for the numeric marker detail arrays of a history record, packed as typed binary"""
+    __tablename__ = "scoring_detail_blobs"
+    
+    history_id = Column(Integer, ForeignKey("scoring_history.id"), primary_key=True)
+    data = Column(LargeBinary)  # api.utils.details blob
+    raw_bytes = Column(Integer)  # Size of the arrays as JSON
+    stored_bytes = Column(Integer)  # Size of data
+    
+    def __repr__(self):
+        return f"<ScoringDetailBlob(history_id={self.history_id}, stored_bytes={self.stored_bytes})>"
+
+
+class MinHashSignature(Base):
+    """Model for the MinHash signature of a history record's text"""
+    __tablename__ = "minhash_signatures"
+    
+    history_id = Column(Integer, ForeignKey("scoring_history.id"), primary_key=True)
+    signature = Column(LargeBinary)  # uint32 array (engine.dedup.minhash)
+    settings = Column(String(64))  # MinHasher settings key; other settings are not comparable
+    
+    def __repr__(self):
+        return f"<MinHashSignature(history_id={self.history_id})>"
+
+
+class MinHashBucket(Base):
+    """Model for one LSH bucket of a history record (one row per band)"""
+    __tablename__ = "minhash_buckets"
+    
+    id = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, index=True)  # Band number and band hash, see MinHasher.buckets
+    history_id = Column(Integer, ForeignKey("scoring_history.id"), index=True)
+    
+    def __repr__(self):
+        return f"<MinHashBucket(bucket={self.bucket}, history_id={self.history_id})>"
+
+
+class ScoringJob(Base):
+    """Model for a bulk scoring job"""
+    __tablename__ = "scoring_jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID4
+    status = Column(String(16), default="queued", index=True)  # queued, running, completed
+    total = Column(Integer, default=0)  # Number of items
+    options = Column(JSON)  # Request options, echoed in the job status
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<ScoringJob(id={self.id}, status={self.status})>"
+
+
+class ScoringJobItem(Base):
+    """Model for one text of a bulk scoring job (the unit of work of the job queue)"""
+    __tablename__ = "scoring_job_items"
+    __table_args__ = (
+        UniqueConstraint("job_id", "position", name="uq_job_item_position"),
+        Index("ix_job_items_claim", "status", "lease_expires_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), ForeignKey("scoring_jobs.id"), index=True)
+    position = Column(Integer)  # Index of the text in the job payload
+    text = Column(Text)
+    text_hash = Column(String, index=True)
+    status = Column(String(16), default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, default=0)
+    lease_owner = Column(String(64), nullable=True)  # Worker holding the item
+    lease_expires_at = Column(DateTime, nullable=True)
+    humanscore = Column(Float, nullable=True)
+    breakdown = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    
+    def __repr__(self):
+        return f"<ScoringJobItem(job_id={self.job_id}, position={self.position}, status={self.status})>"
+
+
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./traceneuro.db")
 
@@ -40,9 +130,33 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def schema_exists() -> bool:
+    """Whether every table and index of the models already exists (one reflection pass)"""
+    inspector = inspect(engine)
+    if not set(Base.metadata.tables) <= set(inspector.get_table_names()):
+        return False
+    existing = {
+        (table, index["name"])
+        for (_, table), indexes in inspector.get_multi_indexes().items()
+        for index in indexes
+    }
+    return all(
+        (table.name, index.name) in existing
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    )
+
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables (a no-op when the schema is already in place)"""
+    if schema_exists():
+        return
     Base.metadata.create_all(bind=engine)
+    
+    # create_all skips indexes of tables that already exist; add new ones
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def get_db():
@@ -2,10 +2,20 @@
 TraceNeuro API - Main FastAPI Application
 """
 
+import asyncio
+import os
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import scoring, history
+from fastapi.middleware.gzip import GZipMiddleware
+from api.routes import scoring, history, jobs, fingerprints, metrics
 from api.database import init_db
+from api.utils.executor import get_scoring_executor
+from api.utils.jobs import get_job_worker
+from api.utils.history_writer import get_history_writer
+from api.utils.logger import get_logger
+from engine.metrics import get_metrics
 
 app = FastAPI(
     title="TraceNeuro API",
@@ -13,10 +23,50 @@ app = FastAPI(
     version="0.1.0",
 )
 
-# Initialize database on startup
+# Warm-up attempts before giving up (0 = retry until it succeeds), and the
+# delay before the first retry (doubled after every failure, up to a minute)
+WARMUP_MAX_ATTEMPTS = int(os.getenv("WARMUP_MAX_ATTEMPTS", "0"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "1"))
+
+
+async def _warm_up():
+    """
+    Warm up the scoring engine and workers; the service is ready afterwards.
+    Failures are retried with backoff; the last one is reported by /health
+    and /ready (executor warmup) until an attempt succeeds.
+    """
+    executor = get_scoring_executor()
+    delay = WARMUP_RETRY_SECONDS
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await executor.warm_up()
+            return
+        except Exception as e:
+            print(f"Warning: Engine warm-up failed (attempt {attempt}): {e}")
+        if WARMUP_MAX_ATTEMPTS and attempt >= WARMUP_MAX_ATTEMPTS:
+            return
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60.0)
+
+
+# Initialize database and start scoring and job workers on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    get_metrics().remove_stale()
+    # Warm up in the background: /ready answers 503 until it is done
+    app.state.warmup_task = asyncio.create_task(_warm_up())
+    get_job_worker().start()
+
+# Stop job and scoring workers and flush buffered history and logs on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_job_worker().stop()
+    get_scoring_executor().shutdown()
+    get_history_writer().close()
+    get_logger().close()
 
 # CORS middleware
 app.add_middleware(
@@ -27,9 +77,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above a size threshold (full-detail scores can be large)
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024")))
+
 # Include routers
 app.include_router(scoring.router, prefix="/api/v1", tags=["scoring"])
 app.include_router(history.router, prefix="/api/v1", tags=["history"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(fingerprints.router, prefix="/api/v1", tags=["fingerprints"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 @app.get("/")
@@ -44,14 +100,42 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Detailed health check"""
+    """Detailed health check (ready: engine and workers warmed up; warmup: its outcome or last error)"""
+    executor = get_scoring_executor()
     return {
         "status": "healthy",
+        "ready": executor.ready,
+        "warmup": executor.warmup,
         "service": "TraceNeuro API",
         "version": "0.1.0",
         "endpoints": {
             "score": "/api/v1/score",
-            "health": "/health"
+            "score_batch": "/api/v1/score/batch",
+            "score_segments": "/api/v1/score/segments",
+            "cache_stats": "/api/v1/cache/stats",
+            "executor_stats": "/api/v1/executor/stats",
+            "logger_stats": "/api/v1/logger/stats",
+            "history_writer_stats": "/api/v1/history/writer/stats",
+            "jobs": "/api/v1/jobs",
+            "jobs_upload": "/api/v1/jobs/upload",
+            "job_status": "/api/v1/jobs/{job_id}",
+            "job_results": "/api/v1/jobs/{job_id}/results",
+            "metrics": "/metrics",
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the engine and scoring workers are warmed up"""
+    executor = get_scoring_executor()
+    if not executor.ready:
+        content = {"ready": False}
+        if executor.warmup is not None:
+            # Last failed warm-up attempt
+            content["warmup"] = executor.warmup
+        return JSONResponse(status_code=503, content=content)
+    return {"ready": True, "warmup": executor.warmup}
+
@@ -0,0 +1,122 @@
+"""
+Stylometric Fingerprint API Routes
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+from api.database import SessionLocal, ScoringHistory
+from api.utils.fingerprints import synced_fingerprint_index, get_fingerprint_index, history_fingerprint
+from engine.markers.stylometry.extractor import fingerprint_vector
+from engine.runtime import get_engine, get_processor
+
+router = APIRouter()
+
+
+class SimilarFingerprintRequest(BaseModel):
+    """Request model for fingerprint similarity search (give text or history_id)"""
+    text: Optional[str] = Field(default=None, min_length=10, description="Text whose author style to match")
+    history_id: Optional[int] = Field(default=None, description="History record whose author style to match")
+    k: int = Field(default=10, ge=1, le=100, description="Number of similar documents")
+
+
+class SimilarFingerprint(BaseModel):
+    """One similar historical document"""
+    history_id: int
+    similarity: float = Field(..., description="Cosine similarity of standardized fingerprints (-1 to 1)")
+    humanscore: Optional[float] = None
+    text_preview: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class SimilarFingerprintResponse(BaseModel):
+    """Response model for fingerprint similarity search"""
+    results: List[SimilarFingerprint]
+    count: int
+    method: str = Field(..., description="brute or ivf")
+    scored: int = Field(..., description="Fingerprints compared")
+
+
+def _text_fingerprint(text: str) -> Dict[str, Any]:
+    """Stylometric fingerprint of a text (stylometry only, not the full engine)"""
+    processed = get_processor().process(text)
+    return get_engine().stylometric_extractor.extract_batch([processed])[0]["fingerprint"]
+
+
+def _history_fingerprint(history_id: int) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        record = db.query(ScoringHistory.full_metadata).filter(ScoringHistory.id == history_id).first()
+        if record is None:
+            raise HTTPException(status_code=404, detail="Record not found")
+        return history_fingerprint(record.full_metadata)
+    finally:
+        db.close()
+
+
+def _search(request: SimilarFingerprintRequest) -> Dict[str, Any]:
+    """Sync the index, search it and attach history columns to the hits"""
+    if request.history_id is not None:
+        fingerprint = _history_fingerprint(request.history_id)
+        if fingerprint is None:
+            raise HTTPException(status_code=404, detail="Record has no stylometric fingerprint")
+        exclude = [request.history_id]
+    else:
+        fingerprint = _text_fingerprint(request.text)
+        exclude = []
+
+    index = synced_fingerprint_index()
+    found = index.search(fingerprint_vector(fingerprint), request.k, exclude_ids=exclude)
+
+    db = SessionLocal()
+    try:
+        records = {
+            record.id: record for record in db.query(
+                ScoringHistory.id,
+                ScoringHistory.humanscore,
+                ScoringHistory.text_preview,
+                ScoringHistory.created_at
+            ).filter(ScoringHistory.id.in_(found["ids"]))
+        }
+    finally:
+        db.close()
+
+    results = []
+    for history_id, similarity in zip(found["ids"], found["similarities"]):
+        record = records.get(history_id)
+        results.append({
+            "history_id": history_id,
+            "similarity": similarity,
+            "humanscore": record.humanscore if record else None,
+            "text_preview": record.text_preview if record else None,
+            "created_at": record.created_at if record else None,
+        })
+    return {"results": results, "count": len(results), "method": found["method"], "scored": found["scored"]}
+
+
+@router.post("/fingerprints/similar", response_model=SimilarFingerprintResponse)
+async def similar_fingerprints(request: SimilarFingerprintRequest):
+    """
+    Find historical documents whose stylometric fingerprint is closest.
+
+    Matches a text (or an earlier submission) against the writing style of
+    every scored document, e.g. to check it against an author's previous
+    work. The fingerprint index picks up new history rows before searching.
+    """
+    if (request.text is None) == (request.history_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of text or history_id")
+    try:
+        return await run_in_threadpool(_search, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fingerprint search failed: {e}")
+
+
+@router.get("/fingerprints/stats")
+async def fingerprint_stats():
+    """Size and search mode of the fingerprint index"""
+    return get_fingerprint_index().stats()
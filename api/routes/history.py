@@ -2,13 +2,21 @@
 Scoring History API Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
-import hashlib
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
 
-from api.database import get_db, ScoringHistory
+from api.database import get_db, ScoringHistory, ScoringDetailBlob, SessionLocal
+from api.utils.details import pack_metadata, unpack_metadata
+from api.utils.migrate_details import detail_storage_stats
+from engine.humanscore.scorer import DETAIL_LEVELS, trim_result
+from api.utils.hashing import hash_text
+from api.utils.history_writer import get_history_writer
+from api.utils.near_duplicates import Fingerprint, get_near_duplicate_index
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -23,28 +31,105 @@ class HistoryResponse(BaseModel):
     created_at: datetime
 
 
+# Columns returned by the history endpoints (never the full metadata JSON)
+HISTORY_COLUMNS = (
+    ScoringHistory.id,
+    ScoringHistory.text_preview,
+    ScoringHistory.humanscore,
+    ScoringHistory.breakdown,
+    ScoringHistory.created_at,
+)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Convert a timezone-aware datetime to naive UTC, as stored in created_at"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """Opaque pagination cursor for the position after a record"""
+    raw = f"{created_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor from encode_cursor
+    
+    Raises:
+        ValueError: Malformed cursor
+    """
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    created_at, record_id = raw.split("|")
+    return datetime.fromisoformat(created_at), int(record_id)
+
+
 @router.get("/history", response_model=List[HistoryResponse])
 async def get_scoring_history(
-    limit: int = 50,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get scoring history
+    Get scoring history, newest first
+    
+    Pages are fetched by keyset on (created_at, id): pass the X-Next-Cursor
+    header of one page as cursor to get the next, which costs the same at
+    any depth. Filters and ordering use the (created_at, id, humanscore)
+    index, and only the returned columns are read.
     
     Args:
         limit: Maximum number of records to return
-        offset: Number of records to skip
+        offset: Number of records to skip (slow on deep pages; prefer cursor)
+        cursor: Position to continue from (X-Next-Cursor of the previous page)
+        min_score: Only records with humanscore >= min_score
+        max_score: Only records with humanscore <= max_score
+        since: Only records created at or after this time
+        until: Only records created before this time
         
     Returns:
         List of scoring history records
     """
-    records = db.query(ScoringHistory)\
-        .order_by(ScoringHistory.created_at.desc())\
-        .offset(offset)\
+    query = db.query(*HISTORY_COLUMNS)
+    
+    if since is not None:
+        query = query.filter(ScoringHistory.created_at >= _naive_utc(since))
+    if until is not None:
+        query = query.filter(ScoringHistory.created_at < _naive_utc(until))
+    if min_score is not None:
+        query = query.filter(ScoringHistory.humanscore >= min_score)
+    if max_score is not None:
+        query = query.filter(ScoringHistory.humanscore <= max_score)
+    
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Range condition on the leading column first, so it bounds the index scan
+        query = query.filter(
+            ScoringHistory.created_at <= last_created_at,
+            or_(ScoringHistory.created_at < last_created_at, ScoringHistory.id < last_id)
+        )
+    elif offset:
+        query = query.offset(offset)
+    
+    records = query\
+        .order_by(ScoringHistory.created_at.desc(), ScoringHistory.id.desc())\
         .limit(limit)\
         .all()
     
+    if len(records) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(records[-1].created_at, records[-1].id)
+    
     return [
         HistoryResponse(
             id=r.id,
@@ -57,6 +142,22 @@ async def get_scoring_history(
     ]
 
 
+@router.get("/history/writer/stats")
+async def history_writer_stats():
+    """
+    Write-behind history buffer sizing, flush sizes and flush latency
+    """
+    return get_history_writer().stats()
+
+
+@router.get("/history/details/stats")
+async def history_detail_stats(db: Session = Depends(get_db)):
+    """
+    Storage saved by packing marker detail arrays into binary blobs
+    """
+    return detail_storage_stats(db)
+
+
 @router.get("/history/{record_id}", response_model=HistoryResponse)
 async def get_scoring_record(
     record_id: int,
@@ -71,7 +172,7 @@ async def get_scoring_record(
     Returns:
         Scoring history record
     """
-    record = db.query(ScoringHistory).filter(ScoringHistory.id == record_id).first()
+    record = db.query(*HISTORY_COLUMNS).filter(ScoringHistory.id == record_id).first()
     
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
@@ -85,12 +186,118 @@ async def get_scoring_record(
     )
 
 
+class HistoryDetailResponse(BaseModel):
+    """Response model for the marker details of a history record"""
+    id: int
+    marker_details: Dict[str, Any]
+    storage: Dict[str, Any]
+
+
+@router.get("/history/{record_id}/details", response_model=HistoryDetailResponse)
+async def get_scoring_record_details(
+    record_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the full marker details of a scoring record
+    
+    Detail arrays (drift vectors, per-sentence counts) are stored packed in
+    a separate blob and only loaded here; float arrays come back with the
+    stored precision (float32 by default).
+    
+    Args:
+        record_id: ID of the record
+        
+    Returns:
+        Marker details and their storage footprint
+    """
+    record = db.query(ScoringHistory.id, ScoringHistory.full_metadata)\
+        .filter(ScoringHistory.id == record_id)\
+        .first()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    
+    blob = db.query(ScoringDetailBlob).filter(ScoringDetailBlob.history_id == record_id).first()
+    metadata = unpack_metadata(record.full_metadata or {}, blob.data if blob else None)
+    
+    return HistoryDetailResponse(
+        id=record.id,
+        marker_details=metadata.get("marker_details", {}),
+        storage={
+            "packed": blob is not None,
+            "raw_bytes": blob.raw_bytes if blob else None,
+            "stored_bytes": blob.stored_bytes if blob else None
+        }
+    )
+
+
+def history_row(
+    text: str,
+    humanscore: float,
+    breakdown: dict,
+    metadata: dict,
+    text_hash: Optional[str] = None,
+    fingerprint: Optional[Fingerprint] = None
+) -> Dict[str, Any]:
+    """
+    Column values of a scoring history record
+    
+    Args:
+        text: Original text
+        humanscore: Calculated HumanScore
+        breakdown: Marker breakdown
+        metadata: Full metadata
+        text_hash: Precomputed SHA-256 of text (computed if omitted)
+        fingerprint: Precomputed near-duplicate fingerprint (computed if omitted)
+        
+    Returns:
+        Dictionary of ScoringHistory column values (and its detail blob
+        and near-duplicate index entries)
+    """
+    # Numeric detail arrays go to a separate compact blob
+    metadata, blob, json_bytes = pack_metadata(metadata)
+    
+    # Create text hash for deduplication
+    row = {
+        "text_hash": text_hash or hash_text(text),
+        "text_preview": text[:500],
+        "humanscore": humanscore,
+        "breakdown": breakdown,
+        "full_metadata": metadata
+    }
+    if blob is not None:
+        row["detail_blob"] = ScoringDetailBlob(data=blob, raw_bytes=json_bytes, stored_bytes=len(blob))
+    
+    near_duplicates = get_near_duplicate_index()
+    row.update(near_duplicates.index_rows(fingerprint or near_duplicates.fingerprint(text)))
+    return row
+
+
+def result_history_row(item: Tuple[str, Dict[str, Any], str, Optional[Fingerprint]]) -> Dict[str, Any]:
+    """
+    Column values of the history record of a scoring result
+
+    Row builder for HistoryWriter.submit, so packing the result details
+    runs in the writer thread.
+
+    Args:
+        item: (text, result, text_hash, fingerprint) of a scored text
+
+    Returns:
+        Dictionary of ScoringHistory column values (see history_row)
+    """
+    text, result, text_hash, fingerprint = item
+    return history_row(text, result["humanscore"], result["breakdown"], result["metadata"], text_hash, fingerprint)
+
+
 def save_scoring_history(
     text: str,
     humanscore: float,
     breakdown: dict,
     metadata: dict,
-    db: Session
+    db: Session,
+    text_hash: Optional[str] = None
 ) -> ScoringHistory:
     """
     Save scoring result to history
@@ -101,30 +308,160 @@ def save_scoring_history(
         breakdown: Marker breakdown
         metadata: Full metadata
         db: Database session
+        text_hash: Precomputed SHA-256 of text (computed if omitted)
         
     Returns:
         Created ScoringHistory record
     """
-    # Create text hash for deduplication
-    text_hash = hashlib.sha256(text.encode()).hexdigest()
-    text_preview = text[:500] if len(text) > 500 else text
-    
     # Check if record already exists (optional - can allow duplicates)
     # existing = db.query(ScoringHistory).filter(ScoringHistory.text_hash == text_hash).first()
     # if existing:
     #     return existing
     
     # Create new record
-    record = ScoringHistory(
-        text_hash=text_hash,
-        text_preview=text_preview,
-        humanscore=humanscore,
-        breakdown=breakdown,
-        full_metadata=metadata
-    )
+    record = ScoringHistory(**history_row(text, humanscore, breakdown, metadata, text_hash))
     
     db.add(record)
     db.commit()
     db.refresh(record)
     
     return record
+
+
+def save_scoring_history_batch(
+    items: List[Dict[str, Any]],
+    db: Session
+) -> List[ScoringHistory]:
+    """
+    Save several scoring results to history in a single commit
+    
+    Args:
+        items: Dictionaries with text, humanscore, breakdown, metadata
+            and optionally a precomputed text_hash
+        db: Database session
+        
+    Returns:
+        Created ScoringHistory records, in input order
+    """
+    records = [
+        ScoringHistory(**history_row(
+            item["text"], item["humanscore"], item["breakdown"], item["metadata"], item.get("text_hash")
+        ))
+        for item in items
+    ]
+    
+    db.add_all(records)
+    db.commit()
+    
+    return records
+
+
+def lookup_cached_result(text_hash: str, config_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a previous result for the same text and engine config
+    
+    Used as the persistent tier of the result cache. Rows are matched on
+    the indexed text_hash column, then filtered on the engine config key
+    stored in their metadata.
+    
+    Args:
+        text_hash: SHA-256 of the input text
+        config_key: Engine config key (version + weights), optionally with
+            a ":<detail level>" suffix for results below full detail
+        
+    Returns:
+        Result dictionary with humanscore, breakdown and metadata, or None
+    """
+    db = SessionLocal()
+    try:
+        records = db.query(ScoringHistory)\
+            .filter(ScoringHistory.text_hash == text_hash)\
+            .order_by(ScoringHistory.id.desc())\
+            .limit(5)\
+            .all()
+        
+        for record in records:
+            result = _record_result(record, config_key)
+            if result is not None:
+                return result
+        return None
+    finally:
+        db.close()
+
+
+# Text hashes per IN (...) query (sqlite allows 999 bound parameters)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def lookup_cached_results(text_hashes: List[str], config_key: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Find previous results for many texts with one query per chunk of hashes
+
+    Bulk variant of lookup_cached_result, used by the result cache for
+    batch lookups.
+
+    Args:
+        text_hashes: SHA-256 hashes of the input texts
+        config_key: Engine config key, with optional ":<detail level>" suffix
+
+    Returns:
+        Result dictionaries by text hash (hashes without a result are left out)
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    unique = list(dict.fromkeys(text_hashes))
+    db = SessionLocal()
+    try:
+        for start in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+            records = db.query(ScoringHistory)\
+                .filter(ScoringHistory.text_hash.in_(unique[start:start + LOOKUP_CHUNK_SIZE]))\
+                .order_by(ScoringHistory.id.desc())\
+                .all()
+
+            # Newest matching record of each text
+            for record in records:
+                if record.text_hash in results:
+                    continue
+                result = _record_result(record, config_key)
+                if result is not None:
+                    results[record.text_hash] = result
+        return results
+    finally:
+        db.close()
+
+
+def lookup_result_by_id(history_id: int, config_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Result of a history record, if it was computed with the given engine config
+    
+    Args:
+        history_id: History record ID
+        config_key: Engine config key, with optional ":<detail level>" suffix
+        
+    Returns:
+        Result dictionary with humanscore, breakdown and metadata, or None
+    """
+    db = SessionLocal()
+    try:
+        record = db.get(ScoringHistory, history_id)
+        return _record_result(record, config_key) if record is not None else None
+    finally:
+        db.close()
+
+
+def _record_result(record: ScoringHistory, config_key: str) -> Optional[Dict[str, Any]]:
+    """Result stored in a history record, or None if its config or detail level does not match"""
+    config_key, _, detail = config_key.partition(":")
+    detail = detail or "full"
+    metadata = record.full_metadata or {}
+    if metadata.get("engine", {}).get("config_key") != config_key:
+        return None
+    # Rows saved at a lower detail level cannot serve more detailed requests
+    level = metadata.get("detail", "full")
+    if DETAIL_LEVELS.index(level) < DETAIL_LEVELS.index(detail):
+        return None
+    blob = record.detail_blob.data if level == "full" and record.detail_blob is not None else None
+    return trim_result({
+        "humanscore": record.humanscore,
+        "breakdown": record.breakdown,
+        "metadata": unpack_metadata(metadata, blob)
+    }, detail)
@@ -0,0 +1,248 @@
+"""
+Bulk Scoring Job API Routes
+"""
+
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Annotated
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from api.database import get_db, ScoringJob
+from api.utils.jobs import enqueue_job, job_progress, job_results, get_job_worker, job_scoring_options
+
+router = APIRouter()
+
+# Upper bound on texts accepted by a single job
+MAX_JOB_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "100000"))
+
+# Upper bound on the size of an uploaded JSONL file
+MAX_JOB_UPLOAD_BYTES = int(os.getenv("JOB_MAX_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+
+# Shortest text accepted for scoring, as in ScoreRequest
+MIN_TEXT_LENGTH = 10
+
+
+class JobRequest(BaseModel):
+    """Request model for a bulk scoring job"""
+    texts: List[Annotated[str, Field(min_length=MIN_TEXT_LENGTH)]] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_JOB_ITEMS,
+        description="Texts to analyze"
+    )
+    options: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Optional scoring parameters, applied to every text (detail, markers, max_cost as for /score)"
+    )
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for job status"""
+    job_id: str
+    status: str = Field(..., description="queued, running or completed")
+    total: int = Field(..., description="Number of texts in the job")
+    counts: Dict[str, int] = Field(..., description="Items per state (queued, running, done, failed)")
+    progress: float = Field(..., ge=0.0, le=1.0, description="Fraction of items finished")
+    options: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class JobItemResult(BaseModel):
+    """Outcome of one text of a job"""
+    position: int = Field(..., description="Index of the text in the job payload")
+    text_hash: str
+    status: str = Field(..., description="queued, running, done or failed")
+    humanscore: Optional[float] = None
+    breakdown: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+
+
+class JobResultsResponse(BaseModel):
+    """Response model for a page of job results"""
+    job_id: str
+    results: List[JobItemResult]
+    next_after: Optional[int] = Field(
+        None,
+        description="Pass as `after` to fetch the next page (null on the last page)"
+    )
+
+
+def _get_job(job_id: str, db: Session) -> ScoringJob:
+    """Load a job or raise 404"""
+    job = db.query(ScoringJob).filter(ScoringJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _parse_jsonl(content: bytes) -> List[str]:
+    """
+    Read texts from JSONL: one {"text": ...} object or JSON string per line
+
+    Raises:
+        HTTPException: 422 naming the first invalid line
+    """
+    texts = []
+    for line_number, line in enumerate(content.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=422, detail=f"Line {line_number}: invalid JSON ({e})")
+        text = record.get("text") if isinstance(record, dict) else record
+        if not isinstance(text, str) or len(text) < MIN_TEXT_LENGTH:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Line {line_number}: expected a text of at least {MIN_TEXT_LENGTH} characters"
+            )
+        texts.append(text)
+
+    if not texts:
+        raise HTTPException(status_code=422, detail="File contains no texts")
+    if len(texts) > MAX_JOB_ITEMS:
+        raise HTTPException(status_code=422, detail=f"File contains more than {MAX_JOB_ITEMS} texts")
+    return texts
+
+
+async def _create_job(texts: List[str], options: Optional[Dict[str, Any]], db: Session) -> JobStatusResponse:
+    """Persist a job and report its initial status"""
+    try:
+        job_scoring_options(options)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid job options: {e}")
+    try:
+        job = await run_in_threadpool(enqueue_job, texts, options, db)
+        return JobStatusResponse(**job_progress(job, db))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job creation failed: {e}")
+
+
+def _parse_options(options: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read job options given as a JSON object in a form field
+
+    Raises:
+        HTTPException: 422 for invalid JSON or a value other than an object
+    """
+    if options is None or not options.strip():
+        return None
+    try:
+        parsed = json.loads(options)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid job options: invalid JSON ({e})")
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=422, detail="Invalid job options: expected a JSON object")
+    return parsed
+
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def create_job(
+    request: JobRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue many texts for background scoring.
+
+    Returns immediately with the job id; poll GET /jobs/{job_id} for
+    progress and page through GET /jobs/{job_id}/results. Queued work is
+    stored in the database, so it survives restarts. options.detail,
+    options.markers and options.max_cost apply to every text as for /score.
+    """
+    return await _create_job(request.texts, request.options, db)
+
+
+@router.post("/jobs/upload", response_model=JobStatusResponse, status_code=202)
+async def create_job_from_file(
+    file: UploadFile = File(..., description="JSONL file, one {\"text\": ...} per line"),
+    options: Optional[str] = Form(
+        None,
+        description="Optional scoring parameters as a JSON object (detail, markers, max_cost as for POST /jobs)"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue the texts of an uploaded JSONL file for background scoring.
+
+    Each line holds a {"text": ...} object (other keys are ignored) or a
+    JSON string; files above JOB_MAX_UPLOAD_BYTES are rejected with 413.
+    Behaves like POST /jobs otherwise, with the options form field in
+    place of the request options.
+    """
+    job_options = _parse_options(options)
+    content = await file.read(MAX_JOB_UPLOAD_BYTES + 1)
+    if len(content) > MAX_JOB_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File is larger than {MAX_JOB_UPLOAD_BYTES} bytes")
+    texts = await run_in_threadpool(_parse_jsonl, content)
+    return await _create_job(texts, job_options, db)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status and progress of a job
+
+    Args:
+        job_id: ID returned when the job was created
+
+    Returns:
+        Job status with per-state item counts
+    """
+    return JobStatusResponse(**job_progress(_get_job(job_id, db), db))
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(
+    job_id: str,
+    after: int = -1,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a page of job results, in input order
+
+    Args:
+        job_id: ID returned when the job was created
+        after: Return items after this position (next_after of the previous page)
+        limit: Maximum number of items to return (1-1000)
+
+    Returns:
+        Page of per-text results
+    """
+    _get_job(job_id, db)
+    limit = max(1, min(limit, 1000))
+    items = job_results(job_id, after, limit, db)
+
+    return JobResultsResponse(
+        job_id=job_id,
+        results=[
+            JobItemResult(
+                position=item.position,
+                text_hash=item.text_hash,
+                status=item.status,
+                humanscore=item.humanscore,
+                breakdown=item.breakdown,
+                error=item.error
+            )
+            for item in items
+        ],
+        next_after=items[-1].position if len(items) == limit else None
+    )
+
+
+@router.get("/jobs/worker/stats")
+async def job_worker_stats():
+    """
+    Job worker settings and counters of this process
+    """
+    return get_job_worker().stats()
@@ -0,0 +1,56 @@
+"""
+Metrics API Routes
+"""
+
+from typing import List, Tuple
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from api.utils.cache import get_result_cache
+from api.utils.executor import get_scoring_executor
+from api.utils.history_writer import get_history_writer
+from api.utils.jobs import get_job_worker
+from api.utils.logger import get_logger
+from engine.metrics import get_metrics
+
+router = APIRouter()
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _gauges() -> List[Tuple[str, str, float]]:
+    """
+    Point-in-time cache and queue gauges of this API process (counters,
+    e.g. rejected tasks and dropped log entries, are recorded in the
+    cross-process metrics)
+    """
+    cache = get_result_cache().stats()
+    executor = get_scoring_executor().stats()
+    writer = get_history_writer().stats()
+    logger = get_logger().stats()
+    jobs = get_job_worker().stats()
+    return [
+        ("traceneuro_result_cache_entries", "Results held in the in-memory result cache", cache["size"]),
+        ("traceneuro_result_cache_hit_ratio", "Result cache hits per lookup", cache["hit_rate"]),
+        ("traceneuro_executor_pending", "Scoring tasks queued or running in the worker pool", executor["pending"]),
+        ("traceneuro_history_pending_rows", "History rows waiting to be written", writer["pending"]),
+        ("traceneuro_log_queue_depth", "Log entries waiting to be written", logger["queue_depth"]),
+        ("traceneuro_jobs_running", "Bulk job tasks running in this process", jobs["running"]),
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Pipeline metrics in the Prometheus text format.
+
+    Stage latency and input-size histograms, stage error counts and the
+    rejected-task and dropped-log counters are summed over the API process
+    and its scoring workers; cache and queue
+    gauges describe the process serving the request.
+    """
+    text = await run_in_threadpool(get_metrics().render, _gauges())
+    return PlainTextResponse(text, media_type=PROMETHEUS_CONTENT_TYPE)
@@ -2,22 +2,39 @@
 Scoring API Routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
-from engine.preprocessing.text_processor import TextProcessor
-from engine.humanscore.scorer import HumanScoreEngine
-from api.database import get_db
-from api.routes.history import save_scoring_history
+from typing import Optional, Dict, Any, List, Annotated, Literal, Tuple
+from api.routes.history import result_history_row, lookup_result_by_id
 from api.utils.logger import get_logger
+from api.utils.cache import get_result_cache
+from api.utils.hashing import hash_text
+from api.utils.responses import fast_json
+from api.utils.history_writer import get_history_writer
+from api.utils.near_duplicates import get_near_duplicate_index
+from api.utils.executor import get_scoring_executor, score_text_segments, ExecutorBusyError
+from api.utils.profiling import is_admin, profiling_requested, profile_text
+from engine.humanscore.registry import COST_CLASSES
+from engine.runtime import get_engine
 
 router = APIRouter()
 
+# Upper bound on texts accepted by a single batch request
+MAX_BATCH_SIZE = 1000
+
+
+# Result detail levels (see engine DETAIL_LEVELS)
+DetailLevel = Literal["summary", "markers", "full"]
+
 
 class ScoreRequest(BaseModel):
     """Request model for text scoring"""
     text: str = Field(..., min_length=10, description="Text to analyze")
+    detail: DetailLevel = Field(
+        default="full",
+        description="summary: score and breakdown; markers: plus marker metrics; full: plus per-sentence arrays"
+    )
     options: Optional[Dict[str, Any]] = Field(
         default=None,
         description="Optional scoring parameters"
@@ -31,39 +48,157 @@ class ScoreResponse(BaseModel):
     metadata: Dict[str, Any] = Field(..., description="Additional metadata")
 
 
+class BatchScoreRequest(BaseModel):
+    """Request model for scoring many texts at once"""
+    texts: List[Annotated[str, Field(min_length=10)]] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Texts to analyze"
+    )
+    detail: DetailLevel = Field(default="full", description="Result detail level, applied to every text")
+    options: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Optional scoring parameters, applied to every text"
+    )
+
+
+class BatchScoreResponse(BaseModel):
+    """Response model for batch scoring"""
+    results: List[ScoreResponse] = Field(..., description="Per-text results, in input order")
+    count: int = Field(..., description="Number of texts scored")
+
+
+class SegmentScoreRequest(BaseModel):
+    """Request model for sliding-window segment scoring"""
+    text: str = Field(..., min_length=10, description="Text to analyze")
+    window: int = Field(default=10, ge=2, le=500, description="Sentences per window")
+    stride: int = Field(default=5, ge=1, le=500, description="Sentences between window starts")
+    options: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Optional scoring parameters"
+    )
+
+
+class SpanScore(BaseModel):
+    """HumanScore of a span of sentences [start, end)"""
+    start: int = Field(..., description="Index of the first sentence")
+    end: int = Field(..., description="Index after the last sentence")
+    humanscore: float = Field(..., ge=0.0, le=1.0, description="HumanScore (0-1)")
+    breakdown: Dict[str, float] = Field(..., description="Per-marker breakdown")
+
+
+class SegmentScoreResponse(BaseModel):
+    """Response model for sliding-window segment scoring"""
+    window: int = Field(..., description="Sentences per window")
+    stride: int = Field(..., description="Sentences between window starts")
+    sentence_count: int = Field(..., description="Number of sentences in the text")
+    windows: List[SpanScore] = Field(..., description="Per-window scores, in document order")
+    change_points: List[int] = Field(..., description="Sentence indices where a new segment starts")
+    segments: List[SpanScore] = Field(..., description="Scores of the segments between change points")
+    engine: Dict[str, Any] = Field(..., description="Engine version and config key")
+
+
+def _cache_key(config_key: str, detail: str) -> str:
+    """Result cache key of a detail level (full results keep the plain config key)"""
+    return config_key if detail == "full" else f"{config_key}:{detail}"
+
+
+def marker_selection(options: Optional[Dict[str, Any]]) -> Optional[Tuple[str, ...]]:
+    """
+    Markers selected by options.markers (marker names) and options.max_cost
+    (cost class; cheaper markers only)
+    
+    Returns:
+        Selected marker names, or None when the options select none (all markers run)
+        
+    Raises:
+        HTTPException: 422 for unknown markers or cost classes
+    """
+    options = options or {}
+    markers, max_cost = options.get("markers"), options.get("max_cost")
+    if markers is None and max_cost is None:
+        return None
+    if markers is not None and (not isinstance(markers, list) or not all(isinstance(m, str) for m in markers)):
+        raise HTTPException(status_code=422, detail="options.markers must be a list of marker names")
+    try:
+        return get_engine().select_markers(markers, max_cost)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid marker selection: {e}")
+
+
 @router.post("/score", response_model=ScoreResponse)
 async def score_text(
     request: ScoreRequest,
-    db: Session = Depends(get_db)
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None)
 ):
     """
     Analyze text and return HumanScore™ with cognitive marker breakdown.
     
     Returns a score between 0 (AI-generated) and 1 (human-written),
-    along with detailed breakdown of cognitive markers.
+    along with detailed breakdown of cognitive markers. The detail level
+    decides how much of the marker details is computed and returned.
+    Repeated texts are served from the result cache (see X-Cache header);
+    metadata.near_duplicates lists similar earlier submissions, whose
+    result may be reused above NEAR_DUP_REUSE_THRESHOLD.
+    Scoring runs in the worker pool while history rows and log entries are
+    written behind in bulk, so the event loop stays free.
+    Admins (X-Admin-Token matching ADMIN_TOKEN) can set options.profile or
+    the X-Profile header: the text is then scored in the API process under
+    the profiler, bypassing the caches, and metadata.profile holds the
+    stage-by-stage cost breakdown.
+    options.markers (marker names) or options.max_cost (cost class) run
+    only some markers, e.g. {"markers": ["cadence"]} for a cheap screening
+    pass; the humanscore is then renormalized over their weights (see
+    /markers).
     """
+    profile = profiling_requested(request.options, x_profile)
+    if profile and not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires an admin token")
+    markers = marker_selection(request.options)
+    
     logger = get_logger()
+    cache = get_result_cache()
+    text_hash = hash_text(request.text)
     error = None
     
     try:
-        # Preprocess text
-        processor = TextProcessor()
-        processed = processor.process(request.text)
+        executor = get_scoring_executor()
+        cache_key = _cache_key(executor.config_key_for(markers), request.detail)
         
-        # Calculate HumanScore
-        scorer = HumanScoreEngine()
-        result = scorer.score(processed)
+        # Find similar earlier submissions (MinHash LSH lookup)
+        near_duplicates = get_near_duplicate_index()
+        fingerprint = await run_in_threadpool(near_duplicates.fingerprint, request.text)
+        matches = await run_in_threadpool(near_duplicates.query, fingerprint, text_hash)
         
-        # Save to history
-        save_scoring_history(
-            text=request.text,
-            humanscore=result["humanscore"],
-            breakdown=result["breakdown"],
-            metadata=result["metadata"],
-            db=db
+        result, cache_source = None, "profiled"
+        if not profile:
+            # The persistent tier queries the database; keep it off the event loop
+            result, cache_source = await run_in_threadpool(cache.get, text_hash, cache_key)
+        reusable = near_duplicates.reusable_match(matches) if result is None and not profile else None
+        if reusable is not None:
+            result = await run_in_threadpool(lookup_result_by_id, reusable["history_id"], cache_key)
+            if result is not None:
+                result = {**result, "metadata": {**result["metadata"], "reused_from": reusable["history_id"]}}
+                cache_source = "near-duplicate"
+                cache.put(text_hash, cache_key, result)
+        report = None
+        if result is None and profile:
+            # Profiled runs stay in this process, where the profiler can see them
+            result, report = await run_in_threadpool(profile_text, request.text, request.detail, markers)
+            cache.put(text_hash, cache_key, result)
+        elif result is None:
+            # Preprocess text and calculate HumanScore (off the event loop)
+            result = (await executor.score_texts([request.text], request.detail, markers))[0]
+            cache.put(text_hash, cache_key, result)
+        
+        # Save to history (buffered, built and written in bulk by the writer thread)
+        await get_history_writer().submit_async(
+            [(request.text, result, text_hash, fingerprint)], build=result_history_row
         )
         
-        # Log to JSONL file
+        # Log to JSONL file (queued, written by the logger thread)
         logger.log_scoring_request(
             text=request.text,
             result={
@@ -71,14 +206,146 @@ async def score_text(
                 "breakdown": result["breakdown"],
                 "metadata": result["metadata"]
             },
-            request_options=request.options
+            request_options=request.options,
+            text_hash=text_hash
         )
         
-        return ScoreResponse(
-            humanscore=result["humanscore"],
-            breakdown=result["breakdown"],
-            metadata=result["metadata"]
+        metadata = result["metadata"]
+        if fingerprint is not None:
+            metadata = {**metadata, "near_duplicates": matches}
+        if report is not None:
+            metadata = {**metadata, "profile": report}
+        
+        # Engine output already has the ScoreResponse shape; serialize it directly
+        return fast_json({
+            "humanscore": result["humanscore"],
+            "breakdown": result["breakdown"],
+            "metadata": metadata
+        }, headers={"X-Cache": cache_source})
+    
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=f"Scoring unavailable: {e}", headers={"Retry-After": "1"})
+    
+    except Exception as e:
+        error = str(e)
+        # Log error to JSONL
+        logger.log_scoring_request(
+            text=request.text,
+            result={},
+            request_options=request.options,
+            error=error,
+            text_hash=text_hash
         )
+        raise HTTPException(status_code=500, detail=f"Scoring failed: {error}")
+
+
+@router.post("/score/batch", response_model=BatchScoreResponse)
+async def score_batch(request: BatchScoreRequest):
+    """
+    Analyze many texts in one request.
+    
+    Cached texts are served from the result cache; the remaining texts
+    are scored together by the engine. Results are saved to history in
+    bulk by the history writer and logged with a single file append. Each result has
+    the same shape as the /score response; options.markers and
+    options.max_cost select markers as for /score.
+    """
+    markers = marker_selection(request.options)
+    logger = get_logger()
+    cache = get_result_cache()
+    text_hashes = [hash_text(text) for text in request.texts]
+    
+    try:
+        executor = get_scoring_executor()
+        cache_key = _cache_key(executor.config_key_for(markers), request.detail)
+        
+        # One threadpool call resolves every hash (a single bulk query for the persistent tier)
+        results = [result for result, _ in await run_in_threadpool(cache.get_many, text_hashes, cache_key)]
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        if misses:
+            # Score the uncached texts in the worker pool, split across workers
+            scored = await executor.score_texts([request.texts[i] for i in misses], request.detail, markers)
+            for i, result in zip(misses, scored):
+                cache.put(text_hashes[i], cache_key, result)
+                results[i] = result
+        
+        # Save to history (buffered, written in bulk), indexed for near-duplicate lookups
+        fingerprints = await run_in_threadpool(get_near_duplicate_index().fingerprints, request.texts)
+        await get_history_writer().submit_async(
+            list(zip(request.texts, results, text_hashes, fingerprints)), build=result_history_row
+        )
+        
+        # Log to JSONL file (queued, written by the logger thread)
+        logger.log_scoring_batch(
+            texts=request.texts,
+            results=results,
+            request_options=request.options,
+            text_hashes=text_hashes
+        )
+        
+        # Engine output already has the BatchScoreResponse shape; serialize it directly
+        return fast_json({
+            "results": [
+                {
+                    "humanscore": result["humanscore"],
+                    "breakdown": result["breakdown"],
+                    "metadata": result["metadata"]
+                }
+                for result in results
+            ],
+            "count": len(results)
+        })
+    
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=f"Scoring unavailable: {e}", headers={"Retry-After": "1"})
+    
+    except Exception as e:
+        error = str(e)
+        # Log error to JSONL
+        logger.log_scoring_batch(
+            texts=request.texts,
+            results=[{}] * len(request.texts),
+            request_options=request.options,
+            error=error,
+            text_hashes=text_hashes
+        )
+        raise HTTPException(status_code=500, detail=f"Batch scoring failed: {error}")
+
+
+@router.post("/score/segments", response_model=SegmentScoreResponse)
+async def score_segments(request: SegmentScoreRequest):
+    """
+    Score sliding windows of sentences and detect change points.
+    
+    Meant for hybrid documents (e.g. half human, half AI-written): returns
+    a per-window HumanScore™ series, the sentence indices where the marker
+    signals change, and a score for each segment between change points.
+    options.markers and options.max_cost select markers as for /score.
+    """
+    markers = marker_selection(request.options)
+    logger = get_logger()
+    
+    try:
+        result = await get_scoring_executor().run(
+            score_text_segments, request.text, request.window, request.stride, markers,
+            size=len(request.text)
+        )
+        
+        # Log to JSONL file (queued, written by the logger thread)
+        logger.log_scoring_request(
+            text=request.text,
+            result={
+                "change_points": result["change_points"],
+                "segments": result["segments"]
+            },
+            request_options={"window": request.window, "stride": request.stride, **(request.options or {})}
+        )
+        
+        return SegmentScoreResponse(**result)
+    
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=f"Scoring unavailable: {e}", headers={"Retry-After": "1"})
     
     except Exception as e:
         error = str(e)
@@ -89,5 +356,49 @@ async def score_text(
             request_options=request.options,
             error=error
         )
-        raise HTTPException(status_code=500, detail=f"Scoring failed: {error}")
+        raise HTTPException(status_code=500, detail=f"Segment scoring failed: {error}")
+
+
+@router.get("/markers")
+async def list_markers():
+    """
+    Registered cognitive markers: fusion weight, cost class and required
+    inputs of each, for options.markers and options.max_cost
+    """
+    engine = get_engine()
+    return {
+        "markers": [
+            {
+                "name": name,
+                "weight": engine.weights[name],
+                "cost": spec.cost,
+                "requires": list(spec.requires)
+            }
+            for name, spec in engine.markers.items()
+        ],
+        "cost_classes": list(COST_CLASSES)
+    }
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Result cache hit/miss counters and sizing information
+    """
+    return get_result_cache().stats()
+
 
+@router.get("/logger/stats")
+async def logger_stats():
+    """
+    JSONL logger queue depth and write/drop counters
+    """
+    return get_logger().stats()
+
+
+@router.get("/executor/stats")
+async def executor_stats():
+    """
+    Scoring worker pool sizing and dispatch counters
+    """
+    return get_scoring_executor().stats()
@@ -0,0 +1,252 @@
+"""
+Serverless Entry Point
+Lean ASGI app for cold-started deployments (vercel.json routes /api/* here)
+
+POST /api/v1/score is answered by the process-wide engine without
+importing the web framework or the database layer, and the engine loads
+its build-time state snapshot when there is one (see engine.runtime). Any
+other request, and score requests this path does not handle (invalid
+bodies, profiling), goes to the full API app, imported and started on
+first use.
+
+History rows and log entries of scored texts are written from a
+background thread, which imports the database layer (and creates the
+schema if it is missing) the first time it runs. Serverless platforms may
+freeze the process between requests, so they can be written during a
+later invocation.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.utils.hashing import hash_text
+from engine.humanscore.cache import ResultCache
+from engine.humanscore.scorer import DETAIL_LEVELS
+from engine.runtime import get_engine, get_processor
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard encoder
+    orjson = None
+
+
+SCORE_PATH = "/api/v1/score"
+
+# Shortest text accepted (as ScoreRequest.text)
+MIN_TEXT_LENGTH = 10
+
+GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+
+# In-memory results only: the persistent tier would need the database
+_cache = ResultCache(
+    max_size=int(os.getenv("SCORE_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("SCORE_CACHE_TTL", "3600"))
+)
+
+# One thread, so rows and log entries keep request order
+_recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="serverless-recorder")
+_schema_ready = False
+
+# Full API app (api.main), started on first use
+_full_app = None
+_full_app_lock: Optional[asyncio.Lock] = None
+
+
+def _score_request(
+    body: bytes,
+    headers: Dict[str, str]
+) -> Optional[Tuple[str, str, Optional[Dict[str, Any]], Optional[Tuple[str, ...]]]]:
+    """
+    Text, detail level, options and marker selection of a score request the
+    lean path can serve
+
+    Returns:
+        None for anything else (invalid requests or marker selections,
+        profiling), which the full app validates and answers
+    """
+    if "x-profile" in headers:
+        return None
+    try:
+        request = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(request, dict):
+        return None
+    text = request.get("text")
+    detail = request.get("detail", "full")
+    options = request.get("options")
+    if not isinstance(text, str) or len(text) < MIN_TEXT_LENGTH or detail not in DETAIL_LEVELS:
+        return None
+    if options is not None and (not isinstance(options, dict) or "profile" in options):
+        return None
+    markers = None
+    if options and ("markers" in options or "max_cost" in options):
+        try:
+            markers = get_engine().select_markers(options.get("markers"), options.get("max_cost"))
+        except (TypeError, ValueError):
+            return None
+    return text, detail, options, markers
+
+
+def _cache_key(config_key: str, detail: str) -> str:
+    """Result cache key of a detail level (as in api.routes.scoring)"""
+    return config_key if detail == "full" else f"{config_key}:{detail}"
+
+
+def _score(text: str, detail: str, markers: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    return get_engine().score(get_processor().process(text), detail=detail, markers=markers)
+
+
+def _ensure_schema():
+    """Create the database schema once per process (a quick check when it exists)"""
+    global _schema_ready
+    if not _schema_ready:
+        from api.database import init_db
+        init_db()
+        _schema_ready = True
+
+
+def _record(text: str, text_hash: str, result: Dict[str, Any], options: Optional[Dict[str, Any]], error: Optional[str] = None):
+    """Save a history row and log entry of a scored text (runs in the recorder thread)"""
+    try:
+        from api.utils.logger import get_logger
+        if error is not None:
+            get_logger().log_scoring_request(text=text, result={}, request_options=options, error=error, text_hash=text_hash)
+            return
+
+        from api.routes.history import history_row
+        from api.utils.history_writer import get_history_writer
+        _ensure_schema()
+        get_history_writer().submit([
+            history_row(text, result["humanscore"], result["breakdown"], result["metadata"], text_hash)
+        ])
+        get_logger().log_scoring_request(
+            text=text,
+            result={
+                "humanscore": result["humanscore"],
+                "breakdown": result["breakdown"],
+                "metadata": result["metadata"]
+            },
+            request_options=options,
+            text_hash=text_hash
+        )
+    except Exception as e:
+        print(f"Warning: Recording scored request failed: {e}")
+
+
+def _encode(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content).encode("utf-8")
+
+
+async def _respond(send, status: int, content: Any, headers: Dict[str, str], accept_encoding: str):
+    """Send a JSON response, gzipped like the full app's GZipMiddleware does"""
+    body = _encode(content)
+    response_headers: List[Tuple[bytes, bytes]] = [(b"content-type", b"application/json")]
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in accept_encoding:
+        body = gzip.compress(body, compresslevel=9)
+        response_headers += [(b"content-encoding", b"gzip"), (b"vary", b"Accept-Encoding")]
+    response_headers.append((b"content-length", str(len(body)).encode()))
+    response_headers += [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    await send({"type": "http.response.start", "status": status, "headers": response_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _get_full_app():
+    """Import and start the full API app (once)"""
+    global _full_app, _full_app_lock
+    if _full_app_lock is None:
+        _full_app_lock = asyncio.Lock()
+    async with _full_app_lock:
+        if _full_app is None:
+            from api.main import app as full_app
+            await full_app.router.startup()
+            _full_app = full_app
+    return _full_app
+
+
+async def _delegate(scope, receive, send, body: Optional[bytes] = None):
+    """Hand a request to the full app, replaying its body if it was already read"""
+    if body is not None:
+        replayed = False
+
+        async def receive_replayed():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await original_receive()
+
+        original_receive, receive = receive, receive_replayed
+    full_app = await _get_full_app()
+    await full_app(scope, receive, send)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _recorder.shutdown(wait=True)
+            if _full_app is not None:
+                await _full_app.router.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != SCORE_PATH:
+        await _delegate(scope, receive, send)
+        return
+
+    body = await _read_body(receive)
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    request = _score_request(body, headers)
+    if request is None:
+        await _delegate(scope, receive, send, body)
+        return
+
+    text, detail, options, markers = request
+    text_hash = hash_text(text)
+    accept_encoding = headers.get("accept-encoding", "")
+    loop = asyncio.get_running_loop()
+    try:
+        cache_key = _cache_key(get_engine().config_key_for(markers), detail)
+        result, cache_source = _cache.get(text_hash, cache_key)
+        if result is None:
+            # Off the event loop, like the full app's executor
+            result = await loop.run_in_executor(None, _score, text, detail, markers)
+            _cache.put(text_hash, cache_key, result)
+    except Exception as e:
+        _recorder.submit(_record, text, text_hash, {}, options, str(e))
+        await _respond(send, 500, {"detail": f"Scoring failed: {e}"}, {}, accept_encoding)
+        return
+
+    _recorder.submit(_record, text, text_hash, result, options)
+    await _respond(send, 200, {
+        "humanscore": result["humanscore"],
+        "breakdown": result["breakdown"],
+        "metadata": result["metadata"]
+    }, {"X-Cache": cache_source}, accept_encoding)
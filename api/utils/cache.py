@@ -0,0 +1,26 @@
+"""
+Result cache wiring for the API
+"""
+
+import os
+
+from engine.humanscore.cache import ResultCache
+from api.routes.history import lookup_cached_result, lookup_cached_results
+
+
+# Global cache instance
+_cache_instance = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get or create global result cache instance"""
+    global _cache_instance
+    if _cache_instance is None:
+        persistent = os.getenv("SCORE_CACHE_PERSISTENT", "1").lower() not in ("0", "false", "no")
+        _cache_instance = ResultCache(
+            max_size=int(os.getenv("SCORE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("SCORE_CACHE_TTL", "3600")),
+            persistent_lookup=lookup_cached_result if persistent else None,
+            persistent_bulk_lookup=lookup_cached_results if persistent else None
+        )
+    return _cache_instance
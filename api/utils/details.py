@@ -0,0 +1,186 @@
+"""
+Marker Detail Codec
+Packs the numeric arrays of marker details (drift vectors, per-sentence
+counts) into a compact typed binary blob, stored apart from the history row
+"""
+
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# Blob layout: magic, flags, manifest length, JSON manifest, array payload
+DETAIL_MAGIC = b"TND1"
+FLAG_ZLIB = 1
+_HEADER = struct.Struct("<4sBI")
+
+# Arrays shorter than this stay inline in the JSON metadata
+MIN_PACKED_LENGTH = 8
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_array(value: Any) -> Optional[np.ndarray]:
+    """Numeric 1-D list or rectangular 2-D list as an array, else None"""
+    if not isinstance(value, list) or len(value) < MIN_PACKED_LENGTH:
+        return None
+    first = value[0]
+    if _is_number(first):
+        if not all(_is_number(v) for v in value):
+            return None
+    elif isinstance(first, list):
+        width = len(first)
+        if not all(isinstance(row, list) and len(row) == width and all(_is_number(v) for v in row) for row in value):
+            return None
+    else:
+        return None
+    return np.asarray(value)
+
+
+def _narrow(array: np.ndarray, float_dtype: str) -> np.ndarray:
+    """Smallest integer type holding the values, or the configured float type"""
+    if array.dtype.kind in "iu":
+        low, high = (int(array.min()), int(array.max())) if array.size else (0, 0)
+        for dtype in (np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return array.astype(dtype)
+        return array.astype(np.int64)
+    return array.astype(float_dtype)
+
+
+def pack_details(
+    marker_details: Dict[str, Any],
+    float_dtype: str = "float32",
+    compress: bool = True
+) -> Tuple[Dict[str, Any], Optional[bytes], int]:
+    """
+    Split marker details into a slim dictionary and a binary array blob
+
+    Args:
+        marker_details: metadata["marker_details"] from HumanScoreEngine.score
+        float_dtype: Storage type of float arrays ("float32" or "float64")
+        compress: zlib-compress the array payload
+
+    Returns:
+        Tuple of (details without the packed arrays, blob or None if
+        nothing was worth packing, JSON size of the packed arrays)
+    """
+    manifest: List[Dict[str, Any]] = []
+    chunks: List[bytes] = []
+    offset = 0
+    json_bytes = 0
+
+    def walk(node: Dict[str, Any], path: List[str]) -> Dict[str, Any]:
+        nonlocal offset, json_bytes
+        slim = {}
+        for key, value in node.items():
+            if isinstance(value, dict):
+                slim[key] = walk(value, path + [key])
+                continue
+            array = _as_array(value)
+            if array is None:
+                slim[key] = value
+                continue
+            slim[key] = None  # Placeholder keeps the key order; filled in by unpack_details
+            json_bytes += len(json.dumps(value))
+            array = np.ascontiguousarray(_narrow(array, float_dtype))
+            data = array.tobytes()
+            manifest.append({
+                "path": path + [key],
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            })
+            chunks.append(data)
+            offset += len(data)
+        return slim
+
+    slim = walk(marker_details, [])
+    if not manifest:
+        return marker_details, None, 0
+
+    payload = b"".join(chunks)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    header = json.dumps(manifest, separators=(",", ":")).encode()
+    return slim, _HEADER.pack(DETAIL_MAGIC, flags, len(header)) + header + payload, json_bytes
+
+
+def _to_list(array: np.ndarray) -> list:
+    """Array values as Python numbers; float32 values keep their short repr (0.1, not 0.10000000149)"""
+    if array.dtype == np.float32:
+        return np.vectorize(lambda v: float(str(v)), otypes=[float])(array).tolist() if array.size else array.tolist()
+    return array.tolist()
+
+
+def unpack_details(slim: Dict[str, Any], blob: Optional[bytes]) -> Dict[str, Any]:
+    """
+    Rebuild the full marker details from pack_details output
+
+    Raises:
+        ValueError: Blob is not in the detail format
+    """
+    if blob is None:
+        return slim
+    magic, flags, header_length = _HEADER.unpack_from(blob)
+    if magic != DETAIL_MAGIC:
+        raise ValueError("Not a marker detail blob")
+    start = _HEADER.size
+    manifest = json.loads(blob[start:start + header_length])
+    payload = blob[start + header_length:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    details = json.loads(json.dumps(slim))  # Deep copy; arrays are inserted below
+    for entry in manifest:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=entry["offset"])
+        node = details
+        for key in entry["path"][:-1]:
+            node = node.setdefault(key, {})
+        if node.get(entry["path"][-1]) is not None:
+            continue  # Never overwrite a value that was stored inline
+        node[entry["path"][-1]] = _to_list(array.reshape(entry["shape"]))
+    return details
+
+
+def pack_metadata(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[bytes], int]:
+    """
+    pack_details applied to the marker_details of result metadata,
+    with settings from DETAIL_FLOAT_DTYPE and DETAIL_COMPRESS
+
+    Returns:
+        Tuple of (slim metadata, blob or None, JSON size of the packed arrays)
+    """
+    details = metadata.get("marker_details")
+    if not isinstance(details, dict):
+        return metadata, None, 0
+    slim, blob, json_bytes = pack_details(details, **detail_settings())
+    if blob is None:
+        return metadata, None, 0
+    return {**metadata, "marker_details": slim}, blob, json_bytes
+
+
+def unpack_metadata(metadata: Dict[str, Any], blob: Optional[bytes]) -> Dict[str, Any]:
+    """Result metadata with the marker details rebuilt from a pack_metadata blob"""
+    if blob is None:
+        return metadata
+    return {**metadata, "marker_details": unpack_details(metadata.get("marker_details", {}), blob)}
+
+
+def detail_settings() -> Dict[str, Any]:
+    """pack_details keyword arguments from the environment"""
+    return {
+        "float_dtype": os.getenv("DETAIL_FLOAT_DTYPE", "float32"),
+        "compress": os.getenv("DETAIL_COMPRESS", "1").lower() not in ("0", "false", "no"),
+    }
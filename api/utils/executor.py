@@ -0,0 +1,249 @@
+"""
+Scoring Executor
+Runs CPU-bound text processing and scoring in a pool of warm worker processes,
+so the event loop only does I/O
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from engine.metrics import get_metrics
+from engine.runtime import get_engine, get_processor, warm_up
+
+
+def _init_worker():
+    """Build and warm up the process-wide processor and engine of a worker"""
+    warm_up()
+
+
+def _warm_up() -> int:
+    """No-op task that forces a worker process to start (running its initializer)"""
+    return os.getpid()
+
+
+def score_texts(
+    texts: List[str],
+    detail: str = "full",
+    markers: Optional[Tuple[str, ...]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Preprocess and score texts at a detail level with a marker selection
+    (runs in a worker process)
+
+    Returns:
+        Score dictionaries, in input order
+    """
+    processor = get_processor()
+    return get_engine().score_batch([processor.process(text) for text in texts], detail=detail, markers=markers)
+
+
+def score_text_segments(
+    text: str,
+    window: int,
+    stride: int,
+    markers: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """Preprocess a text and score its sliding windows (runs in a worker process)"""
+    return get_engine().score_windows(get_processor().process(text), window=window, stride=stride, markers=markers)
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the scoring queue is full"""
+
+
+class ScoringExecutor:
+    """
+    Dispatches scoring work to a pool of warm worker processes.
+
+    At most max_queue tasks are queued or running at once; beyond that,
+    submissions fail fast with ExecutorBusyError instead of piling up.
+    Work on texts up to inline_max_chars runs inline, where process
+    round-trips would cost more than the scoring itself. Without worker
+    processes, all work runs in the event loop's thread pool instead, so
+    long scores do not stall other requests (or /health and /ready).
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, inline_max_chars: int = 0):
+        """
+        Initialize scoring executor
+
+        Args:
+            max_workers: Worker processes (0 runs everything in a thread of this process)
+            max_queue: Maximum tasks queued or running in the pool
+            inline_max_chars: Work on at most this many characters runs inline
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.inline_max_chars = inline_max_chars
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.ready = False
+        self.warmup: Optional[Dict[str, Any]] = None
+        self._warmup_attempts = 0
+        self._counters = {"inline": 0, "pooled": 0, "rejected": 0}
+
+    @property
+    def config_key(self) -> str:
+        """Config key of the scoring engine (workers run the same code and weights)"""
+        return get_engine().config_key
+
+    def config_key_for(self, markers: Optional[Tuple[str, ...]]) -> str:
+        """Config key of results scored with a marker selection"""
+        return get_engine().config_key_for(markers)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    async def run(self, fn: Callable, *args, size: int = 0) -> Any:
+        """
+        Run a scoring function without blocking the event loop
+
+        Args:
+            fn: Module-level function (picklable), e.g. score_texts
+            *args: Arguments of fn
+            size: Characters of text the call processes (decides the inline path)
+
+        Returns:
+            Return value of fn
+        """
+        if self.max_workers <= 0:
+            # No worker processes: score in a thread, off the event loop
+            self._counters["inline"] += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, fn, *args)
+
+        if size <= self.inline_max_chars:
+            self._counters["inline"] += 1
+            return fn(*args)
+
+        if self._pending >= self.max_queue:
+            self._counters["rejected"] += 1
+            get_metrics().count("traceneuro_executor_rejected_total")
+            raise ExecutorBusyError("Scoring queue is full")
+
+        self._pending += 1
+        self._counters["pooled"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self._pool = None
+            raise
+        finally:
+            self._pending -= 1
+
+    async def score_texts(
+        self,
+        texts: List[str],
+        detail: str = "full",
+        markers: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score texts, split across workers when they go to the pool
+
+        Args:
+            texts: Texts to score
+            detail: Result detail level (see engine DETAIL_LEVELS)
+            markers: Markers to run (default: all; see engine select_markers)
+
+        Returns:
+            Score dictionaries, in input order
+        """
+        sizes = [len(text) for text in texts]
+        total = sum(sizes)
+        if self.max_workers <= 1 or total <= self.inline_max_chars or len(texts) < 2:
+            return await self.run(score_texts, texts, detail, markers, size=total)
+
+        # Contiguous chunks of roughly equal character counts, one per worker
+        chunks: List[List[str]] = [[]]
+        target = total / min(self.max_workers, len(texts))
+        filled = 0
+        for text, size in zip(texts, sizes):
+            if filled >= target and len(chunks) < self.max_workers:
+                chunks.append([])
+                filled = 0
+            chunks[-1].append(text)
+            filled += size
+
+        results = await asyncio.gather(*(
+            self.run(score_texts, chunk, detail, markers, size=sum(len(text) for text in chunk))
+            for chunk in chunks
+        ))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        Warm up the engine of this process (inline path) and start every
+        worker process, each warming up its own engine in its initializer;
+        the executor is ready once all of them are done. A failure is
+        recorded in warmup (error and attempts so far) and re-raised, and
+        the worker pool is dropped so the next attempt starts fresh workers.
+
+        Returns:
+            Warm-up duration in seconds, number of warm workers and attempts
+        """
+        started = time.perf_counter()
+        self._warmup_attempts += 1
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, warm_up)
+            pids = []
+            if self.max_workers > 0:
+                pool = self._get_pool()
+                # Submitted together, each task starts another worker until the pool is full
+                pids = await asyncio.gather(*(loop.run_in_executor(pool, _warm_up) for _ in range(self.max_workers)))
+        except Exception as e:
+            self.shutdown()
+            self.warmup = {"error": str(e), "attempts": self._warmup_attempts}
+            raise
+        self.warmup = {"seconds": time.perf_counter() - started, "workers": len(set(pids)), "attempts": self._warmup_attempts}
+        self.ready = True
+        return self.warmup
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool sizing and dispatch counters"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inline_max_chars": self.inline_max_chars,
+            "pending": self._pending,
+            "ready": self.ready,
+            "warmup": self.warmup,
+            **self._counters,
+        }
+
+
+# Global executor instance
+_executor_instance = None
+
+
+def get_scoring_executor() -> ScoringExecutor:
+    """Get or create global scoring executor instance"""
+    global _executor_instance
+    if _executor_instance is None:
+        _executor_instance = ScoringExecutor(
+            max_workers=int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 1))),
+            max_queue=int(os.getenv("SCORING_MAX_QUEUE", "64")),
+            inline_max_chars=int(os.getenv("SCORING_INLINE_MAX_CHARS", "2000"))
+        )
+    return _executor_instance
@@ -0,0 +1,91 @@
+"""
+Fingerprint Index Maintenance
+Keeps the on-disk stylometric fingerprint index in step with scoring history
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringHistory
+from engine.markers.stylometry.extractor import fingerprint_vector
+from engine.markers.stylometry.index import FingerprintIndex
+
+
+def history_fingerprint(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Stylometric fingerprint stored in a history record's metadata (None at summary detail)"""
+    details = (metadata or {}).get("marker_details") or {}
+    return (details.get("stylometry") or {}).get("fingerprint") or None
+
+
+def sync_fingerprint_index(
+    index: FingerprintIndex,
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: int = 2000
+) -> int:
+    """
+    Append the fingerprints of history rows added since the last sync
+
+    Rows are read in id order from the last indexed id, so a sync only
+    touches new rows. Rows saved without marker details are skipped.
+
+    Returns:
+        Number of fingerprints added
+    """
+    added = 0
+    last_id = index.read_meta()["last_id"]
+    while True:
+        db = session_factory()
+        try:
+            rows = db.query(ScoringHistory.id, ScoringHistory.full_metadata)\
+                .filter(ScoringHistory.id > last_id)\
+                .order_by(ScoringHistory.id)\
+                .limit(batch_size)\
+                .all()
+        finally:
+            db.close()
+        if not rows:
+            return added
+
+        ids, vectors = [], []
+        for row in rows:
+            fingerprint = history_fingerprint(row.full_metadata)
+            if fingerprint is not None:
+                ids.append(row.id)
+                vectors.append(fingerprint_vector(fingerprint))
+        last_id = rows[-1].id
+        index.add(ids, np.stack(vectors) if vectors else np.zeros((0, index.dim), dtype=np.float32), last_id)
+        added += len(ids)
+
+
+# Global index instance
+_index_instance = None
+_sync_lock = threading.Lock()
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """Get or create global fingerprint index"""
+    global _index_instance
+    if _index_instance is None:
+        directory = Path(os.getenv("FINGERPRINT_INDEX_DIR", "data/fingerprints"))
+        if not directory.is_absolute():
+            directory = Path(__file__).parent.parent.parent / directory
+        _index_instance = FingerprintIndex(
+            str(directory),
+            ivf_lists=int(os.getenv("FINGERPRINT_IVF_LISTS", "0")),
+            ivf_min_rows=int(os.getenv("FINGERPRINT_IVF_MIN_ROWS", "100000")),
+            nprobe=int(os.getenv("FINGERPRINT_IVF_NPROBE", "8"))
+        )
+    return _index_instance
+
+
+def synced_fingerprint_index() -> FingerprintIndex:
+    """Global fingerprint index, brought up to date with history (one sync at a time)"""
+    index = get_fingerprint_index()
+    with _sync_lock:
+        sync_fingerprint_index(index)
+    return index
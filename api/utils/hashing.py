@@ -0,0 +1,10 @@
+"""
+Text hashing helpers
+"""
+
+import hashlib
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of the text, used for deduplication and caching"""
+    return hashlib.sha256(text.encode()).hexdigest()
@@ -0,0 +1,307 @@
+"""
+Write-Behind History Writer
+Buffers scoring history rows and inserts them in bulk from a background
+thread, so requests do not each pay for a database commit
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Dict, Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringHistory
+from engine.metrics import get_metrics
+
+
+class HistoryBackpressureError(RuntimeError):
+    """Raised when the history buffer stays full past the submit timeout"""
+
+
+# Builds the column values of a row from a submitted item (runs in the flusher thread)
+RowBuilder = Callable[[Any], Dict[str, Any]]
+
+
+class _Pending:
+    """Rows of one submit call, waiting for the flush that writes them"""
+
+    __slots__ = ("rows", "build", "future", "urgent", "enqueued_at")
+
+    def __init__(self, rows: List[Any], urgent: bool, build: Optional[RowBuilder] = None):
+        self.rows = rows
+        self.build = build
+        self.future: Future = Future()
+        self.urgent = urgent
+        self.enqueued_at = time.monotonic()
+
+
+class HistoryWriter:
+    """
+    Collects ScoringHistory rows and writes them in bulk.
+
+    A background thread flushes the buffer with one insert and one commit
+    as soon as it holds flush_rows rows or its oldest row has waited
+    flush_ms milliseconds, whichever comes first. The buffer holds at most
+    max_pending rows; producers block while it is full (backpressure).
+
+    Submitters may pass raw items with a build function instead of column
+    values; rows are then built in the flusher thread, so serializing and
+    compressing result details stays off the request path.
+
+    Every submit returns a Future resolving to the ids of its rows once
+    they are committed. Callers that need the ids right away pass
+    wait=True, which flushes without waiting for the timer.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_rows: int = 100,
+        flush_ms: float = 50.0,
+        max_pending: int = 10000
+    ):
+        """
+        Initialize history writer
+
+        Args:
+            session_factory: Creates database sessions for the flusher
+            flush_rows: Flush once this many rows are buffered
+            flush_ms: Flush once the oldest buffered row waited this long
+            max_pending: Maximum rows buffered before producers block
+        """
+        self.session_factory = session_factory
+        self.flush_rows = max(1, flush_rows)
+        self.flush_ms = flush_ms
+        self.max_pending = max(self.flush_rows, max_pending)
+
+        self._cond = threading.Condition()
+        self._buffer: deque = deque()
+        self._pending_rows = 0
+        self._in_flight: List[_Pending] = []
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._counters = {
+            "submitted": 0,
+            "written": 0,
+            "flushes": 0,
+            "errors": 0,
+            "backpressure_waits": 0,
+            "last_flush_rows": 0,
+            "max_flush_rows": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def _start(self):
+        """Start the flusher thread on first use (caller holds the lock)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, rows: List[Any], wait: bool, build: Optional[RowBuilder]) -> Future:
+        """Append rows to the buffer (caller holds the lock and checked capacity)"""
+        pending = _Pending(rows, urgent=wait, build=build)
+        self._buffer.append(pending)
+        self._pending_rows += len(rows)
+        self._counters["submitted"] += len(rows)
+        self._start()
+        self._cond.notify_all()
+        return pending.future
+
+    def _has_room(self, n_rows: int) -> bool:
+        """Whether n_rows fit in the buffer (an oversized submit fits an empty buffer)"""
+        return self._pending_rows == 0 or self._pending_rows + n_rows <= self.max_pending
+
+    def submit(
+        self,
+        rows: List[Any],
+        wait: bool = False,
+        timeout: Optional[float] = None,
+        build: Optional[RowBuilder] = None
+    ) -> Future:
+        """
+        Buffer rows for the next flush, blocking while the buffer is full
+
+        Args:
+            rows: ScoringHistory column values, one dictionary per row
+                (or items turned into column values by build)
+            wait: Flush right away instead of waiting for the size or time trigger
+            timeout: Seconds to wait for room (None waits indefinitely)
+            build: Builds the column values of each row in the flusher thread
+
+        Returns:
+            Future resolving to the ids of the rows, in order
+
+        Raises:
+            HistoryBackpressureError: No room within timeout
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("History writer is closed")
+            if not self._has_room(len(rows)):
+                self._counters["backpressure_waits"] += 1
+                if not self._cond.wait_for(lambda: self._has_room(len(rows)) or self._closed, timeout):
+                    raise HistoryBackpressureError("History buffer is full")
+                if self._closed:
+                    raise RuntimeError("History writer is closed")
+            return self._enqueue(rows, wait, build)
+
+    async def submit_async(
+        self,
+        rows: List[Any],
+        wait: bool = False,
+        build: Optional[RowBuilder] = None
+    ) -> Optional[List[int]]:
+        """
+        Buffer rows from the event loop
+
+        Takes the lock without blocking when the buffer has room; otherwise
+        waits for room in a thread so the event loop keeps serving requests.
+
+        Returns:
+            Row ids when wait is True, otherwise None (rows are written later)
+        """
+        future = None
+        with self._cond:
+            if not self._closed and self._has_room(len(rows)):
+                future = self._enqueue(rows, wait, build)
+        if future is None:
+            future = await run_in_threadpool(self.submit, rows, wait, None, build)
+        if wait:
+            return await asyncio.wrap_future(future)
+        return None
+
+    def _take_batch(self) -> Optional[List[_Pending]]:
+        """Wait until a flush is due and take its rows from the buffer"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._buffer or self._closed)
+            if not self._buffer:
+                return None
+
+            # Size trigger, time trigger, urgent submit or shutdown
+            deadline = self._buffer[0].enqueued_at + self.flush_ms / 1000.0
+            while (
+                self._pending_rows < self.flush_rows
+                and not self._closed
+                and not any(p.urgent for p in self._buffer)
+            ):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, n_rows = [], 0
+            while self._buffer and n_rows < self.flush_rows:
+                pending = self._buffer.popleft()
+                batch.append(pending)
+                n_rows += len(pending.rows)
+            self._pending_rows -= n_rows
+            self._in_flight = batch
+            self._cond.notify_all()  # Wake producers waiting for room
+            return batch
+
+    def _flush(self, batch: List[_Pending]):
+        """Insert the rows of a batch with a single commit and resolve their futures"""
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            records = [
+                [ScoringHistory(**(pending.build(row) if pending.build else row)) for row in pending.rows]
+                for pending in batch
+            ]
+            db.add_all([record for group in records for record in group])
+            db.flush()
+            ids = [[record.id for record in group] for group in records]
+            db.commit()
+            for pending, group_ids in zip(batch, ids):
+                pending.future.set_result(group_ids)
+        except Exception as e:
+            db.rollback()
+            self._counters["errors"] += 1
+            get_metrics().error("history")
+            # Don't fail the requests that produced these rows
+            print(f"Warning: Failed to write scoring history: {e}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        n_rows = sum(len(pending.rows) for pending in batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        get_metrics().observe("history", elapsed_ms / 1000.0)
+        counters = self._counters
+        counters["written"] += n_rows
+        counters["flushes"] += 1
+        counters["last_flush_rows"] = n_rows
+        counters["max_flush_rows"] = max(counters["max_flush_rows"], n_rows)
+        counters["last_flush_ms"] = elapsed_ms
+        counters["max_flush_ms"] = max(counters["max_flush_ms"], elapsed_ms)
+        counters["total_flush_ms"] += elapsed_ms
+
+    def _run(self):
+        """Flusher thread: write batches until closed and drained"""
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Write everything buffered so far and wait until it is committed"""
+        with self._cond:
+            futures = [pending.future for pending in self._in_flight + list(self._buffer)]
+            for pending in self._buffer:
+                pending.urgent = True
+            self._cond.notify_all()
+        for future in futures:
+            future.exception(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Flush the buffer and stop the flusher thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer sizing, flush sizes and flush latency"""
+        counters = dict(self._counters)
+        flushes = counters["flushes"]
+        return {
+            "flush_rows": self.flush_rows,
+            "flush_ms": self.flush_ms,
+            "max_pending": self.max_pending,
+            "pending": self._pending_rows,
+            **counters,
+            "mean_flush_rows": counters["written"] / flushes if flushes else 0.0,
+            "mean_flush_ms": counters["total_flush_ms"] / flushes if flushes else 0.0,
+        }
+
+
+# Global writer instance
+_writer_instance = None
+
+
+def get_history_writer() -> HistoryWriter:
+    """Get or create global history writer instance"""
+    global _writer_instance
+    if _writer_instance is None:
+        _writer_instance = HistoryWriter(
+            flush_rows=int(os.getenv("HISTORY_FLUSH_ROWS", "100")),
+            flush_ms=float(os.getenv("HISTORY_FLUSH_MS", "50")),
+            max_pending=int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+        )
+        # Last-resort flush for processes that exit without the shutdown event
+        atexit.register(_writer_instance.close)
+    return _writer_instance
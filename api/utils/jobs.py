@@ -0,0 +1,491 @@
+"""
+Bulk Scoring Job Queue
+Durable queue of scoring work persisted in the database, drained by local
+workers with at-least-once delivery
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from sqlalchemy import func, insert, or_, and_, update
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringJob, ScoringJobItem, ScoringHistory, init_db
+from api.routes.history import history_row
+from api.utils.cache import get_result_cache
+from api.utils.executor import get_scoring_executor, ExecutorBusyError
+from api.utils.hashing import hash_text
+from engine.humanscore.scorer import DETAIL_LEVELS
+from engine.runtime import get_engine
+
+
+# Item states; queued and running items are still pending
+PENDING_STATES = ("queued", "running")
+
+ScoringOptions = Tuple[str, Optional[Tuple[str, ...]]]
+
+
+def job_scoring_options(options: Optional[Dict[str, Any]]) -> ScoringOptions:
+    """
+    Detail level (options.detail) and marker selection (options.markers,
+    options.max_cost) of a job, applied to every text as in /score
+
+    Returns:
+        Tuple of the detail level and the selected marker names (None for all)
+
+    Raises:
+        ValueError: Unknown detail level, markers or cost class
+    """
+    options = options or {}
+    detail = options.get("detail", "full")
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level: {detail}")
+    markers, max_cost = options.get("markers"), options.get("max_cost")
+    if markers is None and max_cost is None:
+        return detail, None
+    if markers is not None and (not isinstance(markers, list) or not all(isinstance(m, str) for m in markers)):
+        raise ValueError("options.markers must be a list of marker names")
+    return detail, get_engine().select_markers(markers, max_cost)
+
+
+def _cache_key(config_key: str, detail: str) -> str:
+    """Result cache key of a detail level (as in api.routes.scoring)"""
+    return config_key if detail == "full" else f"{config_key}:{detail}"
+
+
+def enqueue_job(texts: List[str], options: Optional[Dict[str, Any]], db: Session) -> ScoringJob:
+    """
+    Persist a job and one queue item per text in a single commit
+
+    Args:
+        texts: Texts to score, in result order
+        options: Request options, stored with the job
+        db: Database session
+
+    Returns:
+        Created ScoringJob record
+    """
+    job = ScoringJob(id=str(uuid.uuid4()), status="queued", total=len(texts), options=options)
+    db.add(job)
+    db.flush()
+    db.execute(insert(ScoringJobItem), [
+        {"job_id": job.id, "position": position, "text": text, "text_hash": hash_text(text)}
+        for position, text in enumerate(texts)
+    ])
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_progress(job: ScoringJob, db: Session) -> Dict[str, Any]:
+    """
+    Status of a job with per-state item counts
+
+    Returns:
+        Dictionary with job_id, status, total, counts, progress and timestamps
+    """
+    counts = dict(
+        db.query(ScoringJobItem.status, func.count(ScoringJobItem.id))
+        .filter(ScoringJobItem.job_id == job.id)
+        .group_by(ScoringJobItem.status)
+        .all()
+    )
+    counts = {state: counts.get(state, 0) for state in ("queued", "running", "done", "failed")}
+    finished = counts["done"] + counts["failed"]
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "counts": counts,
+        "progress": finished / job.total if job.total else 1.0,
+        "options": job.options,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def job_results(job_id: str, after: int, limit: int, db: Session) -> List[ScoringJobItem]:
+    """Items of a job with a position greater than after, in position order"""
+    return db.query(ScoringJobItem)\
+        .filter(ScoringJobItem.job_id == job_id, ScoringJobItem.position > after)\
+        .order_by(ScoringJobItem.position)\
+        .limit(limit)\
+        .all()
+
+
+def _close_finished_jobs(db: Session, job_ids: Iterable[str], now: datetime):
+    """Touch the given jobs and mark those without pending items completed"""
+    for job_id in job_ids:
+        pending = db.query(func.count(ScoringJobItem.id))\
+            .filter(ScoringJobItem.job_id == job_id, ScoringJobItem.status.in_(PENDING_STATES))\
+            .scalar()
+        values = {"updated_at": now}
+        if not pending:
+            values.update(status="completed", finished_at=now)
+        db.query(ScoringJob).filter(ScoringJob.id == job_id)\
+            .update(values, synchronize_session=False)
+
+
+class JobWorker:
+    """
+    Drains the job queue.
+
+    Items are claimed in batches under a lease: a claim marks them running
+    until lease_expires_at, and items whose lease expired (their worker
+    crashed or was restarted) are claimed again, so every item is scored at
+    least once. Results are written with a conditional update keyed on
+    (job_id, text_hash) that only touches items not yet done, and a history
+    row is added only when that update changed something, so a redelivered
+    item never produces a second result or history row. Items with the same
+    text in a job are scored once.
+
+    Up to concurrency batches are in flight at a time per worker; scoring
+    itself runs in the shared ScoringExecutor pool.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        batch_size: int = 16,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3
+    ):
+        """
+        Initialize job worker
+
+        Args:
+            concurrency: Batches processed at once (0 disables the worker)
+            batch_size: Items claimed per batch
+            poll_interval: Seconds to wait when the queue is empty
+            lease_seconds: Seconds a claim lasts before the items are redelivered
+            max_attempts: Claims after which an unfinished item is marked failed
+        """
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._tasks: List[asyncio.Task] = []
+        self._counters = {"batches": 0, "scored": 0, "deduplicated": 0, "failed": 0}
+
+    def claim(self) -> List[Dict[str, Any]]:
+        """
+        Lease the next batch of queued (or abandoned) items
+
+        Returns:
+            Claimed items as dictionaries with id, job_id, text, text_hash
+            and the options of their job
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            claimable = or_(
+                ScoringJobItem.status == "queued",
+                and_(ScoringJobItem.status == "running", ScoringJobItem.lease_expires_at < now)
+            )
+
+            # Abandoned items that used up their attempts are not retried again
+            exhausted = and_(claimable, ScoringJobItem.attempts >= self.max_attempts)
+            exhausted_jobs = {row[0] for row in db.query(ScoringJobItem.job_id).filter(exhausted).distinct()}
+            if exhausted_jobs:
+                db.execute(
+                    update(ScoringJobItem)
+                    .where(exhausted)
+                    .values(status="failed", error="Exceeded maximum attempts", lease_owner=None)
+                    .execution_options(synchronize_session=False)
+                )
+                _close_finished_jobs(db, exhausted_jobs, now)
+
+            ids = [
+                row[0] for row in db.query(ScoringJobItem.id)
+                .filter(claimable)
+                .order_by(ScoringJobItem.id)
+                .limit(self.batch_size)
+                .all()
+            ]
+            if not ids:
+                db.commit()
+                return []
+
+            # The claim condition is re-checked in the update, so concurrent
+            # workers racing for the same rows each get a disjoint subset
+            token = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+            db.execute(
+                update(ScoringJobItem)
+                .where(ScoringJobItem.id.in_(ids), claimable)
+                .values(
+                    status="running",
+                    lease_owner=token,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=ScoringJobItem.attempts + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            items = db.query(ScoringJobItem, ScoringJob.options)\
+                .join(ScoringJob, ScoringJob.id == ScoringJobItem.job_id)\
+                .filter(ScoringJobItem.lease_owner == token)\
+                .order_by(ScoringJobItem.id)\
+                .all()
+            claimed = [
+                {"id": item.id, "job_id": item.job_id, "text": item.text, "text_hash": item.text_hash, "options": options}
+                for item, options in items
+            ]
+
+            job_ids = {item["job_id"] for item in claimed}
+            db.query(ScoringJob)\
+                .filter(ScoringJob.id.in_(job_ids), ScoringJob.status == "queued")\
+                .update({"status": "running", "updated_at": now}, synchronize_session=False)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def complete(self, items: List[Dict[str, Any]], outcomes: Dict[str, Tuple[Optional[Dict], Optional[str]]]):
+        """
+        Write the outcome of a claimed batch
+
+        Args:
+            items: Items returned by claim()
+            outcomes: (job_id, text_hash) -> (result, None) or (None, error message)
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            written = set()
+            for item in items:
+                key = (item["job_id"], item["text_hash"])
+                if key in written:
+                    continue
+                written.add(key)
+                result, error = outcomes[key]
+                not_finished = and_(
+                    ScoringJobItem.job_id == item["job_id"],
+                    ScoringJobItem.text_hash == item["text_hash"],
+                    ScoringJobItem.status.in_(PENDING_STATES)
+                )
+
+                if result is None:
+                    self._counters["failed"] += 1
+                    db.execute(
+                        update(ScoringJobItem)
+                        .where(not_finished)
+                        .values(status="failed", error=error, lease_owner=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                    continue
+
+                changed = db.execute(
+                    update(ScoringJobItem)
+                    .where(not_finished)
+                    .values(
+                        status="done",
+                        humanscore=result["humanscore"],
+                        breakdown=result["breakdown"],
+                        error=None,
+                        lease_owner=None
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if changed:
+                    db.add(ScoringHistory(**history_row(
+                        item["text"], result["humanscore"], result["breakdown"], result["metadata"], item["text_hash"]
+                    )))
+
+            _close_finished_jobs(db, {item["job_id"] for item in items}, now)
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, items: List[Dict[str, Any]]):
+        """Return claimed items to the queue, taking back the attempt their claim counted"""
+        db = SessionLocal()
+        try:
+            db.query(ScoringJobItem)\
+                .filter(ScoringJobItem.id.in_([item["id"] for item in items]), ScoringJobItem.status == "running")\
+                .update({
+                    "status": "queued",
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "attempts": ScoringJobItem.attempts - 1
+                }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _score(self, items: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Tuple[Optional[Dict], Optional[str]]]:
+        """
+        Score the distinct texts of a batch with the options of their job,
+        serving repeats from the result cache
+
+        Returns:
+            (job_id, text_hash) -> (result, None) or (None, error message)
+        """
+        outcomes: Dict[Tuple[str, str], Tuple[Optional[Dict], Optional[str]]] = {}
+        groups: Dict[ScoringOptions, List[Dict[str, Any]]] = {}
+        for item in items:
+            try:
+                groups.setdefault(job_scoring_options(item["options"]), []).append(item)
+            except ValueError as e:
+                outcomes[(item["job_id"], item["text_hash"])] = (None, f"Invalid job options: {e}")
+
+        for (detail, markers), group in groups.items():
+            results = await self._score_texts({item["text_hash"]: item["text"] for item in group}, detail, markers)
+            self._counters["deduplicated"] += len(group) - len(results)
+            for item in group:
+                outcomes[(item["job_id"], item["text_hash"])] = results[item["text_hash"]]
+        return outcomes
+
+    async def _score_texts(
+        self,
+        texts: Dict[str, str],
+        detail: str,
+        markers: Optional[Tuple[str, ...]]
+    ) -> Dict[str, Tuple[Optional[Dict], Optional[str]]]:
+        """Score texts by hash at a detail level with a marker selection, serving repeats from the result cache"""
+        executor = get_scoring_executor()
+        cache = get_result_cache()
+        cache_key = _cache_key(executor.config_key_for(markers), detail)
+
+        outcomes: Dict[str, Tuple[Optional[Dict], Optional[str]]] = {}
+        hashes = list(texts)
+        for text_hash, (result, _) in zip(hashes, await asyncio.to_thread(cache.get_many, hashes, cache_key)):
+            if result is not None:
+                outcomes[text_hash] = (result, None)
+
+        misses = [text_hash for text_hash in texts if text_hash not in outcomes]
+        if not misses:
+            return outcomes
+        try:
+            scored = await executor.score_texts([texts[h] for h in misses], detail, markers)
+            pairs = list(zip(misses, scored))
+        except ExecutorBusyError:
+            raise
+        except Exception:
+            # Score one by one so a single bad text only fails its own items
+            pairs = []
+            for text_hash in misses:
+                try:
+                    pairs.append((text_hash, (await executor.score_texts([texts[text_hash]], detail, markers))[0]))
+                except ExecutorBusyError:
+                    raise
+                except Exception as e:
+                    outcomes[text_hash] = (None, f"Scoring failed: {e}")
+
+        for text_hash, result in pairs:
+            cache.put(text_hash, cache_key, result)
+            outcomes[text_hash] = (result, None)
+            self._counters["scored"] += 1
+        return outcomes
+
+    async def run_once(self) -> int:
+        """
+        Claim, score and complete one batch
+
+        Returns:
+            Number of items claimed (0 when the queue is empty)
+        """
+        items = await asyncio.to_thread(self.claim)
+        if not items:
+            return 0
+        try:
+            outcomes = await self._score(items)
+        except ExecutorBusyError:
+            # The pool is saturated by interactive requests; retry later
+            await asyncio.to_thread(self.release, items)
+            await asyncio.sleep(self.poll_interval)
+            return len(items)
+        await asyncio.to_thread(self.complete, items, outcomes)
+        self._counters["batches"] += 1
+        return len(items)
+
+    async def drain(self) -> int:
+        """
+        Process batches until the queue is empty
+
+        Returns:
+            Number of items claimed
+        """
+        total = 0
+        while True:
+            claimed = await self.run_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    async def _loop(self):
+        """Worker loop: process batches, sleeping while the queue is empty"""
+        while True:
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Database hiccup; claimed items are redelivered when their lease expires
+                claimed = 0
+            if not claimed:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start concurrency worker loops on the running event loop"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop the worker loops; in-flight items are redelivered after their lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker settings and counters"""
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "batch_size": self.batch_size,
+            "running": len(self._tasks),
+            **self._counters,
+        }
+
+
+# Global worker instance
+_worker_instance = None
+
+
+def get_job_worker() -> JobWorker:
+    """Get or create global job worker instance"""
+    global _worker_instance
+    if _worker_instance is None:
+        _worker_instance = JobWorker(
+            concurrency=int(os.getenv("JOB_CONCURRENCY", "1")),
+            batch_size=int(os.getenv("JOB_BATCH_SIZE", "16")),
+            poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        )
+    return _worker_instance
+
+
+async def _run_worker():
+    """Run the global job worker until cancelled"""
+    worker = get_job_worker()
+    worker.concurrency = max(worker.concurrency, 1)
+    worker.start()
+    try:
+        await asyncio.gather(*worker._tasks)
+    finally:
+        await worker.stop()
+        get_scoring_executor().shutdown()
+
+
+if __name__ == "__main__":
+    # Standalone worker process: python -m api.utils.jobs
+    init_db()
+    asyncio.run(_run_worker())
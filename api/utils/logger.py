@@ -3,37 +3,99 @@ JSONL Logging Utility
 Logs scoring requests and results to JSONL file for later ingestion
 """
 
+import atexit
+import gzip
 import json
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from api.utils.hashing import hash_text
+from engine.metrics import get_metrics
+
+
+# Text field policies: keep the full text, keep a prefix, or keep only its hash
+TEXT_POLICIES = ("full", "truncate", "hash")
+
+# Queue marker that tells the writer thread to finish
+_STOP = object()
+
 
 class JSONLLogger:
-    """Logger that writes to JSONL (JSON Lines) format"""
+    """
+    Logger that writes to JSONL (JSON Lines) format.
     
-    def __init__(self, log_file: str = "logs/scoring_logs.jsonl"):
+    Log calls only build an entry and put it on a bounded queue; a
+    background thread serializes queued entries, appends them in batches
+    to a file handle it keeps open, and rotates the file by size or age
+    (optionally gzipping rotated segments). When the queue is full new
+    entries are dropped and counted, so logging never slows down requests.
+    """
+    
+    def __init__(
+        self,
+        log_file: str = "logs/scoring_logs.jsonl",
+        text_policy: str = "full",
+        text_max_chars: int = 1000,
+        max_bytes: int = 0,
+        rotate_seconds: float = 0,
+        compress: bool = False,
+        queue_size: int = 10000,
+        batch_size: int = 256
+    ):
         """
         Initialize JSONL logger
         
         Args:
             log_file: Path to log file (relative to project root)
+            text_policy: "full", "truncate" (first text_max_chars) or "hash" (no text)
+            text_max_chars: Characters of text kept by the truncate policy
+            max_bytes: Rotate once the file would exceed this size (0 = never)
+            rotate_seconds: Rotate once the file is this old (0 = never)
+            compress: Gzip rotated files
+            queue_size: Maximum entries waiting to be written before new ones are dropped
+            batch_size: Maximum entries written per file append
         """
+        if text_policy not in TEXT_POLICIES:
+            raise ValueError(f"Unknown text policy: {text_policy}")
+        
         self.log_file = log_file
+        self.text_policy = text_policy
+        self.text_max_chars = text_max_chars
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.batch_size = batch_size
+        
+        # Resolve the path once (absolute paths are kept as they are)
+        project_root = Path(__file__).parent.parent.parent
+        self.log_path = project_root / self.log_file
         self._ensure_log_directory()
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._file_size = 0
+        self._opened_at = 0.0
+        self._counters = {"logged": 0, "written": 0, "dropped": 0, "rotations": 0, "write_errors": 0}
     
     def _ensure_log_directory(self):
         """Ensure log directory exists"""
-        log_path = Path(self.log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
     
     def log_scoring_request(
         self,
         text: str,
         result: Dict[str, Any],
         request_options: Dict[str, Any] = None,
-        error: str = None
+        error: str = None,
+        text_hash: str = None
     ):
         """
         Log a scoring request and result to JSONL file
@@ -43,43 +105,221 @@ class JSONLLogger:
             result: Scoring result dictionary
             request_options: Optional request options
             error: Optional error message if request failed
+            text_hash: Precomputed SHA-256 of text (computed if omitted)
+        """
+        log_entry = self._build_log_entry(text, result, request_options, error, text_hash)
+        self._write_log_entry(log_entry)
+    
+    def log_scoring_batch(
+        self,
+        texts: List[str],
+        results: List[Dict[str, Any]],
+        request_options: Dict[str, Any] = None,
+        error: str = None,
+        text_hashes: List[str] = None
+    ):
         """
-        log_entry = {
+        Log several scoring requests with a single queue hand-off
+        
+        Args:
+            texts: Input texts that were analyzed
+            results: Scoring result dictionaries, aligned with texts
+            request_options: Optional request options shared by the batch
+            error: Optional error message if the batch failed
+            text_hashes: Precomputed SHA-256 of each text (computed if omitted)
+        """
+        text_hashes = text_hashes or [None] * len(texts)
+        self._write_log_entries([
+            self._build_log_entry(text, result, request_options, error, text_hash)
+            for text, result, text_hash in zip(texts, results, text_hashes)
+        ])
+    
+    def _build_log_entry(
+        self,
+        text: str,
+        result: Dict[str, Any],
+        request_options: Dict[str, Any] = None,
+        error: str = None,
+        text_hash: str = None
+    ) -> Dict[str, Any]:
+        """
+        Build a single log entry dictionary
+        
+        A missing text_hash is filled in by the writer thread, and the
+        text field policy is applied there too, off the request path.
+        """
+        return {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "text": text,
             "text_length": len(text),
-            "text_hash": self._hash_text(text),
+            "text_hash": text_hash,
             "result": result if not error else None,
             "error": error,
             "request_options": request_options or {},
         }
-        
-        self._write_log_entry(log_entry)
     
     def _hash_text(self, text: str) -> str:
         """Generate hash of text for deduplication"""
-        import hashlib
-        return hashlib.sha256(text.encode()).hexdigest()
+        return hash_text(text)
+    
+    def _apply_text_policy(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the text hash and reduce the text field according to the policy"""
+        text = entry["text"]
+        if entry["text_hash"] is None:
+            entry["text_hash"] = self._hash_text(text)
+        if self.text_policy == "hash":
+            del entry["text"]
+        elif self.text_policy == "truncate" and len(text) > self.text_max_chars:
+            entry["text"] = text[:self.text_max_chars]
+            entry["text_truncated"] = True
+        return entry
     
     def _write_log_entry(self, entry: Dict[str, Any]):
         """
-        Write a single log entry as a JSON line
+        Queue a single log entry for writing
         
         Args:
             entry: Dictionary to write as JSON line
         """
+        self._write_log_entries([entry])
+    
+    def _write_log_entries(self, entries: List[Dict[str, Any]]):
+        """
+        Queue log entries for the writer thread (dropped if the queue is full)
+        
+        Args:
+            entries: Dictionaries to write, one JSON line each
+        """
+        self._start()
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+                self._counters["logged"] += 1
+            except queue.Full:
+                self._counters["dropped"] += 1
+                get_metrics().count("traceneuro_log_dropped_total")
+    
+    def _start(self):
+        """Start the writer thread on first use"""
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="jsonl-logger", daemon=True)
+                    self._thread.start()
+    
+    def _run(self):
+        """Writer thread: append queued entries in batches until stopped"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = any(entry is _STOP for entry in batch)
+            self._write_batch([entry for entry in batch if entry is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._close_file()
+                return
+    
+    def _write_batch(self, entries: List[Dict[str, Any]]):
+        """Serialize entries and append them with a single write"""
+        if not entries:
+            return
+        metrics = get_metrics()
+        started = time.perf_counter()
         try:
-            # Get absolute path
-            project_root = Path(__file__).parent.parent.parent
-            log_path = project_root / self.log_file
+            data = "".join(
+                json.dumps(self._apply_text_policy(entry), ensure_ascii=False) + "\n"
+                for entry in entries
+            ).encode("utf-8")
             
-            # Append to file (JSONL format - one JSON object per line)
-            with open(log_path, "a", encoding="utf-8") as f:
-                json_line = json.dumps(entry, ensure_ascii=False)
-                f.write(json_line + "\n")
+            if self._should_rotate(len(data)):
+                self._rotate()
+            log_file = self._open_file()
+            log_file.write(data)
+            log_file.flush()
+            self._file_size += len(data)
+            self._counters["written"] += len(entries)
+            metrics.observe("logging", time.perf_counter() - started)
         except Exception as e:
             # Don't fail the request if logging fails
+            self._counters["write_errors"] += 1
+            metrics.error("logging")
             print(f"Warning: Failed to write log entry: {e}")
+    
+    def _open_file(self):
+        """Open the log file for appending, once"""
+        if self._file is None:
+            self._file = open(self.log_path, "ab")
+            self._file_size = self._file.tell()
+            self._opened_at = time.time()
+        return self._file
+    
+    def _close_file(self):
+        """Close the log file handle"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _should_rotate(self, incoming: int) -> bool:
+        """Whether the current file is full or old enough to be rotated"""
+        self._open_file()
+        if self._file_size == 0:
+            return False
+        if self.max_bytes > 0 and self._file_size + incoming > self.max_bytes:
+            return True
+        return self.rotate_seconds > 0 and time.time() - self._opened_at >= self.rotate_seconds
+    
+    def _rotate(self):
+        """Move the current file aside (e.g. scoring_logs.20240115T103000.jsonl) and start a new one"""
+        self._close_file()
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        target = self.log_path.with_name(f"{self.log_path.stem}.{stamp}{self.log_path.suffix}")
+        counter = 1
+        while target.exists() or Path(f"{target}.gz").exists():
+            target = self.log_path.with_name(f"{self.log_path.stem}.{stamp}-{counter}{self.log_path.suffix}")
+            counter += 1
+        os.replace(self.log_path, target)
+        self._counters["rotations"] += 1
+        
+        if self.compress:
+            threading.Thread(target=self._compress, args=(target,), daemon=True).start()
+    
+    @staticmethod
+    def _compress(path: Path):
+        """Gzip a rotated log file and remove the original"""
+        try:
+            with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+        except Exception as e:
+            print(f"Warning: Failed to compress log file {path}: {e}")
+    
+    def flush(self):
+        """Block until every queued entry has been written"""
+        if self._thread is not None:
+            self._queue.join()
+    
+    def close(self):
+        """Write the queued entries and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and write/drop counters"""
+        return {
+            "log_file": str(self.log_path),
+            "text_policy": self.text_policy,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            **self._counters,
+        }
 
 
 # Global logger instance
@@ -91,5 +331,15 @@ def get_logger() -> JSONLLogger:
     global _logger_instance
     if _logger_instance is None:
         log_file = os.getenv("SCORING_LOG_FILE", "logs/scoring_logs.jsonl")
-        _logger_instance = JSONLLogger(log_file)
+        _logger_instance = JSONLLogger(
+            log_file,
+            text_policy=os.getenv("LOG_TEXT_POLICY", "full"),
+            text_max_chars=int(os.getenv("LOG_TEXT_MAX_CHARS", "1000")),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", "0")),
+            rotate_seconds=float(os.getenv("LOG_ROTATE_SECONDS", "0")),
+            compress=os.getenv("LOG_COMPRESS", "0").lower() in ("1", "true", "yes"),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        )
+        # Last-resort flush for processes that exit without the shutdown event
+        atexit.register(_logger_instance.close)
     return _logger_instance
@@ -0,0 +1,99 @@
+"""
+Marker Detail Migration
+Moves the detail arrays of existing scoring history rows into packed blobs
+
+Usage: python -m api.utils.migrate_details [batch_size]
+"""
+
+import json
+import sys
+from typing import Dict, Any, Callable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringHistory, ScoringDetailBlob, init_db
+from api.utils.details import pack_metadata
+
+
+def migrate_history_details(
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """
+    Pack the marker detail arrays of every history row that has no blob yet
+
+    Rows are processed in id order, one commit per batch, so the migration
+    can be interrupted and resumed; rows that already have a blob are skipped.
+
+    Args:
+        session_factory: Creates database sessions
+        batch_size: Rows per commit
+
+    Returns:
+        Report with rows scanned and packed and metadata bytes before and after
+    """
+    report = {"rows_scanned": 0, "rows_packed": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+
+    while True:
+        db = session_factory()
+        try:
+            records = db.query(ScoringHistory)\
+                .outerjoin(ScoringDetailBlob, ScoringDetailBlob.history_id == ScoringHistory.id)\
+                .filter(ScoringHistory.id > last_id, ScoringDetailBlob.history_id.is_(None))\
+                .order_by(ScoringHistory.id)\
+                .limit(batch_size)\
+                .all()
+            if not records:
+                break
+
+            for record in records:
+                last_id = record.id
+                report["rows_scanned"] += 1
+                metadata = record.full_metadata or {}
+                slim, blob, json_bytes = pack_metadata(metadata)
+                if blob is None:
+                    continue
+
+                report["rows_packed"] += 1
+                report["bytes_before"] += len(json.dumps(metadata))
+                report["bytes_after"] += len(json.dumps(slim)) + len(blob)
+                record.full_metadata = slim
+                record.detail_blob = ScoringDetailBlob(data=blob, raw_bytes=json_bytes, stored_bytes=len(blob))
+            db.commit()
+        finally:
+            db.close()
+
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["saved_ratio"] = report["bytes_saved"] / report["bytes_before"] if report["bytes_before"] else 0.0
+    return report
+
+
+def detail_storage_stats(db: Session) -> Dict[str, Any]:
+    """
+    Storage footprint of packed marker details
+
+    Returns:
+        Packed row count, JSON size of the packed arrays, blob size and savings
+    """
+    rows, raw_bytes, stored_bytes = db.query(
+        func.count(ScoringDetailBlob.history_id),
+        func.coalesce(func.sum(ScoringDetailBlob.raw_bytes), 0),
+        func.coalesce(func.sum(ScoringDetailBlob.stored_bytes), 0)
+    ).one()
+    return {
+        "packed_rows": rows,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "bytes_saved": raw_bytes - stored_bytes,
+        "saved_ratio": (raw_bytes - stored_bytes) / raw_bytes if raw_bytes else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    init_db()
+    result = migrate_history_details(batch_size=int(sys.argv[1]) if len(sys.argv) > 1 else 500)
+    print(json.dumps(result, indent=2))
+    # SQLite keeps freed pages until the file is vacuumed
+    print("Run VACUUM on SQLite databases to return the freed space to the filesystem.")
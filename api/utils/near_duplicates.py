@@ -0,0 +1,185 @@
+"""
+Near-Duplicate Index
+Finds earlier submissions similar to a text through MinHash signatures and
+LSH buckets stored next to the scoring history
+"""
+
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringHistory, MinHashSignature, MinHashBucket
+from engine.dedup.minhash import MinHasher, signature_similarity
+from engine.preprocessing.text_processor import TextProcessor
+
+
+class Fingerprint(NamedTuple):
+    """MinHash signature of a text and its LSH bucket keys"""
+    signature: np.ndarray
+    buckets: List[int]
+
+
+class NearDuplicateIndex:
+    """
+    Near-duplicate lookups over scored history.
+
+    Texts are tokenized like TextProcessor.process does, shingled and
+    MinHashed; every history row stores its signature and one bucket row
+    per LSH band. A query reads the rows sharing a bucket with the text
+    (an indexed lookup, independent of history size), then ranks those
+    candidates by estimated Jaccard similarity.
+    """
+
+    def __init__(
+        self,
+        hasher: Optional[MinHasher] = None,
+        top_k: int = 5,
+        min_similarity: float = 0.5,
+        reuse_threshold: float = 0.0,
+        max_candidates: int = 200,
+        enabled: bool = True
+    ):
+        """
+        Initialize near-duplicate index
+
+        Args:
+            hasher: MinHash settings (default: 128 permutations, 32 bands)
+            top_k: Most similar submissions returned by a query
+            min_similarity: Lowest estimated similarity returned
+            reuse_threshold: Similarity from which an earlier result may be
+                reused instead of scoring the text (0 disables reuse)
+            max_candidates: Candidates sharing the most buckets that are ranked
+            enabled: Fingerprint and index texts at all
+        """
+        self.hasher = hasher or MinHasher()
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.reuse_threshold = reuse_threshold
+        self.max_candidates = max_candidates
+        self.enabled = enabled
+        self.processor = TextProcessor()
+
+    def fingerprint(self, text: str) -> Optional[Fingerprint]:
+        """Signature and buckets of a text (None when the index is disabled)"""
+        if not self.enabled:
+            return None
+        tokens = self.processor.tokenize(self.processor.clean(text))
+        signature = self.hasher.signature(tokens)
+        return Fingerprint(signature, self.hasher.buckets(signature))
+
+    def fingerprints(self, texts: List[str]) -> List[Optional[Fingerprint]]:
+        """fingerprint of each text"""
+        return [self.fingerprint(text) for text in texts]
+
+    def index_rows(self, fingerprint: Optional[Fingerprint]) -> Dict[str, Any]:
+        """ScoringHistory relationship values that index a history row"""
+        if fingerprint is None:
+            return {}
+        return {
+            "minhash": MinHashSignature(
+                signature=fingerprint.signature.tobytes(),
+                settings=self.hasher.settings_key
+            ),
+            "minhash_buckets": [MinHashBucket(bucket=bucket) for bucket in fingerprint.buckets],
+        }
+
+    def query(
+        self,
+        fingerprint: Optional[Fingerprint],
+        exclude_hash: Optional[str] = None,
+        session_factory: Callable[[], Session] = SessionLocal
+    ) -> List[Dict[str, Any]]:
+        """
+        Earlier submissions most similar to a fingerprinted text
+
+        Args:
+            fingerprint: Output of fingerprint
+            exclude_hash: Text hash to leave out (exact resubmissions are
+                already served by the result cache)
+            session_factory: Creates database sessions
+
+        Returns:
+            Up to top_k matches (history_id, text_hash, similarity,
+            humanscore, created_at), most similar first, one per distinct text
+        """
+        if fingerprint is None:
+            return []
+        db = session_factory()
+        try:
+            shared = func.count(MinHashBucket.id)
+            candidate_ids = [
+                history_id for history_id, in db.query(MinHashBucket.history_id)
+                .filter(MinHashBucket.bucket.in_(fingerprint.buckets))
+                .group_by(MinHashBucket.history_id)
+                .order_by(shared.desc(), MinHashBucket.history_id.desc())
+                .limit(self.max_candidates)
+            ]
+            if not candidate_ids:
+                return []
+
+            query = db.query(
+                ScoringHistory.id,
+                ScoringHistory.text_hash,
+                ScoringHistory.humanscore,
+                ScoringHistory.created_at,
+                MinHashSignature.signature
+            ).join(MinHashSignature, MinHashSignature.history_id == ScoringHistory.id)\
+                .filter(ScoringHistory.id.in_(candidate_ids), MinHashSignature.settings == self.hasher.settings_key)
+            if exclude_hash is not None:
+                query = query.filter(ScoringHistory.text_hash != exclude_hash)
+            candidates = query.order_by(ScoringHistory.id.desc()).all()
+        finally:
+            db.close()
+
+        if not candidates:
+            return []
+        signatures = np.stack([np.frombuffer(c.signature, dtype=np.uint32) for c in candidates])
+        similarities = signature_similarity(fingerprint.signature, signatures)
+
+        matches, seen = [], set()
+        for i in np.argsort(-similarities, kind="stable"):
+            candidate = candidates[i]
+            if similarities[i] < self.min_similarity or len(matches) == self.top_k:
+                break
+            if candidate.text_hash in seen:
+                continue  # Newest row of each text only
+            seen.add(candidate.text_hash)
+            matches.append({
+                "history_id": candidate.id,
+                "text_hash": candidate.text_hash,
+                "similarity": float(similarities[i]),
+                "humanscore": candidate.humanscore,
+                "created_at": candidate.created_at.isoformat() if candidate.created_at else None,
+            })
+        return matches
+
+    def reusable_match(self, matches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Best match similar enough for its result to be reused, if reuse is enabled"""
+        if self.reuse_threshold > 0 and matches and matches[0]["similarity"] >= self.reuse_threshold:
+            return matches[0]
+        return None
+
+
+# Global index instance
+_index_instance = None
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Get or create global near-duplicate index"""
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = NearDuplicateIndex(
+            hasher=MinHasher(
+                num_perm=int(os.getenv("NEAR_DUP_NUM_PERM", "128")),
+                shingle_size=int(os.getenv("NEAR_DUP_SHINGLE_SIZE", "5")),
+                bands=int(os.getenv("NEAR_DUP_BANDS", "32"))
+            ),
+            top_k=int(os.getenv("NEAR_DUP_TOP_K", "5")),
+            min_similarity=float(os.getenv("NEAR_DUP_MIN_SIMILARITY", "0.5")),
+            reuse_threshold=float(os.getenv("NEAR_DUP_REUSE_THRESHOLD", "0")),
+            enabled=os.getenv("NEAR_DUP_INDEX", "1").lower() not in ("0", "false", "no")
+        )
+    return _index_instance
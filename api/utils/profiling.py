@@ -0,0 +1,179 @@
+"""
+Request Profiling
+Admin-only profiled scoring of a request, and offline replay of stored
+history records or log entries through the same profiler
+
+Usage:
+    python -m api.utils.profiling --history-id 42
+    python -m api.utils.profiling --log-line 17 [--log-file logs/scoring_logs.jsonl]
+"""
+
+import argparse
+import gzip
+import hmac
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from api.database import SessionLocal, ScoringHistory, ScoringJobItem, init_db
+from api.utils.logger import get_logger
+from engine.profiling import profile_scoring
+from engine.runtime import get_engine, get_processor
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Whether a token matches ADMIN_TOKEN (always False when ADMIN_TOKEN is unset)"""
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def profiling_requested(options: Optional[Dict[str, Any]], header: Optional[str]) -> bool:
+    """Whether a request asks for profiling (options.profile or the X-Profile header)"""
+    if (header or "").lower() in ("1", "true", "yes"):
+        return True
+    return bool((options or {}).get("profile"))
+
+
+def profile_text(
+    text: str,
+    detail: str = "full",
+    markers: Optional[Tuple[str, ...]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Score a text with this process's engine under the profiler
+
+    Returns:
+        Tuple of the score dictionary and the profile report
+    """
+    return profile_scoring(text, get_processor(), get_engine(), detail=detail, markers=markers)
+
+
+def _log_files(log_path: Path) -> List[Path]:
+    """Current log file and its rotated segments (gzipped or not), newest first"""
+    rotated = sorted(log_path.parent.glob(f"{log_path.stem}.*{log_path.suffix}*"), reverse=True)
+    return ([log_path] if log_path.exists() else []) + rotated
+
+
+def iter_log_entries(log_path: Path) -> Iterator[Dict[str, Any]]:
+    """Entries of the scoring log and its rotated segments"""
+    for path in _log_files(log_path):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _full_log_text(entry: Dict[str, Any]) -> Optional[str]:
+    """Text of a log entry, unless the text policy dropped or truncated it"""
+    if entry.get("text_truncated"):
+        return None
+    return entry.get("text")
+
+
+def history_text(
+    history_id: int,
+    log_path: Optional[Path] = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Tuple[str, str, Optional[float]]:
+    """
+    Full text of a history record
+
+    History rows keep only a 500 character preview, so the text is looked
+    up by hash in bulk job items, then in the scoring log; the preview is
+    the last resort.
+
+    Args:
+        history_id: History record id
+        log_path: Scoring log file (default: the configured one)
+        session_factory: Creates database sessions
+
+    Returns:
+        Tuple of text, its source ("job", "log" or "preview") and the
+        stored humanscore
+
+    Raises:
+        LookupError: The record does not exist
+    """
+    db = session_factory()
+    try:
+        record = db.query(ScoringHistory).filter(ScoringHistory.id == history_id).first()
+        if record is None:
+            raise LookupError(f"History record {history_id} not found")
+        item = db.query(ScoringJobItem.text).filter(ScoringJobItem.text_hash == record.text_hash).first()
+    finally:
+        db.close()
+
+    if item is not None:
+        return item.text, "job", record.humanscore
+    for entry in iter_log_entries(log_path or get_logger().log_path):
+        text = _full_log_text(entry)
+        if entry.get("text_hash") == record.text_hash and text:
+            return text, "log", record.humanscore
+    return record.text_preview, "preview", record.humanscore
+
+
+def log_entry_text(line: int, log_path: Optional[Path] = None) -> Tuple[str, Optional[float]]:
+    """
+    Text of the entry on a line (1-based) of a scoring log file
+
+    Returns:
+        Tuple of text and the logged humanscore
+
+    Raises:
+        LookupError: No such line, or its text was not logged in full
+    """
+    path = Path(log_path or get_logger().log_path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for number, content in enumerate(f, start=1):
+            if number == line:
+                entry = json.loads(content)
+                text = _full_log_text(entry)
+                if not text:
+                    raise LookupError(f"Line {line} of {path} has no full text (log text policy)")
+                return text, (entry.get("result") or {}).get("humanscore")
+    raise LookupError(f"{path} has fewer than {line} lines")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Replay a stored request through the profiler and print the report"""
+    parser = argparse.ArgumentParser(prog="python -m api.utils.profiling", description="Profile a stored scoring request")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--history-id", type=int, help="History record to replay")
+    source.add_argument("--log-line", type=int, help="Line (1-based) of the scoring log to replay")
+    parser.add_argument("--log-file", help="Scoring log file (default: SCORING_LOG_FILE)")
+    parser.add_argument("--detail", default="full", choices=("summary", "markers", "full"), help="Result detail level")
+    parser.add_argument("--top", type=int, default=15, help="Hot functions listed")
+    args = parser.parse_args(argv)
+    log_path = Path(args.log_file) if args.log_file else None
+
+    try:
+        if args.history_id is not None:
+            init_db()
+            text, text_source, stored = history_text(args.history_id, log_path)
+        else:
+            text, stored = log_entry_text(args.log_line, log_path)
+            text_source = "log"
+    except LookupError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    result, report = profile_scoring(text, detail=args.detail, top=args.top)
+    print(json.dumps({
+        "text_source": text_source,
+        "stored_humanscore": stored,
+        "humanscore": result["humanscore"],
+        "profile": report,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""
+Fast JSON responses
+Serializes large scoring payloads with orjson when it is installed
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # orjson is optional; fall back to the standard encoder
+    FastJSONResponse = JSONResponse
+
+
+def fast_json(content: Any, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """
+    Build a JSON response without response-model validation
+
+    For payloads the route assembled from engine output, which already
+    has the response model's shape: skips the Pydantic round trip and
+    serializes with orjson when available.
+    """
+    return FastJSONResponse(content, headers=headers)
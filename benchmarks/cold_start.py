@@ -0,0 +1,186 @@
+"""
+Cold-Start Report
+python -m benchmarks.cold_start [--entry api.serverless] [--runs 3] [--json]
+
+Starts a fresh interpreter per run, imports an API entry point, sends it
+one POST /api/v1/score over ASGI and reports the time to that first
+response, split into import time (per top-level package) and request time
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ENTRIES = ("api.serverless", "api.main")
+DEFAULT_TEXT = "Cold starts should stay short. I think this one will, maybe? Let us measure it and see."
+
+# Imports between the markers are the entry's, up to its first response
+# (interpreter startup comes before, background work after)
+_IMPORT_MARKER = "-- cold start: entry import --"
+_RESPONSE_MARKER = "-- cold start: first response --"
+
+# Runs in the fresh interpreter: only modules loaded at interpreter startup
+# are imported before the entry point, so its import report is complete
+_PROBE = """
+import sys, time
+entry, text, marker, response_marker = sys.argv[1:5]
+sys.stderr.write(marker + "\\n")
+started = time.perf_counter()
+app = __import__(entry, fromlist=["app"]).app
+imported = time.perf_counter()
+
+import asyncio, json, os
+
+async def main():
+    events, replies = asyncio.Queue(), asyncio.Queue()
+    lifespan = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, events.get, replies.put))
+    await events.put({"type": "lifespan.startup"})
+    await replies.get()
+    body = json.dumps({"text": text}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/v1/score", "raw_path": b"/api/v1/score", "root_path": "",
+        "query_string": b"", "headers": [(b"content-type", b"application/json"), (b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+    status = []
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    request_started = time.perf_counter()
+    await app(scope, receive, send)
+    finished = time.perf_counter()
+    ended_at = time.time()
+    sys.stderr.write(response_marker + "\\n")
+    print(json.dumps({
+        "status": status[0] if status else None,
+        "import_s": imported - started,
+        "startup_s": request_started - imported,
+        "first_response_s": finished - request_started,
+        "ended_at": ended_at,
+    }), flush=True)
+    # Exit without waiting for background work (history, warm-up), so the
+    # interpreter's lifetime is its time to the first response
+    os._exit(0)
+
+asyncio.run(main())
+"""
+
+
+def throwaway_storage() -> Dict[str, str]:
+    """Environment variables pointing the API at a new temporary database, log file, fingerprint index and metrics directory"""
+    directory = tempfile.mkdtemp(prefix="traceneuro-bench-")
+    return {
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "SCORING_LOG_FILE": os.path.join(directory, "scoring_logs.jsonl"),
+        "FINGERPRINT_INDEX_DIR": os.path.join(directory, "fingerprints"),
+        "METRICS_DIR": os.path.join(directory, "metrics"),
+    }
+
+
+def _package_import_times(stderr: str) -> Dict[str, float]:
+    """Seconds spent importing each top-level package before the first response (-X importtime self times)"""
+    lines = stderr.split(_IMPORT_MARKER, 1)[-1].split(_RESPONSE_MARKER, 1)[0].splitlines()
+    totals: Dict[str, float] = defaultdict(float)
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            totals[name.split(".")[0]] += int(self_us) / 1e6
+    return dict(totals)
+
+
+def probe(entry: str, text: str = DEFAULT_TEXT, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Cold-start one entry point in a fresh interpreter
+
+    Scoring workers are disabled (SCORING_WORKERS=0), as on a serverless
+    platform. The interpreter exits right after the response, before any
+    work the entry point defers; the database is still set up, so point
+    env at throwaway storage (see throwaway_storage).
+
+    Args:
+        entry: Module with an ASGI app attribute, e.g. "api.serverless"
+        text: Text of the score request
+        env: Environment of the interpreter (default: this process's)
+
+    Returns:
+        Dictionary with the response status, cold_start_s (interpreter
+        start to first response), import_s, startup_s, first_response_s
+        and per-package import seconds
+
+    Raises:
+        RuntimeError: The interpreter failed
+    """
+    env = {**(env if env is not None else os.environ), "SCORING_WORKERS": "0"}
+    started_at = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, entry, text, _IMPORT_MARKER, _RESPONSE_MARKER],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    output = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not output:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Cold start of {entry} failed: {' '.join(errors[-3:])}")
+    result = json.loads(output[-1])
+    result["cold_start_s"] = result.pop("ended_at") - started_at
+    result["packages"] = _package_import_times(completed.stderr)
+    return result
+
+
+def report(entry: str, runs: int = 3, text: str = DEFAULT_TEXT, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Cold-start report of an entry point: the run with the fastest cold start
+
+    Returns:
+        Probe result of the fastest run, plus the entry and run count
+    """
+    results = [probe(entry, text, env) for _ in range(runs)]
+    best = min(results, key=lambda result: result["cold_start_s"])
+    return {"entry": entry, "runs": runs, **best}
+
+
+def _print_report(result: Dict[str, Any], top: int):
+    print(f"{result['entry']} (best of {result['runs']}, HTTP {result['status']})")
+    for key in ("cold_start_s", "import_s", "startup_s", "first_response_s"):
+        print(f"  {key:<20} {result[key] * 1000:>10.1f} ms")
+    packages = sorted(result["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+    print("  import time by package:")
+    for name, seconds in packages:
+        print(f"    {name:<28} {seconds * 1000:>8.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print the cold-start report of each entry point"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.cold_start", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entry", action="append", help=f"Entry point module (repeatable; default: {', '.join(ENTRIES)})")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per entry point (the fastest is reported)")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    env = {**os.environ, **throwaway_storage()}
+    reports = [report(entry, args.runs, env=env) for entry in args.entry or ENTRIES]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for result in reports:
+            _print_report(result, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
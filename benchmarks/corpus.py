@@ -0,0 +1,83 @@
+"""
+Synthetic Benchmark Corpus
+Reproducible English-like documents from a tweet up to a 1 MB manuscript
+"""
+
+import random
+from typing import Dict
+
+
+# Document sizes in characters
+CORPUS_SIZES = {
+    "tweet": 280,
+    "paragraph": 1_000,
+    "essay": 10_000,
+    "article": 100_000,
+    "manuscript": 1_000_000,
+}
+
+_SUBJECTS = [
+    "the committee", "my sister", "this theory", "the river", "our data",
+    "the old engine", "every student", "the city", "a quiet reader", "the argument"
+]
+_VERBS = [
+    "explains", "ignores", "follows", "questions", "builds", "describes",
+    "changes", "remembers", "measures", "carries"
+]
+_OBJECTS = [
+    "the results", "a long winter", "the first draft", "several problems",
+    "the market", "an open door", "the evidence", "a strange noise", "the map", "its own rules"
+]
+_HEDGES = ["maybe", "perhaps", "I think", "it seems", "probably", "sort of", "roughly"]
+_TRANSITIONS = ["However,", "Therefore,", "Meanwhile,", "In addition,", "Still,", "Then again,"]
+_METAPHORS = [
+    "is like a journey", "was a bridge between worlds", "is the key to everything",
+    "felt like an ocean of light", "is a foundation of sand"
+]
+_ASIDES = ["in 1998", "for 42 days", "(as usual)", "- or so they say -", "at 7:30"]
+
+
+def _sentence(rng: random.Random) -> str:
+    """One sentence mixing the patterns the markers look for"""
+    roll = rng.random()
+    if roll < 0.15:
+        body = f"{rng.choice(_SUBJECTS)} {rng.choice(_METAPHORS)}"
+    else:
+        body = f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+    if rng.random() < 0.3:
+        body = f"{rng.choice(_HEDGES)} {body}"
+    if rng.random() < 0.25:
+        body = f"{body} {rng.choice(_ASIDES)}"
+    if rng.random() < 0.2:
+        body = f"{body}, and {rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+
+    sentence = body[0].upper() + body[1:]
+    if rng.random() < 0.2:
+        sentence = f"{rng.choice(_TRANSITIONS)} {body}"
+    return sentence + rng.choice([".", ".", ".", "?", "!", ";"])
+
+
+def make_document(size: int, seed: int = 0) -> str:
+    """
+    Synthetic document of about size characters
+
+    Args:
+        size: Target length in characters
+        seed: Random seed; the same size and seed always give the same text
+
+    Returns:
+        Text of sentences grouped into paragraphs, cut to size characters
+    """
+    rng = random.Random(f"{seed}:{size}")
+    parts = []
+    length = 0
+    while length < size:
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(3, 8)))
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(parts)[:size]
+
+
+def make_corpus(seed: int = 0) -> Dict[str, str]:
+    """One document per entry of CORPUS_SIZES"""
+    return {name: make_document(size, seed) for name, size in CORPUS_SIZES.items()}
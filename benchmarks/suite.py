@@ -0,0 +1,253 @@
+"""
+Benchmark Suite
+Times preprocessing, each cognitive marker, the HumanScore engine, the
+/api/v1/score endpoint and cold starts of the API entry points over the
+synthetic corpus, and compares results against a stored baseline
+"""
+
+import itertools
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from benchmarks.cold_start import ENTRIES, probe
+from engine.humanscore.scorer import HumanScoreEngine, ENGINE_VERSION
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.text_processor import TextProcessor
+
+
+# Results file layout version (bump when the case metrics change meaning)
+RESULTS_FORMAT = 1
+
+
+class Case(NamedTuple):
+    """
+    One benchmark: run(setup()) is timed, setup() is not.
+    setup gives each call fresh inputs (e.g. contexts without cached artifacts).
+    """
+    name: str
+    size: str
+    chars: int
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+
+
+def _fresh_context(processed: AnalysisContext) -> AnalysisContext:
+    """Context over the same processed text without derived artifacts or scans"""
+    return AnalysisContext(
+        cleaned=processed["cleaned"],
+        sentences=processed["sentences"],
+        tokens=processed["tokens"],
+        original=processed["original"],
+        sentence_spans=processed.sentence_spans
+    )
+
+
+def _marker_runs(engine: HumanScoreEngine) -> Dict[str, Callable[[List[AnalysisContext]], Any]]:
+    """Batch entry point of each registered marker, called as the engine calls it for full detail"""
+    return {
+        name: lambda contexts, spec=spec, analyzer=analyzer: spec.run(analyzer, contexts, True)
+        for (name, spec), analyzer in zip(engine.markers.items(), engine.analyzers().values())
+    }
+
+
+def _cold_start(entry: str, text: str):
+    result = probe(entry, text)
+    if result["status"] != 200:
+        raise RuntimeError(f"Cold start of {entry} answered {result['status']}")
+
+
+def build_cases(
+    corpus: Dict[str, str],
+    stages: Iterable[str] = ("preprocess", "markers", "engine", "api", "coldstart"),
+    client: Optional[Any] = None
+) -> List[Case]:
+    """
+    Benchmark cases for every document of a corpus
+
+    Args:
+        corpus: Documents by size name (see make_corpus)
+        stages: Stages to include: preprocess, markers, engine, api, coldstart
+        client: Test client of the API app (required for the api stage)
+
+    Returns:
+        Cases named "<stage>/<size>" (markers: "marker.<name>/<size>";
+        engine also "engine.light/<size>", a screening score running only
+        the light markers; coldstart: "coldstart.<entry>/<size>", a fresh interpreter importing
+        an entry point and answering one score request for the smallest
+        document, timed from start to exit)
+    """
+    stages = set(stages)
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    markers = _marker_runs(engine)
+    light = engine.select_markers(max_cost="light")
+    counter = itertools.count()
+
+    def unique_text(text: str) -> str:
+        # A new text on every call, so the result cache never answers
+        return f"{text} Run {next(counter)}."
+
+    def post_score(text: str):
+        response = client.post("/api/v1/score", json={"text": text})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/v1/score returned {response.status_code}: {response.text[:200]}")
+
+    cases = []
+    for size, text in corpus.items():
+        processed = processor.process(text)
+        chars = len(text)
+        if "preprocess" in stages:
+            cases.append(Case(f"preprocess/{size}", size, chars, lambda text=text: text, processor.process))
+        if "markers" in stages:
+            for name, run in markers.items():
+                cases.append(Case(
+                    f"marker.{name}/{size}", size, chars,
+                    lambda processed=processed: [_fresh_context(processed)],
+                    run
+                ))
+        if "engine" in stages:
+            cases.append(Case(
+                f"engine/{size}", size, chars,
+                lambda processed=processed: _fresh_context(processed),
+                engine.score
+            ))
+            cases.append(Case(
+                f"engine.light/{size}", size, chars,
+                lambda processed=processed: _fresh_context(processed),
+                lambda ctx: engine.score(ctx, markers=light)
+            ))
+        if "api" in stages:
+            if client is None:
+                raise ValueError("The api stage needs a test client")
+            cases.append(Case(f"api/{size}", size, chars, lambda text=text: unique_text(text), post_score))
+    if "coldstart" in stages and corpus:
+        size, text = min(corpus.items(), key=lambda item: len(item[1]))
+        for entry in ENTRIES:
+            cases.append(Case(
+                f"coldstart.{entry.rsplit('.', 1)[-1]}/{size}", size, len(text),
+                lambda text=text: text,
+                lambda text, entry=entry: _cold_start(entry, text)
+            ))
+    return cases
+
+
+def _sample(case: Case, number: int) -> float:
+    """Seconds per call over number calls"""
+    inputs = [case.setup() for _ in range(number)]
+    start = time.perf_counter()
+    for value in inputs:
+        case.run(value)
+    return (time.perf_counter() - start) / number
+
+
+def measure(case: Case, repeats: int = 5, min_sample_time: float = 0.1) -> Dict[str, Any]:
+    """
+    Time a case
+
+    The calls per sample double until a sample lasts min_sample_time (these
+    calibration samples double as warm-up), then repeats samples are taken.
+
+    Args:
+        case: Benchmark case
+        repeats: Timed samples
+        min_sample_time: Shortest sample in seconds (fast cases loop)
+
+    Returns:
+        Median, min and max seconds per call, throughput and sample counts
+    """
+    number = 1
+    while True:
+        per_call = _sample(case, number)
+        if per_call * number >= min_sample_time or number >= 1 << 16:
+            break
+        number *= 2
+
+    times = [_sample(case, number) for _ in range(repeats)]
+    median = statistics.median(times)
+    return {
+        "size": case.size,
+        "chars": case.chars,
+        "median_s": median,
+        "min_s": min(times),
+        "max_s": max(times),
+        "docs_per_s": 1.0 / median if median > 0 else None,
+        "mb_per_s": case.chars / 1e6 / median if median > 0 else None,
+        "repeats": repeats,
+        "number": number,
+    }
+
+
+def run_suite(
+    cases: List[Case],
+    repeats: int = 5,
+    min_sample_time: float = 0.1,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Measure every case
+
+    Returns:
+        Results document: environment description plus per-case measurements
+    """
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, repeats, min_sample_time)
+        if progress is not None:
+            progress(case.name, results[case.name])
+    return {
+        "format": RESULTS_FORMAT,
+        "engine_version": ENGINE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cases": results,
+    }
+
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.25
+) -> Dict[str, Any]:
+    """
+    Compare latencies with a baseline
+
+    Cases are compared by their fastest sample: noise from other processes
+    only ever adds time, so the minimum is the most repeatable measurement.
+
+    Args:
+        current: Results of run_suite
+        baseline: Stored results of an earlier run
+        tolerance: Allowed slowdown as a fraction of the baseline time
+            (0.25 = up to 25% slower passes)
+
+    Returns:
+        Dictionary with per-case ratios (current / baseline), the cases
+        slower than tolerance allows, the faster ones, and cases missing
+        from either side
+    """
+    current_cases = current.get("cases", {})
+    baseline_cases = baseline.get("cases", {})
+    ratios, regressions, improvements = {}, [], []
+    for name, measured in current_cases.items():
+        reference = baseline_cases.get(name)
+        if reference is None or not reference.get("min_s"):
+            continue
+        ratio = measured["min_s"] / reference["min_s"]
+        ratios[name] = ratio
+        if ratio > 1.0 + tolerance:
+            regressions.append(name)
+        elif ratio < 1.0 / (1.0 + tolerance):
+            improvements.append(name)
+    return {
+        "tolerance": tolerance,
+        "ratios": ratios,
+        "regressions": regressions,
+        "improvements": improvements,
+        "new": sorted(set(current_cases) - set(baseline_cases)),
+        "missing": sorted(set(baseline_cases) - set(current_cases)),
+    }
@@ -0,0 +1,11 @@
+"""
+Bulk scorer command line: python -m engine --help (see engine.bulk)
+"""
+
+import sys
+
+from engine.bulk import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
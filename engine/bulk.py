@@ -0,0 +1,524 @@
+"""
+Bulk Scorer
+Offline scoring of text files, directories and JSONL corpora with a pool of
+worker processes, streaming JSONL or CSV results
+
+Usage:
+    python -m engine corpus.jsonl -o scores.jsonl
+    python -m engine essays/ --pattern "**/*.txt" --format csv -o scores.csv
+    cat corpus.jsonl | python -m engine --workers 4 | jq .humanscore
+    python -m engine corpus.jsonl --markers cadence,stylometry -o screening.csv
+
+Input files are read through memory mapping, one record at a time. With an
+output file, progress is checkpointed next to it and --resume continues an
+interrupted run where its last checkpoint left off.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import io
+import json
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from engine.humanscore.registry import COST_CLASSES
+from engine.humanscore.scorer import DETAIL_LEVELS
+from engine.runtime import get_engine, get_processor
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard encoder
+    orjson = None
+
+
+# Checkpoint file layout version
+CHECKPOINT_FORMAT = 1
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson", ".json")
+
+# (sequence number, loader of (id, text)); loading is deferred so records
+# finished before a resume are skipped without being read or parsed
+Record = Tuple[int, Callable[[], Tuple[str, str]]]
+
+# (sequence number, id, score dictionary or None, error or None)
+Outcome = Tuple[int, str, Optional[Dict[str, Any]], Optional[str]]
+
+
+class InputError(ValueError):
+    """Raised when an input cannot be read as requested"""
+
+    def __init__(self, message: str, record_id: Optional[str] = None):
+        super().__init__(message)
+        self.record_id = record_id
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    """Read-only mapping of a file (None for an empty file, which cannot be mapped)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_text(path: Path) -> str:
+    mapped = _map(path)
+    if mapped is None:
+        return ""
+    with mapped:
+        return str(mapped, "utf-8")
+
+
+def _parse_line(line: bytes, line_number: int, name: str) -> Tuple[str, str]:
+    """Id and text of a JSONL line: a {"text": ..., "id": ...} object or a JSON string"""
+    default_id = f"{name}:{line_number}"
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise InputError(f"{name} line {line_number}: invalid JSON ({e})", default_id)
+    text = record.get("text") if isinstance(record, dict) else record
+    if not isinstance(text, str):
+        raise InputError(f"{name} line {line_number}: no text", default_id)
+    record_id = record.get("id") if isinstance(record, dict) else None
+    return str(record_id if record_id is not None else default_id), text
+
+
+def _jsonl_lines(stream: Iterable[bytes], name: str) -> Iterator[Callable[[], Tuple[str, str]]]:
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield lambda line=line, line_number=line_number: _parse_line(line, line_number, name)
+
+
+def _mapped_lines(path: Path) -> Iterator[bytes]:
+    """Lines of a file, read from a memory mapping one at a time"""
+    mapped = _map(path)
+    if mapped is None:
+        return
+    with mapped:
+        yield from iter(mapped.readline, b"")
+
+
+def _source(name: str, input_format: str, pattern: str) -> Iterator[Callable[[], Tuple[str, str]]]:
+    """Record loaders of one input: a directory, a file or "-" for stdin"""
+    if name == "-":
+        if input_format == "text":
+            text = sys.stdin.buffer.read().decode("utf-8")
+            yield lambda: ("-", text)
+        else:
+            yield from _jsonl_lines(sys.stdin.buffer, "stdin")
+        return
+
+    path = Path(name)
+    if path.is_dir():
+        for file in sorted(p for p in path.glob(pattern) if p.is_file()):
+            yield lambda file=file: (str(file.relative_to(path)), _read_text(file))
+    elif path.is_file():
+        is_jsonl = input_format == "jsonl" or (input_format == "auto" and path.suffix.lower() in JSONL_SUFFIXES)
+        if is_jsonl:
+            yield from _jsonl_lines(_mapped_lines(path), path.name)
+        else:
+            yield lambda: (path.name, _read_text(path))
+    else:
+        raise InputError(f"No such file or directory: {name}")
+
+
+def read_records(inputs: List[str], input_format: str = "auto", pattern: str = "*.txt") -> Iterator[Record]:
+    """
+    Records of every input, numbered in input order
+
+    Args:
+        inputs: Directories (their files matching pattern, sorted), text or
+            JSONL files, or "-" for stdin
+        input_format: auto (JSONL for .jsonl/.ndjson/.json files and stdin,
+            otherwise one text per file), jsonl, or text (a file or stdin
+            is one text)
+        pattern: Glob of the files read from directories
+
+    Returns:
+        Iterator of (sequence number, loader) records
+    """
+    sequence = 0
+    for name in inputs:
+        for load in _source(name, input_format, pattern):
+            yield sequence, load
+            sequence += 1
+
+
+def score_items(
+    items: List[Tuple[int, str, str]],
+    detail: str = "summary",
+    markers: Optional[Tuple[str, ...]] = None
+) -> List[Outcome]:
+    """
+    Score texts with the process-wide engine (runs in a worker process)
+
+    A failing batch is scored again one text at a time, so one bad text
+    only fails itself.
+
+    Args:
+        items: (sequence number, id, text) tuples
+        detail: Result detail level (see DETAIL_LEVELS)
+        markers: Markers to run (default: all)
+
+    Returns:
+        One outcome per item, in order
+    """
+    if not items:
+        return []
+    processor = get_processor()
+    engine = get_engine()
+    try:
+        results = engine.score_batch([processor.process(text) for _, _, text in items], detail=detail, markers=markers)
+        return [(sequence, record_id, result, None) for (sequence, record_id, _), result in zip(items, results)]
+    except Exception:
+        if len(items) == 1:
+            raise
+    outcomes = []
+    for item in items:
+        try:
+            outcomes.extend(score_items([item], detail, markers))
+        except Exception as e:
+            outcomes.append((item[0], item[1], None, str(e)))
+    return outcomes
+
+
+class Checkpoint:
+    """
+    Sequence numbers of the records already written, and the output size
+    that goes with them.
+
+    Kept as a watermark (every record below it is done) plus the few done
+    records above it, so the file stays small however long the run.
+    """
+
+    def __init__(self, path: Optional[Path], signature: Dict[str, Any]):
+        """
+        Initialize checkpoint
+
+        Args:
+            path: Checkpoint file (None keeps progress in memory only)
+            signature: Settings a resumed run must share with the original
+        """
+        self.path = path
+        self.signature = signature
+        self.watermark = 0
+        self.done = set()
+        self.output_bytes = 0
+        self.counters = {"scored": 0, "errors": 0}
+
+    def is_done(self, sequence: int) -> bool:
+        return sequence < self.watermark or sequence in self.done
+
+    def mark(self, sequence: int, error: bool):
+        self.done.add(sequence)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+        self.counters["errors" if error else "scored"] += 1
+
+    def save(self, output_bytes: int):
+        """Write the checkpoint atomically (after the output up to output_bytes is flushed)"""
+        self.output_bytes = output_bytes
+        if self.path is None:
+            return
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({
+            "format": CHECKPOINT_FORMAT,
+            "signature": self.signature,
+            "watermark": self.watermark,
+            "done": sorted(self.done),
+            "output_bytes": output_bytes,
+            "counters": self.counters,
+        }))
+        os.replace(temporary, self.path)
+
+    def load(self):
+        """
+        Restore progress from the checkpoint file
+
+        Raises:
+            InputError: The checkpoint belongs to a run with other settings
+        """
+        state = json.loads(self.path.read_text())
+        if state.get("format") != CHECKPOINT_FORMAT or state.get("signature") != self.signature:
+            raise InputError(f"{self.path} was written by a run with other inputs or settings")
+        self.watermark = state["watermark"]
+        self.done = set(state["done"])
+        self.output_bytes = state["output_bytes"]
+        self.counters = state["counters"]
+
+
+def _encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content).encode("utf-8")
+
+
+class ResultWriter:
+    """Writes outcomes as JSONL lines or CSV rows to a binary stream"""
+
+    def __init__(self, stream: BinaryIO, output_format: str, markers: List[str]):
+        """
+        Initialize result writer
+
+        Args:
+            stream: Binary output stream
+            output_format: jsonl (id plus the score dictionary, or the error)
+                or csv (id, humanscore, one column per marker, error)
+            markers: Breakdown columns of CSV rows
+        """
+        self.stream = stream
+        self.output_format = output_format
+        self.markers = markers
+
+    def _csv_row(self, values: List[Any]) -> bytes:
+        line = io.StringIO()
+        csv.writer(line).writerow(values)
+        return line.getvalue().encode("utf-8")
+
+    def header(self):
+        if self.output_format == "csv":
+            self.stream.write(self._csv_row(["id", "humanscore", *self.markers, "error"]))
+
+    def write(self, outcome: Outcome):
+        _, record_id, result, error = outcome
+        if self.output_format == "csv":
+            breakdown = result["breakdown"] if result is not None else {}
+            self.stream.write(self._csv_row([
+                record_id,
+                result["humanscore"] if result is not None else "",
+                *(breakdown.get(marker, "") for marker in self.markers),
+                error or ""
+            ]))
+        elif result is not None:
+            self.stream.write(_encode_json({"id": record_id, **result}) + b"\n")
+        else:
+            self.stream.write(_encode_json({"id": record_id, "error": error}) + b"\n")
+
+
+def _batches(records: Iterable[Record], checkpoint: Checkpoint, batch_size: int) -> Iterator[List[Tuple[int, str, Any]]]:
+    """Batches of (sequence number, id, text) of the records not done yet (the error in place of the text of unreadable ones)"""
+    batch = []
+    for sequence, load in records:
+        if checkpoint.is_done(sequence):
+            continue
+        try:
+            record_id, text = load()
+        except (InputError, UnicodeDecodeError) as e:
+            record_id, text = getattr(e, "record_id", None) or f"#{sequence}", e
+        batch.append((sequence, record_id, text))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(
+    records: Iterable[Record],
+    writer: ResultWriter,
+    checkpoint: Checkpoint,
+    workers: int = 0,
+    batch_size: int = 16,
+    detail: str = "summary",
+    order: str = "input",
+    checkpoint_every: int = 1000,
+    markers: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """
+    Score records and write their outcomes
+
+    Batches are scored by a pool of worker processes with at most two
+    batches per worker in flight, so input is read only as fast as it is
+    scored. In input order, finished batches wait until every earlier
+    record is written (reading pauses while too many wait); in completion
+    order they are written as they finish.
+
+    Args:
+        records: Output of read_records
+        writer: Result writer
+        checkpoint: Progress; done records are skipped
+        workers: Worker processes (0 scores in this process)
+        batch_size: Texts per task
+        detail: Result detail level
+        order: input or completion
+        checkpoint_every: Outcomes between checkpoints
+        markers: Markers to run (default: all)
+
+    Returns:
+        Throughput summary: texts processed, texts scored (without errors),
+        characters, errors, skipped records, seconds, texts per second and
+        MB per second
+    """
+    started = time.perf_counter()
+    skipped = checkpoint.watermark + len(checkpoint.done)
+    totals = {"texts": 0, "scored": 0, "chars": 0, "errors": 0}
+    waiting: Dict[int, Outcome] = {}
+    max_waiting = 8 * max(workers, 1) * batch_size
+    since_checkpoint = 0
+    next_sequence = checkpoint.watermark
+
+    def save():
+        writer.stream.flush()
+        checkpoint.save(writer.stream.tell() if writer.stream.seekable() else 0)
+
+    def emit(outcome: Outcome):
+        nonlocal since_checkpoint
+        writer.write(outcome)
+        checkpoint.mark(outcome[0], outcome[3] is not None)
+        totals["texts"] += 1
+        totals["scored"] += outcome[3] is None
+        totals["errors"] += outcome[3] is not None
+        since_checkpoint += 1
+        if since_checkpoint >= checkpoint_every:
+            save()
+            since_checkpoint = 0
+
+    def finished(outcomes: List[Outcome]):
+        nonlocal next_sequence
+        if order == "completion":
+            for outcome in outcomes:
+                emit(outcome)
+            return
+        for outcome in outcomes:
+            waiting[outcome[0]] = outcome
+        while next_sequence in waiting or checkpoint.is_done(next_sequence):
+            if next_sequence in waiting:
+                emit(waiting.pop(next_sequence))
+            next_sequence += 1
+
+    def readable(batch: List[Tuple[int, str, Any]]) -> List[Tuple[int, str, str]]:
+        """Texts of a batch; records that could not be read are written as errors"""
+        finished([(sequence, record_id, None, str(text)) for sequence, record_id, text in batch if not isinstance(text, str)])
+        items = [item for item in batch if isinstance(item[2], str)]
+        totals["chars"] += sum(len(text) for _, _, text in items)
+        return items
+
+    try:
+        if workers <= 0:
+            for batch in _batches(records, checkpoint, batch_size):
+                finished(score_items(readable(batch), detail, markers))
+        else:
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                pending = set()
+                for batch in _batches(records, checkpoint, batch_size):
+                    items = readable(batch)
+                    if items:
+                        pending.add(pool.submit(score_items, items, detail, markers))
+                    while pending and (len(pending) >= 2 * workers or len(waiting) >= max_waiting):
+                        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            finished(future.result())
+                for future in concurrent.futures.as_completed(pending):
+                    finished(future.result())
+    finally:
+        save()
+
+    seconds = time.perf_counter() - started
+    return {
+        **totals,
+        "skipped": skipped,
+        "seconds": seconds,
+        "texts_per_s": totals["texts"] / seconds if seconds > 0 else None,
+        "mb_per_s": totals["chars"] / 1e6 / seconds if seconds > 0 else None,
+    }
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m engine", description="Score texts offline and stream the results")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="Directories, text or JSONL files, - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="Results file (default: stdout)")
+    parser.add_argument("--format", default=None, choices=("jsonl", "csv"), help="Output format (default: from the output suffix, else jsonl)")
+    parser.add_argument("--order", default="input", choices=("input", "completion"), help="Result order")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 scores inline)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Texts per worker task")
+    parser.add_argument("--detail", default="summary", choices=DETAIL_LEVELS, help="Result detail level")
+    parser.add_argument("--markers", help="Comma-separated markers to run (default: all registered markers)")
+    parser.add_argument("--max-cost", choices=COST_CLASSES, help="Run only markers of this cost class or cheaper")
+    parser.add_argument("--input-format", default="auto", choices=("auto", "jsonl", "text"), help="How input files and stdin are read")
+    parser.add_argument("--pattern", default="*.txt", help="Glob of the files read from directories")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint for an output file)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Results between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    parser.add_argument("--quiet", action="store_true", help="No throughput report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the bulk scorer; returns the process exit status (1 when texts failed, 2 on bad input)"""
+    args = _parse_args(argv)
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    to_stdout = args.output == "-"
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else (None if to_stdout else Path(args.output + ".checkpoint"))
+
+    engine = get_engine()
+    try:
+        markers = engine.select_markers(args.markers.split(",") if args.markers else None, args.max_cost)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    signature = {
+        "inputs": [name if name == "-" else str(Path(name).resolve()) for name in args.inputs],
+        "input_format": args.input_format,
+        "pattern": args.pattern,
+        "format": output_format,
+        "order": args.order,
+        "detail": args.detail,
+        "config_key": engine.config_key_for(markers),
+    }
+    checkpoint = Checkpoint(checkpoint_path, signature)
+    try:
+        if args.resume and checkpoint_path is not None and checkpoint_path.exists():
+            checkpoint.load()
+    except InputError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    resumed = checkpoint.watermark > 0 or bool(checkpoint.done)
+
+    if to_stdout:
+        stream = sys.stdout.buffer
+    elif resumed and not Path(args.output).exists():
+        print(f"Cannot resume: {args.output} does not exist", file=sys.stderr)
+        return 2
+    elif resumed:
+        stream = open(args.output, "r+b")
+        # Drop results written after the checkpoint; they are scored again
+        stream.truncate(checkpoint.output_bytes)
+        stream.seek(checkpoint.output_bytes)
+    else:
+        stream = open(args.output, "wb")
+
+    writer = ResultWriter(stream, output_format, list(markers))
+    try:
+        if not resumed:
+            writer.header()
+        summary = run(
+            read_records(args.inputs, args.input_format, args.pattern), writer, checkpoint,
+            workers=args.workers, batch_size=args.batch_size, detail=args.detail,
+            order=args.order, checkpoint_every=args.checkpoint_every, markers=markers
+        )
+    except InputError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # The reader went away (e.g. | head); stop quietly, without a final flush to the closed pipe
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if not to_stdout:
+            stream.close()
+
+    if not args.quiet:
+        print(
+            f"Scored {summary['scored']} texts ({summary['chars'] / 1e6:.2f} MB) in {summary['seconds']:.2f} s: "
+            f"{summary['texts_per_s'] or 0:.1f} texts/s, {summary['mb_per_s'] or 0:.2f} MB/s, "
+            f"{summary['errors']} errors, {summary['skipped']} skipped (resumed)",
+            file=sys.stderr
+        )
+    return 1 if summary["errors"] else 0
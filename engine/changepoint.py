@@ -0,0 +1,99 @@
+"""
+Change Point Detection
+PELT (Pruned Exact Linear Time) segmentation of per-sentence marker series
+"""
+
+from typing import List, Optional
+import numpy as np
+
+
+def standardize(series: np.ndarray) -> np.ndarray:
+    """
+    Z-score each column of a (n, d) series, dropping constant columns
+
+    Returns:
+        Standardized (n, d') series
+    """
+    series = np.asarray(series, dtype=float).reshape(len(series), -1)
+    if not len(series):
+        return series
+    std = series.std(axis=0)
+    keep = std > 0
+    return (series[:, keep] - series[:, keep].mean(axis=0)) / std[keep]
+
+
+def pelt(
+    series: np.ndarray,
+    penalty: Optional[float] = None,
+    min_size: int = 2
+) -> List[int]:
+    """
+    Detect changes in mean of a (multivariate) series with PELT
+
+    Segments are scored with the Gaussian change-in-mean cost (sum of
+    squared deviations from the segment mean), evaluated in O(1) from
+    prefix sums. Candidates that can no longer start an optimal last
+    segment are pruned, so the run time is close to linear in the length
+    of the series.
+
+    Args:
+        series: Array (n,) or (n, d), ideally standardized
+        penalty: Cost of adding a change point (default: BIC-like 2 * d * log(n))
+        min_size: Minimum number of items between change points
+
+    Returns:
+        Sorted indices where a new segment starts (0 and n excluded)
+    """
+    series = np.asarray(series, dtype=float).reshape(len(series), -1)
+    n, d = series.shape
+    min_size = max(1, min_size)
+    if n < 2 * min_size or d == 0:
+        return []
+    if penalty is None:
+        penalty = 2.0 * d * np.log(n)
+
+    # Segment cost from prefix sums: sum of squares minus |sum|^2 / length,
+    # with |P_end - P_start|^2 expanded so each step is one matrix-vector product
+    prefix = np.vstack([np.zeros(d), np.cumsum(series, axis=0)])
+    prefix_sq = np.concatenate(([0.0], np.cumsum((series ** 2).sum(axis=1))))
+    prefix_norm = (prefix ** 2).sum(axis=1)
+
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last_change = np.zeros(n + 1, dtype=np.int64)
+
+    # Candidate start positions of the last segment, with their prefix rows kept
+    # contiguous; the buffers grow by one row per step and shrink when pruned
+    candidates = np.zeros(n + 1, dtype=np.int64)
+    rows = np.zeros((n + 1, d))
+    n_candidates = 1
+
+    for end in range(min_size, n + 1):
+        # Positions that became admissible as the start of the last segment
+        if end >= 2 * min_size:
+            candidates[n_candidates] = end - min_size
+            rows[n_candidates] = prefix[end - min_size]
+            n_candidates += 1
+
+        starts = candidates[:n_candidates]
+        sum_sq = prefix_norm[end] - 2 * (rows[:n_candidates] @ prefix[end]) + prefix_norm[starts]
+        costs = prefix_sq[end] - prefix_sq[starts] - sum_sq / (end - starts)
+        totals = best[starts] + costs + penalty
+        i = int(np.argmin(totals))
+        best[end] = totals[i]
+        last_change[end] = starts[i]
+
+        # Prune candidates that cannot be optimal for any later end
+        keep = totals - penalty <= best[end]
+        if not keep.all():
+            kept = int(keep.sum())
+            candidates[:kept] = starts[keep]
+            rows[:kept] = rows[:n_candidates][keep]
+            n_candidates = kept
+
+    changes = []
+    position = last_change[n]
+    while position > 0:
+        changes.append(int(position))
+        position = last_change[position]
+    return sorted(changes)
@@ -0,0 +1 @@
+"""Near-duplicate detection package"""
@@ -0,0 +1,116 @@
+"""
+MinHash Signatures and LSH Buckets
+Estimates Jaccard similarity of documents' token shingles and finds
+near-duplicate candidates through banded locality-sensitive hashing
+"""
+
+import hashlib
+import zlib
+from typing import List, Sequence
+
+import numpy as np
+
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Shingles permuted at a time: bounds the (block, num_perm) temporaries
+SIGNATURE_BLOCK_ROWS = 8192
+
+
+class MinHasher:
+    """
+    MinHash over word shingles (runs of shingle_size consecutive tokens).
+
+    Two signatures agree at a position with probability equal to the
+    Jaccard similarity of the documents' shingle sets. Splitting the
+    signature into bands of rows and hashing each band gives LSH bucket
+    keys: documents sharing any bucket are candidates, which finds pairs
+    above roughly (1 / bands) ** (1 / rows) similarity in sublinear time.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, bands: int = 32, seed: int = 1):
+        """
+        Initialize MinHasher
+
+        Args:
+            num_perm: Signature length (number of hash permutations)
+            shingle_size: Tokens per shingle
+            bands: LSH bands (must divide num_perm)
+            seed: Seed of the permutations; signatures are only comparable
+                between hashers with the same settings
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    @property
+    def settings_key(self) -> str:
+        """Identifies the hasher settings signatures were computed with"""
+        return f"minhash-{self.num_perm}-{self.shingle_size}-{self.bands}"
+
+    def shingle_hashes(self, tokens: Sequence[str]) -> np.ndarray:
+        """32-bit hashes of the distinct shingles (whole text for very short token lists)"""
+        size = min(self.shingle_size, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        MinHash signature of a token sequence
+
+        Args:
+            tokens: Document tokens (e.g. from TextProcessor.tokenize)
+
+        Returns:
+            uint32 array of length num_perm
+        """
+        hashes = self.shingle_hashes(tokens)
+        # Permuted hashes of SIGNATURE_BLOCK_ROWS shingles at a time, folded
+        # into a running minimum; wrap-around in uint64 is part of the hash
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), SIGNATURE_BLOCK_ROWS):
+            permuted = np.outer(hashes[start:start + SIGNATURE_BLOCK_ROWS], self._a)
+            permuted += self._b
+            permuted %= _PRIME
+            permuted &= _MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+    def buckets(self, signature: np.ndarray) -> List[int]:
+        """
+        LSH bucket keys of a signature, one per band
+
+        Keys include the band number, so one indexed column holds every
+        band; they fit a signed 64-bit database integer.
+        """
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(band.to_bytes(2, "little") + rows.tobytes(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "little") >> 1)
+        return keys
+
+
+def signature_similarity(signature: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity between a signature and candidate signatures
+
+    Args:
+        signature: Signature (num_perm,)
+        candidates: Signatures (n, num_perm)
+
+    Returns:
+        Fraction of agreeing positions for each candidate
+    """
+    if not len(candidates):
+        return np.zeros(0)
+    return (np.asarray(candidates) == signature).mean(axis=1)
@@ -0,0 +1,396 @@
+"""
+Sentence Embedding Backends
+Batched sentence encoders behind one interface: a deterministic hashing
+model (no download, used by tests), sentence-transformers, and an ONNX
+Runtime CPU backend with optional int8 quantization, plus a wrapper that
+serves repeated sentences from the persistent embedding cache
+"""
+
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from engine.embeddings.cache import EmbeddingCache, sentence_key
+
+
+def length_sorted_batches(lengths: Sequence[int], batch_size: int) -> List[np.ndarray]:
+    """
+    Group item indices into batches of similar length
+
+    Transformer batches are padded to their longest item, so sorting by
+    length before batching keeps padding (wasted CPU work) small.
+
+    Args:
+        lengths: Length of each item (characters or tokens)
+        batch_size: Maximum items per batch
+
+    Returns:
+        Index arrays, one per batch, covering every item once
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    return [order[i:i + batch_size] for i in range(0, len(order), max(1, batch_size))]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (all-zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingBackend:
+    """
+    Base class of sentence embedding backends.
+
+    encode() embeds any number of sentences in length-sorted batches of
+    batch_size and returns the rows in input order. Subclasses implement
+    _encode_batch and, for real models, _load (called once, on first use).
+    """
+
+    name = "base"
+
+    def __init__(self, batch_size: int = 64):
+        self.batch_size = max(1, batch_size)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the model and settings (part of the engine config key)"""
+        return self.name
+
+    def load(self):
+        """Load the model if it is not loaded yet (thread-safe, once per backend)"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+
+    def _load(self):
+        """Load model weights (no-op for backends without a model)"""
+
+    def encode(self, sentences: Sequence[str]) -> np.ndarray:
+        """
+        Embed sentences with batched inference
+
+        Args:
+            sentences: Sentence strings
+
+        Returns:
+            Unit-length embeddings (n_sentences, dim) as float32, in input order
+        """
+        self.load()
+        if not len(sentences):
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        embeddings = None
+        for batch in length_sorted_batches([len(s) for s in sentences], self.batch_size):
+            vectors = self._encode_batch([sentences[i] for i in batch])
+            if embeddings is None:
+                embeddings = np.empty((len(sentences), vectors.shape[1]), dtype=np.float32)
+            embeddings[batch] = vectors
+        return embeddings
+
+    @property
+    def dim(self) -> int:
+        raise NotImplementedError
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+@lru_cache(maxsize=200000)
+def _hash_feature(token: str, dim: int) -> tuple:
+    """Bucket and sign of a token (stable across processes, unlike hash())"""
+    value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic local embedding model for tests and offline use.
+
+    Signed feature hashing of lowercased words and character trigrams into
+    dim buckets, L2-normalized. Sentences sharing vocabulary get similar
+    vectors; nothing is downloaded and results never change between runs.
+    """
+
+    name = "hashing"
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, dim: int = 256, batch_size: int = 256):
+        super().__init__(batch_size)
+        self._dim = dim
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing-{self._dim}"
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def _tokens(self, sentence: str) -> List[str]:
+        """Words plus the character trigrams of each padded word"""
+        words = self._WORD.findall(sentence.lower())
+        tokens = list(words)
+        for word in words:
+            padded = f"<{word}>"
+            tokens.extend("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+        return tokens
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        rows, cols, signs = [], [], []
+        for row, sentence in enumerate(sentences):
+            for token in self._tokens(sentence):
+                col, sign = _hash_feature(token, self._dim)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+
+        vectors = np.zeros((len(sentences), self._dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)), signs)
+        return _normalize(vectors)
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Embeddings from a sentence-transformers model (e.g. all-MiniLM-L6-v2) on CPU"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", batch_size: int = 64, device: str = "cpu"):
+        super().__init__(batch_size)
+        self.model_name = model_name
+        self.device = device
+        self.model = None
+
+    @property
+    def model_id(self) -> str:
+        return f"st-{self.model_name}"
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+
+    @property
+    def dim(self) -> int:
+        self.load()
+        return self.model.get_sentence_embedding_dimension()
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        return self.model.encode(
+            sentences,
+            batch_size=len(sentences),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
+
+
+def quantize_onnx_model(model_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Write a dynamically int8-quantized copy of an ONNX model (once)
+
+    Args:
+        model_path: Float ONNX model
+        output_path: Target path (default: <model>.int8.onnx next to the model)
+
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = Path(model_path)
+    target = Path(output_path) if output_path else source.with_suffix(".int8.onnx")
+    if not target.exists():
+        quantize_dynamic(str(source), str(target), weight_type=QuantType.QInt8)
+    return str(target)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeddings from a transformer exported to ONNX, run with ONNX Runtime on CPU.
+
+    Token embeddings are mean-pooled over the attention mask and normalized,
+    matching sentence-transformers pooling. With quantize=True the model is
+    converted to dynamic int8 weights on first load, which is typically
+    2-3x faster on CPU for a small loss of precision.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        max_length: int = 128,
+        quantize: bool = False,
+        threads: int = 0
+    ):
+        super().__init__(batch_size)
+        self.model_path = model_path
+        self.tokenizer_name = tokenizer_name
+        self.max_length = max_length
+        self.quantize = quantize
+        self.threads = threads
+        self.session = None
+        self.tokenizer = None
+        self._dim: Optional[int] = None
+
+    @property
+    def model_id(self) -> str:
+        return f"onnx-{Path(self.model_path).stem}{'-int8' if self.quantize else ''}"
+
+    def _load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = quantize_onnx_model(self.model_path) if self.quantize else self.model_path
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = self.encode(["dimension probe"]).shape[1]
+        return self._dim
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        # Pad only to the longest sentence of this (length-sorted) batch
+        inputs = self.tokenizer(
+            sentences,
+            padding="longest",
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self._input_names}
+        output = self.session.run(None, feed)[0]
+        if output.ndim == 3:
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalize(output.astype(np.float32))
+
+
+class CachedEmbeddingBackend(EmbeddingBackend):
+    """
+    Wraps a backend with the persistent sentence embedding cache; only
+    sentences missing from the cache (deduplicated) reach the model.
+    """
+
+    def __init__(self, backend: EmbeddingBackend, directory: str, max_entries: int = 1_000_000):
+        super().__init__(backend.batch_size)
+        self.backend = backend
+        self.directory = directory
+        self.max_entries = max_entries
+        self.cache: Optional[EmbeddingCache] = None
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    @property
+    def model_id(self) -> str:
+        return self.backend.model_id
+
+    @property
+    def dim(self) -> int:
+        return self.backend.dim
+
+    def _load(self):
+        self.backend.load()
+        self.cache = EmbeddingCache(self.directory, self.model_id, self.backend.dim, self.max_entries)
+
+    def encode(self, sentences: Sequence[str]) -> np.ndarray:
+        self.load()
+        keys = [sentence_key(s, self.model_id) for s in sentences]
+        vectors, missing = self.cache.get_many(keys)
+        if missing:
+            unique: Dict[bytes, int] = {}
+            for i in missing:
+                unique.setdefault(keys[i], i)
+            fresh = self.backend.encode([sentences[i] for i in unique.values()])
+            self.cache.put_many(list(unique), fresh)
+            by_key = dict(zip(unique, fresh))
+            for i in missing:
+                vectors[i] = by_key[keys[i]]
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics (empty until the first encode)"""
+        return self.cache.stats() if self.cache is not None else {}
+
+
+# Backend names accepted by EMBEDDING_BACKEND
+BACKENDS = ("hashing", "sentence-transformers", "onnx")
+
+# Global backend instance (one model per process)
+_backend_instance: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_embedding_backend(name: str, **settings: Any) -> EmbeddingBackend:
+    """
+    Build an embedding backend by name
+
+    Raises:
+        ValueError: Unknown backend name
+    """
+    if name == "hashing":
+        return HashingEmbeddingBackend(**settings)
+    if name == "sentence-transformers":
+        return SentenceTransformerBackend(**settings)
+    if name == "onnx":
+        return OnnxEmbeddingBackend(**settings)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def _settings_from_env(name: str) -> Dict[str, Any]:
+    """Backend keyword arguments from the environment"""
+    batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    if name == "hashing":
+        return {"dim": int(os.getenv("EMBEDDING_DIM", "256")), "batch_size": batch_size}
+    if name == "sentence-transformers":
+        return {"model_name": os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"), "batch_size": batch_size}
+    return {
+        "model_path": os.getenv("EMBEDDING_ONNX_PATH", "models/all-MiniLM-L6-v2.onnx"),
+        "tokenizer_name": os.getenv("EMBEDDING_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2"),
+        "batch_size": batch_size,
+        "quantize": os.getenv("EMBEDDING_QUANTIZE", "1").lower() in ("1", "true", "yes"),
+        "threads": int(os.getenv("EMBEDDING_THREADS", "0")),
+    }
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    Get or create the process-wide embedding backend (EMBEDDING_BACKEND,
+    default sentence-transformers), wrapped with the persistent sentence
+    cache when EMBEDDING_CACHE_DIR is set. The model loads on first encode.
+    """
+    global _backend_instance
+    if _backend_instance is None:
+        with _backend_lock:
+            if _backend_instance is None:
+                name = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+                backend = create_embedding_backend(name, **_settings_from_env(name))
+                cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "")
+                if cache_dir:
+                    backend = CachedEmbeddingBackend(
+                        backend,
+                        cache_dir,
+                        max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+                    )
+                _backend_instance = backend
+    return _backend_instance
@@ -0,0 +1,295 @@
+"""
+Sentence Embedding Cache
+Persistent, process-shared cache of sentence embeddings, keyed by a hash of
+the normalized sentence and the model id
+
+On-disk layout (one directory per model, one generation per compaction):
+
+    CURRENT             generation number in use
+    vectors.<gen>.f32   append-only float32 rows, memory-mapped by readers
+    index.<gen>.bin     append-only (16-byte key, uint32 row) records
+
+Readers map the vector file instead of loading it, so worker processes share
+the rows through the page cache. Appends and compactions take an exclusive
+file lock; readers pick up rows written by other processes from the index tail.
+"""
+
+import hashlib
+import os
+import re
+import struct
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: only threads of one process are serialized
+    fcntl = None
+
+
+_RECORD = struct.Struct("<16sI")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Canonical form used for cache keys (NFC, collapsed whitespace)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", sentence)).strip()
+
+
+def sentence_key(sentence: str, model_id: str) -> bytes:
+    """16-byte cache key of a sentence under a model"""
+    data = f"{model_id}\0{normalize_sentence(sentence)}".encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    Memory-mapped embedding store shared by the processes of one host.
+
+    When an append would exceed max_entries the cache is compacted into a
+    new generation keeping compact_ratio * max_entries rows: rows this
+    process read since the last compaction first, then the newest rows.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        model_id: str,
+        dim: int,
+        max_entries: int = 1_000_000,
+        compact_ratio: float = 0.5
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            directory: Cache root (a subdirectory per model is created)
+            model_id: Embedding model identifier, part of every key
+            dim: Embedding width
+            max_entries: Rows kept before compaction
+            compact_ratio: Fraction of max_entries kept by a compaction
+        """
+        self.model_id = model_id
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.compact_ratio = min(1.0, max(0.0, compact_ratio))
+        self.row_bytes = dim * 4
+
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+        self.path = Path(directory) / f"{safe_id}-{dim}"
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._generation = -1
+        self._index: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._next_row = 0
+        self._vectors: Optional[np.memmap] = None
+        self._touched: Set[bytes] = set()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "compactions": 0}
+
+        with self._locked():
+            self._sync()
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.path / f"vectors.{generation}.f32"
+
+    def _index_path(self, generation: int) -> Path:
+        return self.path / f"index.{generation}.bin"
+
+    def _read_generation(self) -> int:
+        try:
+            return int((self.path / "CURRENT").read_text().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across threads and (on POSIX) processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path / "LOCK", "a+b") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remap(self):
+        """Map every complete row of the current vector file"""
+        path = self._vectors_path(self._generation)
+        rows = path.stat().st_size // self.row_bytes if path.exists() else 0
+        self._vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+
+    def _sync(self):
+        """Catch up with index records (and compactions) written by other processes"""
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self._index = {}
+            self._index_offset = 0
+            self._next_row = 0
+            self._touched = set()
+
+        path = self._index_path(self._generation)
+        if not path.exists():
+            self._remap()
+            return
+        with open(path, "rb") as index_file:
+            index_file.seek(self._index_offset)
+            data = index_file.read()
+        data = data[:len(data) - len(data) % _RECORD.size]  # Ignore a record being written
+        for key, row in _RECORD.iter_unpack(data):
+            self._index[key] = row
+            self._next_row = max(self._next_row, row + 1)
+        self._index_offset += len(data)
+        if data or self._vectors is None:
+            self._remap()
+
+    def _refresh(self):
+        """_sync without the file lock, retried under it if a compaction removed the files mid-read"""
+        try:
+            self._sync()
+        except FileNotFoundError:
+            with self._locked():
+                self._sync()
+
+    def _lookup(self, keys: Sequence[bytes]) -> Tuple[List[int], List[int], List[int]]:
+        """Positions of found keys, their rows and positions of missing keys"""
+        found, rows, missing = [], [], []
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                found.append(i)
+                rows.append(row)
+        return found, rows, missing
+
+    def _mapped(self, row: int) -> bool:
+        return self._vectors is not None and row < len(self._vectors)
+
+    def get_many(self, keys: Sequence[bytes]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up embeddings
+
+        Args:
+            keys: Keys from sentence_key
+
+        Returns:
+            Tuple of (array (len(keys), dim) with found rows filled in,
+            positions of the keys that were not found)
+        """
+        with self._lock:
+            if any(key not in self._index for key in keys):
+                self._refresh()
+            found, rows, missing = self._lookup(keys)
+            if rows and not self._mapped(max(rows)):
+                self._remap()
+                if not self._mapped(max(rows)):
+                    # Another process compacted the generation these rows belong to
+                    with self._locked():
+                        self._sync()
+                    found, rows, missing = self._lookup(keys)
+
+            vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+            if rows:
+                vectors[found] = self._vectors[rows]
+            self._touched.update(keys[i] for i in found)
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(missing)
+            return vectors, missing
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        """
+        Append embeddings of keys that are not cached yet
+
+        Args:
+            keys: Keys from sentence_key
+            vectors: Embeddings (len(keys), dim)
+        """
+        with self._locked():
+            self._sync()
+            new: Dict[bytes, np.ndarray] = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+            if len(self._index) + len(new) > self.max_entries:
+                # Compact to make room for the new rows
+                self._compact(max(0, min(int(self.max_entries * self.compact_ratio), self.max_entries - len(new))))
+
+            rows = np.ascontiguousarray(np.stack(list(new.values())), dtype=np.float32)
+            start = self._next_row
+            vectors_path = self._vectors_path(self._generation)
+            with open(vectors_path, "r+b" if vectors_path.exists() else "w+b") as vector_file:
+                # Rows are written before their index records, so readers never see a key without its row
+                vector_file.seek(start * self.row_bytes)
+                vector_file.write(rows.tobytes())
+            records = b"".join(_RECORD.pack(key, start + i) for i, key in enumerate(new))
+            with open(self._index_path(self._generation), "ab") as index_file:
+                index_file.write(records)
+
+            for i, key in enumerate(new):
+                self._index[key] = start + i
+            self._index_offset += len(records)
+            self._next_row = start + len(new)
+            self._counters["writes"] += len(new)
+            self._remap()
+
+    def _compact(self, keep: int):
+        """Rewrite the cache into a new generation keeping keep rows: touched, then newest (lock held)"""
+        by_age = sorted(self._index.items(), key=lambda item: item[1], reverse=True)
+        touched = [item for item in by_age if item[0] in self._touched]
+        others = [item for item in by_age if item[0] not in self._touched]
+        kept = (touched + others)[:keep]
+
+        old_generation = self._generation
+        generation = old_generation + 1
+        if kept and self._vectors is not None:
+            rows = np.asarray(self._vectors[[row for _, row in kept]], dtype=np.float32)
+        else:
+            rows = np.zeros((0, self.dim), dtype=np.float32)
+        self._vectors_path(generation).write_bytes(rows.tobytes())
+        self._index_path(generation).write_bytes(b"".join(_RECORD.pack(key, i) for i, (key, _) in enumerate(kept)))
+
+        current = self.path / "CURRENT.tmp"
+        current.write_text(str(generation))
+        os.replace(current, self.path / "CURRENT")
+        # Processes still mapping the old files keep reading them until they sync
+        for path in (self._vectors_path(old_generation), self._index_path(old_generation)):
+            if path.exists():
+                path.unlink()
+
+        self._counters["compactions"] += 1
+        self._sync()
+
+    def clear(self):
+        """Drop every cached embedding"""
+        with self._locked():
+            self._sync()
+            self._compact(0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, disk size and hit rate of this process"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            vectors_path = self._vectors_path(self._generation)
+            return {
+                "model_id": self.model_id,
+                "path": str(self.path),
+                "generation": self._generation,
+                "entries": len(self._index),
+                "max_entries": self.max_entries,
+                "disk_bytes": vectors_path.stat().st_size if vectors_path.exists() else 0,
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            }
@@ -6,6 +6,9 @@ Converts text and markers into numerical vectors for analysis
 from typing import List, Dict, Any, Optional
 import numpy as np
 
+from engine.preprocessing.context import char_class_counts
+from engine.embeddings.backends import EmbeddingBackend, get_embedding_backend
+
 
 class FeatureEncoder:
     """
@@ -13,19 +16,25 @@ class FeatureEncoder:
     Supports both simple feature extraction and embeddings.
     """
     
-    def __init__(self, use_embeddings: bool = False):
+    def __init__(self, use_embeddings: bool = False, backend: Optional[EmbeddingBackend] = None):
         """
         Initialize feature encoder
         
         Args:
-            use_embeddings: Whether to use sentence-transformers (requires model download)
+            use_embeddings: Whether to use sentence embeddings (the model
+                loads on first use, once per process)
+            backend: Embedding backend (default: get_embedding_backend())
         """
         self.use_embeddings = use_embeddings
+        self.backend = backend
         self.embedding_model = None
-        
-        if use_embeddings:
-            # Lazy load embedding model
-            self._load_embedding_model()
+    
+    @property
+    def model_id(self) -> str:
+        """Identifies the features this encoder produces (without loading a model)"""
+        if not self.use_embeddings:
+            return "simple"
+        return (self.backend or get_embedding_backend()).model_id
     
     def encode_text(self, text: str) -> np.ndarray:
         """
@@ -37,7 +46,7 @@ class FeatureEncoder:
         Returns:
             Feature vector as numpy array
         """
-        if self.use_embeddings and self.embedding_model:
+        if self.use_embeddings and self._load_embedding_model():
             return self._encode_with_embeddings(text)
         else:
             return self._encode_simple_features(text)
@@ -52,11 +61,28 @@ class FeatureEncoder:
         Returns:
             Feature matrix (n_sentences, n_features)
         """
-        if self.use_embeddings and self.embedding_model:
-            return np.array([self._encode_with_embeddings(s) for s in sentences])
+        if self.use_embeddings and self._load_embedding_model():
+            # One batched call for all sentences
+            return self.embedding_model.encode(sentences)
         else:
             return np.array([self._encode_simple_features(s) for s in sentences])
     
+    def encode_documents(self, documents: List[List[str]]) -> List[np.ndarray]:
+        """
+        Encode the sentences of several documents with a single batched call
+        
+        Args:
+            documents: Sentence lists, one per document
+            
+        Returns:
+            Feature matrices, one per document (n_sentences, n_features)
+        """
+        counts = [len(sentences) for sentences in documents]
+        if sum(counts) == 0:
+            return [np.zeros((0, 0)) for _ in documents]
+        features = self.encode_sentences([s for sentences in documents for s in sentences])
+        return np.split(features, np.cumsum(counts)[:-1])
+    
     def encode_markers(self, marker_data: Dict[str, Any]) -> np.ndarray:
         """
         Encode cognitive marker data into feature vector
@@ -89,7 +115,7 @@ class FeatureEncoder:
         (Fallback when embeddings not available)
         """
         words = text.split()
-        chars = list(text)
+        char_classes = char_class_counts(text)
         
         features = [
             len(text),  # Total length
@@ -100,31 +126,27 @@ class FeatureEncoder:
             text.count(','),  # Comma count
             text.count('?'),  # Question count
             text.count('!'),  # Exclamation count
-            sum(1 for c in chars if c.isupper()) / max(1, len(chars)),  # Uppercase ratio
-            sum(1 for c in chars if c.isdigit()) / max(1, len(chars)),  # Digit ratio
+            char_classes["upper"] / max(1, len(text)),  # Uppercase ratio
+            char_classes["digit"] / max(1, len(text)),  # Digit ratio
         ]
         
         return np.array(features)
     
     def _encode_with_embeddings(self, text: str) -> np.ndarray:
-        """
-        Encode text using sentence-transformers embeddings
-        TODO: Implement with sentence-transformers library
-        """
-        # Placeholder - will use sentence-transformers when implemented
-        # For now, fall back to simple features
-        return self._encode_simple_features(text)
+        """Encode text using the sentence embedding backend"""
+        return self.embedding_model.encode([text])[0]
     
-    def _load_embedding_model(self):
-        """Lazy load sentence-transformers model"""
-        try:
-            # TODO: Uncomment when ready to use embeddings
-            # from sentence_transformers import SentenceTransformer
-            # self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            pass
-        except ImportError:
-            print("Warning: sentence-transformers not installed, using simple features")
-            self.use_embeddings = False
+    def _load_embedding_model(self) -> Optional[EmbeddingBackend]:
+        """Lazy load the embedding model (shared by every encoder in the process)"""
+        if self.embedding_model is None and self.use_embeddings:
+            backend = self.backend or get_embedding_backend()
+            try:
+                backend.load()
+                self.embedding_model = backend
+            except ImportError as e:
+                print(f"Warning: embedding backend unavailable ({e}), using simple features")
+                self.use_embeddings = False
+        return self.embedding_model
     
     def _extract_numeric_values(self, data: Dict[str, Any]) -> List[float]:
         """Recursively extract numeric values from nested dictionaries"""
@@ -0,0 +1,205 @@
+"""
+Result Cache
+Content-addressed cache for HumanScore™ results with an in-process LRU tier
+and an optional persistent tier
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+
+# Persistent lookup: (text_hash, config_key) -> cached result or None
+PersistentLookup = Callable[[str, str], Optional[Dict[str, Any]]]
+
+# Bulk persistent lookup: (text_hashes, config_key) -> cached results by text hash
+PersistentBulkLookup = Callable[[List[str], str], Dict[str, Dict[str, Any]]]
+
+
+class ResultCache:
+    """
+    Two-tier cache in front of HumanScoreEngine.score.
+
+    Entries are keyed on the SHA-256 of the input text plus the engine
+    config key, so changing the engine version or marker weights
+    invalidates every cached result.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600.0,
+        persistent_lookup: Optional[PersistentLookup] = None,
+        persistent_bulk_lookup: Optional[PersistentBulkLookup] = None
+    ):
+        """
+        Initialize result cache
+
+        Args:
+            max_size: Maximum number of entries kept in memory (0 disables the LRU tier)
+            ttl_seconds: Seconds an in-memory entry stays valid (0 or less = no expiry)
+            persistent_lookup: Optional fallback used on in-memory misses
+            persistent_bulk_lookup: Optional fallback resolving all in-memory
+                misses of get_many at once (default: persistent_lookup per text)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persistent_lookup = persistent_lookup
+        self.persistent_bulk_lookup = persistent_bulk_lookup
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, text_hash: str, config_key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up a cached result
+
+        Args:
+            text_hash: SHA-256 of the input text
+            config_key: Engine config key (version + weights)
+
+        Returns:
+            Tuple of (result or None, source) where source is
+            "memory", "persistent" or "miss"
+        """
+        result = self._get_memory(text_hash, config_key)
+        if result is not None:
+            return result, "memory"
+
+        if self.persistent_lookup is not None:
+            try:
+                result = self.persistent_lookup(text_hash, config_key)
+            except Exception as e:
+                # A broken persistent tier must never fail scoring
+                print(f"Warning: Persistent cache lookup failed: {e}")
+                result = None
+            if result is not None:
+                self.put(text_hash, config_key, result)
+                with self._lock:
+                    self._counters["persistent_hits"] += 1
+                return result, "persistent"
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None, "miss"
+
+    def get_many(self, text_hashes: List[str], config_key: str) -> List[Tuple[Optional[Dict[str, Any]], str]]:
+        """
+        Look up cached results for many texts, resolving the in-memory misses
+        with a single bulk persistent lookup when one is configured
+
+        Args:
+            text_hashes: SHA-256 hashes of the input texts
+            config_key: Engine config key (version + weights)
+
+        Returns:
+            (result or None, source) tuples, in input order
+        """
+        if self.persistent_bulk_lookup is None:
+            return [self.get(text_hash, config_key) for text_hash in text_hashes]
+
+        entries: List[Tuple[Optional[Dict[str, Any]], str]] = []
+        for text_hash in text_hashes:
+            result = self._get_memory(text_hash, config_key)
+            entries.append((result, "memory") if result is not None else (None, "miss"))
+
+        misses = [text_hash for text_hash, (result, _) in zip(text_hashes, entries) if result is None]
+        found: Dict[str, Dict[str, Any]] = {}
+        if misses:
+            try:
+                found = self.persistent_bulk_lookup(misses, config_key)
+            except Exception as e:
+                # A broken persistent tier must never fail scoring
+                print(f"Warning: Persistent cache lookup failed: {e}")
+
+        for i, text_hash in enumerate(text_hashes):
+            if entries[i][0] is not None:
+                continue
+            result = found.get(text_hash)
+            if result is not None:
+                self.put(text_hash, config_key, result)
+                entries[i] = (result, "persistent")
+            with self._lock:
+                self._counters["persistent_hits" if result is not None else "misses"] += 1
+        return entries
+
+    def put(self, text_hash: str, config_key: str, result: Dict[str, Any]):
+        """Store a result in the in-memory tier"""
+        if self.max_size <= 0:
+            return
+
+        key = (text_hash, config_key)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get_or_compute(
+        self,
+        text_hash: str,
+        config_key: str,
+        compute: Callable[[], Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Return a cached result, computing and storing it on a miss
+
+        Returns:
+            Tuple of (result, source)
+        """
+        result, source = self.get(text_hash, config_key)
+        if result is None:
+            result = compute()
+            self.put(text_hash, config_key, result)
+        return result, source
+
+    def clear(self):
+        """Drop all in-memory entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing information"""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+
+        lookups = counters["memory_hits"] + counters["persistent_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        return {
+            **counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent_tier": self.persistent_lookup is not None,
+        }
+
+    def _get_memory(self, text_hash: str, config_key: str) -> Optional[Dict[str, Any]]:
+        """Look up the in-memory tier (counts hits and expirations)"""
+        key = (text_hash, config_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if self._is_expired(stored_at):
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return result
+
+    def _is_expired(self, stored_at: float) -> bool:
+        """Check whether an entry stored at the given time has expired"""
+        return self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds
@@ -0,0 +1,147 @@
+"""
+Marker Registry
+Cognitive markers the HumanScore engine can run, with their fusion weight,
+required inputs and cost
+
+HumanScoreEngine builds one analyzer per registered marker and runs the
+markers a request selects, so a new marker is added by registering it,
+without editing the engine:
+
+    register_marker(MarkerSpec(
+        name="punctuation",
+        factory=PunctuationAnalyzer,
+        run=lambda analyzer, contexts, include_series: analyzer.analyze_batch(contexts),
+        weight=0.10,
+        score_key="punctuation_score",
+        cost="light"
+    ))
+
+Analyzers declare the context artifacts they need in a `requires` class
+attribute. For streaming and window scoring they also implement
+init_stream/update_stream/finalize_stream and sentence_series/
+window_results, like the built-in markers. An analyzer with a `scanner`
+(PatternScanner) shares the engine's fused pattern scan.
+
+Worker processes (API scoring pool, bulk scorer) build their own engines,
+so markers should be registered by a module listed in ENGINE_MARKER_MODULES
+(comma-separated), which every process imports with this registry.
+"""
+
+import importlib
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from engine.markers.drift.analyzer import DriftAnalyzer
+from engine.markers.cadence.analyzer import CadenceAnalyzer
+from engine.markers.hedging.detector import HedgingDetector
+from engine.markers.metaphor.counter import MetaphorCounter
+from engine.markers.coherence.analyzer import CoherenceAnalyzer
+from engine.markers.stylometry.extractor import StylometricExtractor
+from engine.preprocessing.context import AnalysisContext
+
+
+# Cost classes, from cheapest to most expensive:
+#   light    - arithmetic over per-sentence counts
+#   moderate - pairwise sentence comparisons
+#   heavy    - a regex scan of the whole document (shared by the markers that need one)
+COST_CLASSES = ("light", "moderate", "heavy")
+
+
+class MarkerSpec(NamedTuple):
+    """A cognitive marker the engine can run"""
+    # Marker name, used in breakdowns, weights and selections
+    name: str
+    # Creates the marker's analyzer (called once per engine)
+    factory: Callable[[], Any]
+    # Batch entry point: run(analyzer, contexts, include_series) -> one result per context
+    run: Callable[[Any, List[AnalysisContext], bool], List[Dict[str, Any]]]
+    # Weight in the fused HumanScore™
+    weight: float
+    # Result key holding the marker's score (0-1)
+    score_key: str
+    # Cost class (see COST_CLASSES)
+    cost: str
+    # AnalysisContext artifacts the marker needs (default: the factory's `requires`)
+    requires: Optional[Tuple[str, ...]] = None
+    # Engine attribute holding the analyzer (default: none)
+    attribute: Optional[str] = None
+
+
+_registry: Dict[str, MarkerSpec] = {}
+
+
+def register_marker(spec: MarkerSpec, replace: bool = False) -> MarkerSpec:
+    """
+    Register a marker for engines created from now on
+
+    Args:
+        spec: Marker specification
+        replace: Allow replacing a marker registered under the same name
+
+    Returns:
+        The registered spec, with its required inputs filled in
+
+    Raises:
+        ValueError: Invalid spec, or a marker with that name exists
+    """
+    if spec.name in _registry and not replace:
+        raise ValueError(f"Marker already registered: {spec.name}")
+    if spec.cost not in COST_CLASSES:
+        raise ValueError(f"Unknown cost class: {spec.cost}")
+    if spec.weight <= 0:
+        raise ValueError(f"Marker weight must be positive: {spec.name}")
+    if spec.requires is None:
+        spec = spec._replace(requires=tuple(getattr(spec.factory, "requires", ())))
+    unknown = set(spec.requires) - set(AnalysisContext.ARTIFACTS)
+    if unknown:
+        raise ValueError(f"Unknown analysis artifacts: {', '.join(sorted(unknown))}")
+    _registry[spec.name] = spec
+    return spec
+
+
+def unregister_marker(name: str):
+    """Remove a registered marker (engines already created keep it)"""
+    _registry.pop(name, None)
+
+
+def registered_markers() -> Dict[str, MarkerSpec]:
+    """Registered markers by name, in registration order"""
+    return dict(_registry)
+
+
+# Built-in markers (weights will be tuned based on validation)
+for _spec in (
+    MarkerSpec("drift", DriftAnalyzer, lambda analyzer, contexts, include_series: analyzer.analyze_batch(contexts, include_series),
+               0.20, "drift_score", "moderate", attribute="drift_analyzer"),
+    MarkerSpec("cadence", CadenceAnalyzer, lambda analyzer, contexts, include_series: analyzer.analyze_batch(contexts),
+               0.15, "cadence_score", "light", attribute="cadence_analyzer"),
+    MarkerSpec("hedging", HedgingDetector, lambda analyzer, contexts, include_series: analyzer.detect_batch(contexts, include_series),
+               0.15, "hedging_score", "heavy", attribute="hedging_detector"),
+    MarkerSpec("metaphor", MetaphorCounter, lambda analyzer, contexts, include_series: analyzer.count_batch(contexts, include_series),
+               0.10, "metaphor_score", "heavy", attribute="metaphor_counter"),
+    MarkerSpec("coherence", CoherenceAnalyzer, lambda analyzer, contexts, include_series: analyzer.analyze_batch(contexts, include_series),
+               0.20, "coherence_score", "heavy", attribute="coherence_analyzer"),
+    MarkerSpec("stylometry", StylometricExtractor, lambda analyzer, contexts, include_series: analyzer.extract_batch(contexts),
+               0.20, "stylometry_score", "light", attribute="stylometric_extractor"),
+):
+    register_marker(_spec)
+
+
+def load_marker_modules(modules: Optional[str] = None) -> List[str]:
+    """
+    Import the modules registering additional markers
+
+    Args:
+        modules: Comma-separated module names (default: ENGINE_MARKER_MODULES)
+
+    Returns:
+        Names of the imported modules
+    """
+    names = [name.strip() for name in (modules if modules is not None else os.getenv("ENGINE_MARKER_MODULES", "")).split(",")]
+    names = [name for name in names if name]
+    for name in names:
+        importlib.import_module(name)
+    return names
+
+
+load_marker_modules()
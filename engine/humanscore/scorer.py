@@ -3,13 +3,58 @@ HumanScore Engine - Main scoring logic
 Fuses multiple cognitive markers into a single HumanScore™
 """
 
-from typing import Dict, Any
-from engine.markers.drift.analyzer import DriftAnalyzer
-from engine.markers.cadence.analyzer import CadenceAnalyzer
-from engine.markers.hedging.detector import HedgingDetector
-from engine.markers.metaphor.counter import MetaphorCounter
-from engine.markers.coherence.analyzer import CoherenceAnalyzer
-from engine.markers.stylometry.extractor import StylometricExtractor
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+import hashlib
+import json
+import numpy as np
+from engine.humanscore.registry import COST_CLASSES, registered_markers
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.patterns import PatternScanner
+from engine.preprocessing.text_processor import TextProcessor
+from engine.changepoint import pelt, standardize
+from engine.metrics import get_metrics
+from engine.stats import WindowSize
+
+
+# Bump whenever marker logic changes in a way that affects scores
+ENGINE_VERSION = "0.1.0"
+
+
+# Result detail levels, from least to most detailed:
+#   summary - humanscore, breakdown and counts (no marker_details)
+#   markers - plus each marker's summary metrics (no per-sentence arrays)
+#   full    - plus per-sentence arrays, drift vectors and the drift
+#             long-range metrics
+DETAIL_LEVELS = ("summary", "markers", "full")
+
+# Marker metrics computed only at full detail, besides the per-sentence arrays
+FULL_DETAIL_METRICS = ("long_range_similarity", "topic_returns", "return_rate")
+
+
+def trim_result(result: Dict[str, Any], detail: str) -> Dict[str, Any]:
+    """
+    Reduce a score dictionary to a lower detail level, as if it had been
+    scored at that level. Results are returned unchanged when they are not
+    more detailed than requested.
+    """
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level: {detail}")
+    metadata = result["metadata"]
+    level = metadata.get("detail", "full")
+    if DETAIL_LEVELS.index(level) <= DETAIL_LEVELS.index(detail):
+        return result
+    
+    metadata = {key: value for key, value in metadata.items() if key != "marker_details"}
+    if detail == "markers":
+        metadata["marker_details"] = {
+            marker: {
+                key: value for key, value in details.items()
+                if not isinstance(value, list) and key not in FULL_DETAIL_METRICS
+            }
+            for marker, details in result["metadata"]["marker_details"].items()
+        }
+    metadata["detail"] = detail
+    return {**result, "metadata": metadata}
 
 
 class HumanScoreEngine:
@@ -19,70 +64,366 @@ class HumanScoreEngine:
     """
     
     def __init__(self):
+        # Registered markers (see engine.humanscore.registry), in registration order
+        self.markers = registered_markers()
+        
         # Marker weights (will be tuned based on validation)
-        self.weights = {
-            "drift": 0.20,
-            "cadence": 0.15,
-            "hedging": 0.15,
-            "metaphor": 0.10,
-            "coherence": 0.20,
-            "stylometry": 0.20
-        }
+        self.weights = {name: spec.weight for name, spec in self.markers.items()}
+        
+        # Initialize marker analyzers; built-in ones are also engine attributes
+        # (e.g. self.drift_analyzer), which analyzers() reads
+        self._analyzers: Dict[str, Any] = {}
+        for name, spec in self.markers.items():
+            analyzer = spec.factory()
+            if spec.attribute:
+                setattr(self, spec.attribute, analyzer)
+            else:
+                self._analyzers[name] = analyzer
         
-        # Initialize marker analyzers
-        self.drift_analyzer = DriftAnalyzer()
-        self.cadence_analyzer = CadenceAnalyzer()
-        self.hedging_detector = HedgingDetector()
-        self.metaphor_counter = MetaphorCounter()
-        self.coherence_analyzer = CoherenceAnalyzer()
-        self.stylometric_extractor = StylometricExtractor()
+        # One fused pattern scanner for every regex-based marker, so each
+        # document is scanned once instead of once per pattern per marker
+        scanning = [analyzer for analyzer in self.analyzers().values() if hasattr(analyzer, "scanner")]
+        self.pattern_scanner = PatternScanner.combine([analyzer.scanner for analyzer in scanning])
+        for analyzer in scanning:
+            analyzer.scanner = self.pattern_scanner
+        
+        # Union of the derived artifacts the markers declare they need
+        self.required_artifacts = self._required_artifacts(tuple(self.markers))
     
-    def score(self, processed_text: Dict[str, Any]) -> Dict[str, Any]:
+    @property
+    def config_key(self) -> str:
+        """
+        Stable key for the scoring configuration (engine version + weights,
+        plus the feature set of markers configured with a non-default one,
+        e.g. a drift embedding model).
+        Cached results are only valid for the config key they were computed with.
+        """
+        return self.config_key_for(None)
+    
+    def config_key_for(self, markers: Optional[Iterable[str]]) -> str:
+        """
+        Config key of results scored with a marker selection (see
+        select_markers); the full selection has the plain config_key
+        """
+        config = {"version": ENGINE_VERSION, "weights": self.weights}
+        for name, analyzer in self.analyzers().items():
+            feature_key = getattr(analyzer, "feature_key", "simple")
+            if feature_key != "simple":
+                config[f"{name}_features"] = feature_key
+        selection = self.select_markers(markers)
+        if len(selection) < len(self.markers):
+            config["markers"] = list(selection)
+        config = json.dumps(config, sort_keys=True)
+        return hashlib.sha256(config.encode()).hexdigest()[:16]
+    
+    def select_markers(
+        self,
+        markers: Optional[Iterable[str]] = None,
+        max_cost: Optional[str] = None
+    ) -> Tuple[str, ...]:
+        """
+        Validate a marker selection
+        
+        Args:
+            markers: Marker names (default: every registered marker)
+            max_cost: Keep only markers of this cost class or cheaper
+                (see COST_CLASSES)
+            
+        Returns:
+            Selected marker names, in registration order
+            
+        Raises:
+            ValueError: Unknown marker or cost class, or nothing selected
+        """
+        if markers is None:
+            selected = set(self.markers)
+        else:
+            selected = set(markers)
+            unknown = selected - set(self.markers)
+            if unknown:
+                raise ValueError(
+                    f"Unknown markers: {', '.join(sorted(unknown))} (available: {', '.join(self.markers)})"
+                )
+        if max_cost is not None:
+            if max_cost not in COST_CLASSES:
+                raise ValueError(f"Unknown cost class: {max_cost} (available: {', '.join(COST_CLASSES)})")
+            allowed = COST_CLASSES[:COST_CLASSES.index(max_cost) + 1]
+            selected = {name for name in selected if self.markers[name].cost in allowed}
+        if not selected:
+            raise ValueError("No markers selected")
+        return tuple(name for name in self.markers if name in selected)
+    
+    def _required_artifacts(self, selection: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Union of the derived artifacts the selected markers need"""
+        return tuple(sorted(set().union(*(self.markers[name].requires for name in selection))))
+    
+    def score(
+        self,
+        processed_text: Dict[str, Any],
+        detail: str = "full",
+        markers: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
         """
         Calculate HumanScore™ from processed text
         
         Args:
             processed_text: Output from TextProcessor
+            detail: Result detail level (see DETAIL_LEVELS)
+            markers: Markers to run (default: all; see select_markers)
+            
+        Returns:
+            Dictionary with humanscore, breakdown, and metadata
+        """
+        return self.score_batch([processed_text], detail=detail, markers=markers)[0]
+    
+    def score_batch(
+        self,
+        processed_texts: List[Dict[str, Any]],
+        detail: str = "full",
+        markers: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Calculate HumanScore™ for several processed texts at once.
+        Each marker runs once over the whole batch.
+        
+        Args:
+            processed_texts: Outputs from TextProcessor
+            detail: Result detail level (see DETAIL_LEVELS); below "full"
+                the markers skip building their per-sentence arrays
+            markers: Markers to run (default: all; see select_markers).
+                Only their inputs are derived, and the humanscore is the
+                weighted mean of their scores, renormalized over their weights.
+            
+        Returns:
+            List of score dictionaries, in input order
+        """
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"Unknown detail level: {detail}")
+        include_series = detail == "full"
+        selection = self.select_markers(markers)
+        required = self.required_artifacts if markers is None else self._required_artifacts(selection)
+        
+        metrics = get_metrics()
+        
+        # Share derived artifacts (lowercased sentences, word lists, ...) across markers
+        with metrics.timed("context"):
+            contexts = [
+                AnalysisContext.from_processed(p).require(required)
+                for p in processed_texts
+            ]
+        
+        # Extract marker scores using actual analyzers (each timed as its own stage)
+        analyzers = self.analyzers(selection)
+        marker_results = {}
+        for name, analyzer in analyzers.items():
+            with metrics.timed(name):
+                marker_results[name] = self.markers[name].run(analyzer, contexts, include_series)
+        
+        config_key = self.config_key_for(selection)
+        with metrics.timed("fusion"):
+            return [
+                self._fuse(processed_text, config_key, {
+                    name: results[i] for name, results in marker_results.items()
+                }, detail)
+                for i, processed_text in enumerate(contexts)
+            ]
+    
+    def score_stream(
+        self,
+        chunks: Iterable[str],
+        processor: Optional[TextProcessor] = None,
+        markers: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Calculate HumanScore™ for a document delivered as text chunks
+        
+        The document is segmented incrementally and every marker folds each
+        segment into running statistics (counts, Welford mean/variance, type
+        counts), so memory stays bounded whatever the document length. Scores
+        match score() on the whole text; per-sentence series (drift vectors,
+        sentence counts) are not included in the marker details.
+        
+        Args:
+            chunks: Raw text chunks, in order (split anywhere)
+            processor: TextProcessor used for segmentation (default settings if omitted)
+            markers: Markers to run (default: all; see select_markers)
             
         Returns:
             Dictionary with humanscore, breakdown, and metadata
         """
-        # Extract marker scores using actual analyzers
-        drift_result = self.drift_analyzer.analyze(processed_text["sentences"])
-        cadence_result = self.cadence_analyzer.analyze(
-            processed_text["sentences"],
-            processed_text["tokens"]
-        )
-        hedging_result = self.hedging_detector.detect(
-            processed_text["cleaned"],
-            processed_text["sentences"]
-        )
-        metaphor_result = self.metaphor_counter.count(
-            processed_text["cleaned"],
-            processed_text["sentences"]
-        )
-        coherence_result = self.coherence_analyzer.analyze(processed_text["sentences"])
-        stylometry_result = self.stylometric_extractor.extract(
-            processed_text["cleaned"],
-            processed_text["sentences"],
-            processed_text["tokens"]
-        )
+        processor = processor or TextProcessor()
+        selection = self.select_markers(markers)
+        required = self._required_artifacts(selection)
+        markers = self.analyzers(selection)
+        states = {name: marker.init_stream() for name, marker in markers.items()}
+        totals = {"sentence_count": 0, "token_count": 0, "char_count": 0}
+        
+        for ctx in processor.process_stream(chunks):
+            ctx.require(required)
+            for name, marker in markers.items():
+                marker.update_stream(states[name], ctx)
+            for key in totals:
+                totals[key] += ctx[key]
+        
+        marker_details = {
+            name: marker.finalize_stream(states[name])
+            for name, marker in markers.items()
+        }
+        return self._fuse(totals, self.config_key_for(selection), marker_details)
+    
+    def score_windows(
+        self,
+        processed_text: Dict[str, Any],
+        window: int = 10,
+        stride: int = 5,
+        penalty: Optional[float] = None,
+        markers: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Score sliding windows of sentences and locate change points, for
+        documents mixing human and AI-written parts
+        
+        Per-sentence marker signals are computed once; window statistics come
+        from prefix sums and incrementally updated type counts, so the cost is
+        close to linear in document length. Change points are found with PELT
+        on the standardized per-sentence signals, and each segment between
+        change points is scored like a window.
         
+        Args:
+            processed_text: Output from TextProcessor
+            window: Sentences per window
+            stride: Sentences between consecutive window starts
+            penalty: PELT penalty per change point (default: BIC-like)
+            markers: Markers to run (default: all; see select_markers); the
+                change points come from their signals only
+            
+        Returns:
+            Dictionary with per-window scores, change points (sentence
+            indices where a new segment starts) and per-segment scores
+        """
+        if window < 1 or stride < 1:
+            raise ValueError("window and stride must be positive")
+        
+        selection = self.select_markers(markers)
+        ctx = AnalysisContext.from_processed(processed_text).require(self._required_artifacts(selection))
+        n_sentences = ctx["sentence_count"]
+        markers = self.analyzers(selection)
+        windows: List[Dict[str, Any]] = []
+        change_points: List[int] = []
+        segments: List[Dict[str, Any]] = []
+        # Without sentences there is nothing to window or segment
+        if n_sentences:
+            series = {name: marker.sentence_series(ctx) for name, marker in markers.items()}
+            
+            # Window starts cover the whole document, the last window ending on its last sentence
+            last_start = max(0, n_sentences - window)
+            starts = np.arange(0, last_start + 1, stride)
+            if starts[-1] != last_start:
+                starts = np.append(starts, last_start)
+            windows = self._score_spans(ctx, markers, series, starts, window)
+            
+            # Change points of the per-sentence marker signals
+            signals = standardize(np.column_stack(
+                [values for marker_series in series.values() for values in marker_series.values()]
+            ).reshape(n_sentences, -1))
+            change_points = pelt(signals, penalty=penalty, min_size=max(2, window // 2))
+            
+            bounds = np.array([0] + change_points + [n_sentences], dtype=np.int64)
+            segments = self._score_spans(ctx, markers, series, bounds[:-1], np.diff(bounds))
+        
+        return {
+            "window": window,
+            "stride": stride,
+            "sentence_count": n_sentences,
+            "windows": windows,
+            "change_points": change_points,
+            "segments": segments,
+            "engine": {
+                "version": ENGINE_VERSION,
+                "config_key": self.config_key_for(selection)
+            }
+        }
+    
+    def _score_spans(
+        self,
+        ctx: AnalysisContext,
+        markers: Dict[str, Any],
+        series: Dict[str, Dict[str, np.ndarray]],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """Fused scores of the sentence spans [start, start + size)"""
+        ends = np.minimum(starts + size, ctx["sentence_count"])
+        marker_results = {
+            name: marker.window_results(ctx, series[name], starts, size)
+            for name, marker in markers.items()
+        }
+        
+        spans = []
+        for w, (start, end) in enumerate(zip(starts, ends)):
+            marker_scores = {
+                name: results[w][self.markers[name].score_key]
+                for name, results in marker_results.items()
+            }
+            humanscore = self._weighted_score(marker_scores)
+            spans.append({
+                "start": int(start),
+                "end": int(end),
+                "humanscore": round(humanscore, 4),
+                "breakdown": {
+                    marker: round(score, 4)
+                    for marker, score in marker_scores.items()
+                }
+            })
+        return spans
+    
+    def analyzers(self, selection: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """Marker analyzers by name (the selected ones, or all)"""
+        return {
+            name: getattr(self, spec.attribute) if spec.attribute else self._analyzers[name]
+            for name, spec in self.markers.items()
+            if selection is None or name in selection
+        }
+    
+    def _weighted_score(self, marker_scores: Dict[str, float]) -> float:
+        """Weighted mean of marker scores, renormalized over the weights of the markers present"""
+        return sum(
+            marker_scores[marker] * self.weights[marker]
+            for marker in marker_scores
+        ) / sum(self.weights[marker] for marker in marker_scores)
+    
+    def _fuse(
+        self,
+        processed_text: Dict[str, Any],
+        config_key: str,
+        marker_details: Dict[str, Dict[str, Any]],
+        detail: str = "full"
+    ) -> Dict[str, Any]:
+        """Combine per-marker results into the final score dictionary"""
         # Extract scores from results
         marker_scores = {
-            "drift": drift_result["drift_score"],
-            "cadence": cadence_result["cadence_score"],
-            "hedging": hedging_result["hedging_score"],
-            "metaphor": metaphor_result["metaphor_score"],
-            "coherence": coherence_result["coherence_score"],
-            "stylometry": stylometry_result["stylometry_score"]
+            marker: details[self.markers[marker].score_key]
+            for marker, details in marker_details.items()
         }
         
         # Weighted fusion
-        humanscore = sum(
-            marker_scores[marker] * self.weights[marker]
-            for marker in marker_scores
-        )
+        humanscore = self._weighted_score(marker_scores)
+        
+        metadata = {
+            "sentence_count": processed_text["sentence_count"],
+            "token_count": processed_text["token_count"],
+            "char_count": processed_text["char_count"],
+            "engine": {
+                "version": ENGINE_VERSION,
+                "config_key": config_key
+            }
+        }
+        if len(marker_scores) < len(self.markers):
+            metadata["engine"]["markers"] = list(marker_scores)
+        if detail != "summary":
+            metadata["marker_details"] = marker_details
+        if detail != "full":
+            metadata["detail"] = detail
         
         return {
             "humanscore": round(humanscore, 4),
@@ -90,18 +431,5 @@ class HumanScoreEngine:
                 marker: round(score, 4)
                 for marker, score in marker_scores.items()
             },
-            "metadata": {
-                "sentence_count": processed_text["sentence_count"],
-                "token_count": processed_text["token_count"],
-                "char_count": processed_text["char_count"],
-                "marker_details": {
-                    "drift": drift_result,
-                    "cadence": cadence_result,
-                    "hedging": hedging_result,
-                    "metaphor": metaphor_result,
-                    "coherence": coherence_result,
-                    "stylometry": stylometry_result
-                }
-            }
+            "metadata": metadata
         }
-
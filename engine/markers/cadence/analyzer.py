@@ -5,7 +5,12 @@ Measures the irregularity in sentence pacing - humans show more variance
 
 from typing import List, Dict, Any
 import numpy as np
-import statistics
+
+from engine.stats import (
+    concat_segments, segment_ids, segment_mean, segment_var, RunningStats,
+    window_count, window_mean, window_var, WindowSize
+)
+from engine.preprocessing.context import AnalysisContext
 
 
 class CadenceAnalyzer:
@@ -14,6 +19,9 @@ class CadenceAnalyzer:
     Human writing shows more irregular cadence than AI.
     """
     
+    # Shared artifacts read from the AnalysisContext
+    requires = ("sentence_words", "sentence_word_counts", "sentence_lengths")
+    
     def analyze(self, sentences: List[str], tokens: List[str]) -> Dict[str, Any]:
         """
         Analyze cadence variability
@@ -25,36 +33,128 @@ class CadenceAnalyzer:
         Returns:
             Dictionary with cadence metrics
         """
-        if len(sentences) < 2:
-            return {
-                "cadence_score": 0.5,
-                "sentence_length_variance": 0.0,
-                "pause_variance": 0.0,
-                "rhythm_score": 0.5
-            }
+        return self.analyze_batch([{"sentences": sentences, "tokens": tokens}])[0]
+    
+    def analyze_batch(self, processed_texts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze cadence variability for several documents at once.
+        Per-sentence statistics are computed as flat arrays across the batch.
         
-        # Sentence length variance
-        sentence_lengths = [len(s) for s in sentences]
-        length_variance = np.var(sentence_lengths) if len(sentence_lengths) > 1 else 0.0
+        Args:
+            processed_texts: Outputs from TextProcessor
+            
+        Returns:
+            List of cadence metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
+        n_docs = len(contexts)
+        counts = [ctx["sentence_count"] for ctx in contexts]
+        ids = segment_ids(counts)
+        flat = [s for ctx in contexts for s in ctx["sentences"]]
+        words = [w for ctx in contexts for w in ctx.sentence_words]
         
-        # Word count variance
-        word_counts = [len(s.split()) for s in sentences]
-        word_variance = np.var(word_counts) if len(word_counts) > 1 else 0.0
+        # Per-sentence statistics
+        sentence_lengths = concat_segments(ctx.sentence_lengths for ctx in contexts)
+        word_counts = concat_segments(ctx.sentence_word_counts for ctx in contexts)
+        pause_patterns = self._analyze_pause_patterns(flat)
+        rhythm_scores = self._calculate_rhythm(words)
         
-        # Pause patterns (punctuation-based)
-        pause_patterns = self._analyze_pause_patterns(sentences)
-        pause_variance = np.var(pause_patterns) if len(pause_patterns) > 1 else 0.0
+        # Per-document reductions
+        length_variance = segment_var(sentence_lengths, ids, n_docs)
+        word_variance = segment_var(word_counts, ids, n_docs)
+        pause_variance = segment_var(pause_patterns, ids, n_docs)
+        rhythm_variance = segment_var(rhythm_scores, ids, n_docs)
+        avg_length = segment_mean(sentence_lengths, ids, n_docs)
+        avg_words = segment_mean(word_counts, ids, n_docs)
+        rhythm_mean = segment_mean(rhythm_scores, ids, n_docs)
         
-        # Rhythm score (coefficient of variation)
-        rhythm_scores = self._calculate_rhythm(sentences)
-        rhythm_variance = np.var(rhythm_scores) if len(rhythm_scores) > 1 else 0.0
+        results = []
+        for i in range(n_docs):
+            if counts[i] < 2:
+                results.append(self._neutral_result())
+                continue
+            results.append(self._score(
+                length_variance[i], word_variance[i], pause_variance[i],
+                rhythm_variance[i], avg_length[i], avg_words[i], rhythm_mean[i]
+            ))
+        return results
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence cadence signals"""
+        return {
+            "length": ctx.sentence_lengths,
+            "words": ctx.sentence_word_counts,
+            "pause": self._analyze_pause_patterns(ctx["sentences"]),
+            "rhythm": self._calculate_rhythm(ctx.sentence_words),
+        }
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Cadence metrics of sentence windows [start, start + size), each
+        scored as if its sentences were the whole text
+        """
+        counts = window_count(ctx["sentence_count"], starts, size)
+        variance = {name: window_var(values, starts, size) for name, values in series.items()}
+        mean = {name: window_mean(series[name], starts, size) for name in ("length", "words", "rhythm")}
         
+        return [
+            self._score(
+                variance["length"][w], variance["words"][w], variance["pause"][w],
+                variance["rhythm"][w], mean["length"][w], mean["words"][w], mean["rhythm"][w]
+            ) if counts[w] >= 2 else self._neutral_result()
+            for w in range(len(starts))
+        ]
+    
+    def init_stream(self) -> Dict[str, RunningStats]:
+        """Running statistics for streaming analysis"""
+        return {name: RunningStats() for name in ("length", "words", "pause", "rhythm")}
+    
+    def update_stream(self, state: Dict[str, RunningStats], ctx: AnalysisContext):
+        """Fold the sentences of one streamed segment into the running statistics"""
+        state["length"].update(ctx.sentence_lengths)
+        state["words"].update(ctx.sentence_word_counts)
+        state["pause"].update(self._analyze_pause_patterns(ctx["sentences"]))
+        state["rhythm"].update(self._calculate_rhythm(ctx.sentence_words))
+    
+    def finalize_stream(self, state: Dict[str, RunningStats]) -> Dict[str, Any]:
+        """Cadence metrics of a streamed document"""
+        if state["length"].count < 2:
+            return self._neutral_result()
+        return self._score(
+            state["length"].variance, state["words"].variance, state["pause"].variance,
+            state["rhythm"].variance, state["length"].mean, state["words"].mean,
+            state["rhythm"].mean
+        )
+    
+    def _neutral_result(self) -> Dict[str, Any]:
+        """Result for texts too short to measure cadence"""
+        return {
+            "cadence_score": 0.5,
+            "sentence_length_variance": 0.0,
+            "pause_variance": 0.0,
+            "rhythm_score": 0.5
+        }
+    
+    def _score(
+        self,
+        length_variance: float,
+        word_variance: float,
+        pause_variance: float,
+        rhythm_variance: float,
+        avg_length: float,
+        avg_words: float,
+        rhythm_mean: float
+    ) -> Dict[str, Any]:
+        """Turn aggregated per-sentence statistics into cadence metrics"""
         # Normalize variances (heuristic thresholds)
         # Adjusted for both formal and casual texts
         # Use adaptive thresholds based on text length
-        avg_length = np.mean(sentence_lengths) if sentence_lengths else 0
-        avg_words = np.mean(word_counts) if word_counts else 0
-        
         # Adaptive thresholds: lower for shorter texts (casual), higher for longer (formal)
         length_threshold = max(20.0, min(2000.0, avg_length * 20))  # 20-2000 range (lowered min)
         word_threshold = max(2.0, min(100.0, avg_words * 5))  # 2-100 range (lowered min)
@@ -86,40 +186,45 @@ class CadenceAnalyzer:
             "sentence_length_variance": float(length_variance),
             "word_count_variance": float(word_variance),
             "pause_variance": float(pause_variance),
-            "rhythm_score": float(np.mean(rhythm_scores)) if rhythm_scores else 0.5,
+            "rhythm_score": float(rhythm_mean),
             "rhythm_variance": float(rhythm_variance)
         }
     
-    def _analyze_pause_patterns(self, sentences: List[str]) -> List[float]:
+    def _analyze_pause_patterns(self, sentences: List[str]) -> np.ndarray:
         """Analyze punctuation-based pause patterns"""
-        pause_scores = []
-        for sentence in sentences:
+        pause_scores = [
             # Count various pause indicators
-            pauses = (
-                sentence.count(',') * 0.5 +
-                sentence.count(';') * 1.0 +
-                sentence.count(':') * 1.0 +
-                sentence.count('—') * 1.5 +
-                sentence.count('(') * 0.5
-            )
-            pause_scores.append(pauses)
-        return pause_scores
+            sentence.count(',') * 0.5 +
+            sentence.count(';') * 1.0 +
+            sentence.count(':') * 1.0 +
+            sentence.count('—') * 1.5 +
+            sentence.count('(') * 0.5
+            for sentence in sentences
+        ]
+        return np.asarray(pause_scores, dtype=float)
     
-    def _calculate_rhythm(self, sentences: List[str]) -> List[float]:
-        """Calculate rhythm score for each sentence"""
-        rhythm_scores = []
-        for sentence in sentences:
-            words = sentence.split()
-            if len(words) < 2:
-                rhythm_scores.append(0.5)
-                continue
-            
-            # Simple rhythm: variation in word lengths
-            word_lengths = [len(w) for w in words]
-            if len(word_lengths) > 1:
-                cv = statistics.stdev(word_lengths) / statistics.mean(word_lengths)
-                rhythm_scores.append(cv)
-            else:
-                rhythm_scores.append(0.5)
+    def _calculate_rhythm(self, sentence_words: List[List[str]]) -> np.ndarray:
+        """
+        Calculate rhythm score for each sentence
+        
+        Rhythm is the coefficient of variation of word lengths, computed
+        for all sentences at once from a flat array of word lengths.
+        """
+        n_sentences = len(sentence_words)
+        word_totals = np.fromiter((len(w) for w in sentence_words), dtype=np.int64, count=n_sentences)
+        ids = segment_ids(word_totals)
+        word_lengths = np.fromiter(
+            (len(w) for words in sentence_words for w in words),
+            dtype=float,
+            count=int(word_totals.sum())
+        )
+        
+        mean = segment_mean(word_lengths, ids, n_sentences)
+        # Sample standard deviation (statistics.stdev)
+        sq_dev = np.bincount(ids, weights=(word_lengths - mean[ids]) ** 2, minlength=n_sentences)
+        std = np.sqrt(np.divide(sq_dev, word_totals - 1, out=np.zeros(n_sentences), where=word_totals > 1))
         
+        rhythm_scores = np.full(n_sentences, 0.5)
+        measurable = word_totals >= 2
+        rhythm_scores[measurable] = std[measurable] / mean[measurable]
         return rhythm_scores
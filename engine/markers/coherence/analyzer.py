@@ -5,7 +5,14 @@ Humans show more irregular coherence patterns
 """
 
 from typing import List, Dict, Any
-import re
+import numpy as np
+
+from engine.stats import (
+    segment_ids, segment_sum, segment_var, RunningStats,
+    window_count, window_sum, window_var, WindowSize
+)
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.patterns import PatternScanner, DocumentScan, literal_pattern
 
 
 class CoherenceAnalyzer:
@@ -14,6 +21,9 @@ class CoherenceAnalyzer:
     Humans show more irregular coherence than AI.
     """
     
+    # Shared artifacts read from the AnalysisContext
+    requires = ("text_lower", "sentences_lower")
+    
     def __init__(self):
         # Discourse markers that indicate breaks
         self.break_markers = [
@@ -36,6 +46,20 @@ class CoherenceAnalyzer:
             r"\b(that\s+reminds\s+me|oh\s+yeah)",
             r"\b(changing\s+the\s+subject|anyway)",
         ]
+        
+        # Explicit transition words (smooth, more AI-like transitions)
+        self.transition_words = [
+            "furthermore", "moreover", "additionally", "in addition",
+            "therefore", "thus", "hence", "consequently",
+            "first", "second", "finally", "next", "then"
+        ]
+        
+        # All patterns are matched in one pass (shared with other markers by the engine)
+        self.scanner = PatternScanner({
+            "coherence.breaks": self.break_markers,
+            "coherence.topic_shifts": self.topic_shift_markers,
+            "coherence.transitions": [literal_pattern(self.transition_words)],
+        })
     
     def analyze(self, sentences: List[str]) -> Dict[str, Any]:
         """
@@ -47,7 +71,129 @@ class CoherenceAnalyzer:
         Returns:
             Dictionary with coherence metrics
         """
-        if len(sentences) < 2:
+        return self.analyze_batch([{"sentences": sentences}])[0]
+    
+    def analyze_batch(
+        self,
+        processed_texts: List[Dict[str, Any]],
+        include_series: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze coherence breaks for several documents at once.
+        Per-sentence counts are reduced as flat arrays across the batch.
+        
+        Args:
+            processed_texts: Outputs from TextProcessor
+            include_series: Include the per-sentence break counts (skipped when only
+                the summary metrics are needed)
+            
+        Returns:
+            List of coherence metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
+        scans = [ctx.scan(self.scanner) for ctx in contexts]
+        n_docs = len(contexts)
+        counts = np.array([scan.n_sentences for scan in scans], dtype=np.int64)
+        ids = segment_ids(counts)
+        
+        # Count breaks and topic shifts in each sentence
+        sentence_breaks = np.concatenate([self._count_breaks(scan) for scan in scans] + [np.zeros(0)])
+        sentence_shifts = np.concatenate([self._has_topic_shift(scan) for scan in scans] + [np.zeros(0)])
+        
+        # Analyze sentence transitions (every sentence after the first of its document)
+        transition_counts = np.maximum(counts - 1, 0)
+        transition_scores = np.concatenate(
+            [self._analyze_transitions(scan) for scan in scans if scan.n_sentences >= 2] + [np.zeros(0)]
+        )
+        
+        total_breaks = segment_sum(sentence_breaks, ids, n_docs)
+        topic_shifts = segment_sum(sentence_shifts, ids, n_docs)
+        break_variance = segment_var(sentence_breaks, ids, n_docs)
+        transition_variance = segment_var(transition_scores, segment_ids(transition_counts), n_docs)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        
+        results = []
+        for i in range(n_docs):
+            result = self._build_result(
+                int(counts[i]), total_breaks[i], topic_shifts[i],
+                break_variance[i], transition_variance[i]
+            )
+            if include_series and counts[i] >= 2:
+                result["sentence_breaks"] = sentence_breaks[offsets[i]:offsets[i + 1]].astype(int).tolist()
+            results.append(result)
+        
+        return results
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence coherence signals"""
+        scan = ctx.scan(self.scanner)
+        return {
+            "breaks": self._count_breaks(scan),
+            "topic_shifts": self._has_topic_shift(scan),
+            "transitions": self._transition_scores(scan),
+        }
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Coherence metrics of sentence windows [start, start + size), each
+        scored as if its sentences were the whole text
+        """
+        counts = window_count(ctx["sentence_count"], starts, size)
+        total_breaks = window_sum(series["breaks"], starts, size)
+        topic_shifts = window_sum(series["topic_shifts"], starts, size)
+        break_variance = window_var(series["breaks"], starts, size)
+        # The first sentence of a window has no transition into it
+        transition_variance = window_var(series["transitions"], starts + 1, size - 1)
+        
+        return [
+            self._build_result(
+                int(counts[w]), total_breaks[w], topic_shifts[w],
+                break_variance[w], transition_variance[w]
+            )
+            for w in range(len(starts))
+        ]
+    
+    def init_stream(self) -> Dict[str, Any]:
+        """Running state for streaming analysis"""
+        return {
+            "breaks": RunningStats(),
+            "topic_shifts": 0.0,
+            "transitions": RunningStats(),
+        }
+    
+    def update_stream(self, state: Dict[str, Any], ctx: AnalysisContext):
+        """Fold the sentences of one streamed segment into the running state"""
+        scan = ctx.scan(self.scanner)
+        # The document's first sentence has no transition into it
+        first = 1 if state["breaks"].count == 0 else 0
+        state["transitions"].update(self._transition_scores(scan)[first:])
+        state["breaks"].update(self._count_breaks(scan))
+        state["topic_shifts"] += float(self._has_topic_shift(scan).sum())
+    
+    def finalize_stream(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Coherence metrics of a streamed document"""
+        breaks = state["breaks"]
+        return self._build_result(
+            breaks.count, breaks.total, state["topic_shifts"],
+            breaks.variance, state["transitions"].variance
+        )
+    
+    def _build_result(
+        self,
+        n_sentences: int,
+        total_breaks: float,
+        topic_shifts: float,
+        break_variance: float,
+        transition_variance: float
+    ) -> Dict[str, Any]:
+        """Score coherence from aggregated per-sentence counts"""
+        if n_sentences < 2:
             return {
                 "coherence_score": 0.5,
                 "break_count": 0,
@@ -55,36 +201,15 @@ class CoherenceAnalyzer:
                 "coherence_variance": 0.0
             }
         
-        # Count breaks in each sentence
-        sentence_breaks = []
-        total_breaks = 0
-        topic_shifts = 0
-        
-        for i, sentence in enumerate(sentences):
-            breaks = self._count_breaks(sentence)
-            sentence_breaks.append(breaks)
-            total_breaks += breaks
-            
-            # Check for topic shifts
-            if self._has_topic_shift(sentence):
-                topic_shifts += 1
-        
-        # Calculate variance in breaks
-        break_variance = self._calculate_variance(sentence_breaks) if len(sentence_breaks) > 1 else 0.0
-        
-        # Analyze sentence transitions
-        transition_scores = self._analyze_transitions(sentences)
-        transition_variance = self._calculate_variance(transition_scores) if len(transition_scores) > 1 else 0.0
-        
         # Score: more breaks + higher variance = more human-like
         # But too many breaks might indicate poor writing, so normalize
-        break_density = total_breaks / max(1, len(sentences))
+        break_density = total_breaks / max(1, n_sentences)
         break_score = min(1.0, break_density / 2.0)  # Normalize
         
         variance_score = min(1.0, (break_variance + transition_variance) / 4.0)
         
         # Topic shifts are strong human indicators
-        shift_score = min(1.0, topic_shifts / max(1, len(sentences) / 5))
+        shift_score = min(1.0, topic_shifts / max(1, n_sentences / 5))
         
         coherence_score = (
             break_score * 0.4 +
@@ -94,56 +219,33 @@ class CoherenceAnalyzer:
         
         return {
             "coherence_score": float(coherence_score),
-            "break_count": total_breaks,
-            "topic_shifts": topic_shifts,
+            "break_count": int(total_breaks),
+            "topic_shifts": int(topic_shifts),
             "break_density": float(break_density),
             "coherence_variance": float(break_variance),
-            "transition_variance": float(transition_variance),
-            "sentence_breaks": sentence_breaks
+            "transition_variance": float(transition_variance)
         }
     
-    def _count_breaks(self, sentence: str) -> int:
-        """Count coherence break markers in a sentence"""
-        sentence_lower = sentence.lower()
-        count = 0
-        for pattern in self.break_markers:
-            count += len(re.findall(pattern, sentence_lower))
-        return count
+    def _count_breaks(self, scan: DocumentScan) -> np.ndarray:
+        """Count coherence break markers in each sentence"""
+        return scan.sentence_counts("coherence.breaks").sum(axis=0).astype(float)
     
-    def _has_topic_shift(self, sentence: str) -> bool:
-        """Check if sentence contains topic shift markers"""
-        sentence_lower = sentence.lower()
-        for pattern in self.topic_shift_markers:
-            if re.search(pattern, sentence_lower):
-                return True
-        return False
+    def _has_topic_shift(self, scan: DocumentScan) -> np.ndarray:
+        """Check which sentences contain topic shift markers"""
+        return (scan.sentence_counts("coherence.topic_shifts") > 0).any(axis=0).astype(float)
     
-    def _analyze_transitions(self, sentences: List[str]) -> List[float]:
+    def _analyze_transitions(self, scan: DocumentScan) -> np.ndarray:
         """Analyze smoothness of transitions between sentences"""
-        if len(sentences) < 2:
-            return [0.5]
-        
-        transition_scores = []
-        for i in range(len(sentences) - 1):
-            # Simple heuristic: check for explicit transition words
-            # More explicit transitions = smoother (more AI-like)
-            # Fewer explicit transitions = more abrupt (more human-like)
-            next_sentence = sentences[i + 1].lower()
-            transition_words = [
-                "furthermore", "moreover", "additionally", "in addition",
-                "therefore", "thus", "hence", "consequently",
-                "first", "second", "finally", "next", "then"
-            ]
-            has_transition = any(word in next_sentence for word in transition_words)
-            # Lower score = more abrupt = more human-like
-            transition_scores.append(0.3 if has_transition else 0.7)
-        
-        return transition_scores
+        if scan.n_sentences < 2:
+            return np.array([0.5])
+        
+        return self._transition_scores(scan)[1:]
     
-    def _calculate_variance(self, values: List[float]) -> float:
-        """Calculate variance of a list"""
-        if not values:
-            return 0.0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance
+    def _transition_scores(self, scan: DocumentScan) -> np.ndarray:
+        """Transition score into each sentence"""
+        # Simple heuristic: check for explicit transition words
+        # More explicit transitions = smoother (more AI-like)
+        # Fewer explicit transitions = more abrupt (more human-like)
+        has_transition = (scan.sentence_counts("coherence.transitions") > 0).any(axis=0)
+        # Lower score = more abrupt = more human-like
+        return np.where(has_transition, 0.3, 0.7)
@@ -3,9 +3,17 @@ Semantic Drift Analyzer
 Tracks meaning changes across sentences to detect human thought patterns
 """
 
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Tuple, Optional
 import numpy as np
 
+from engine.stats import (
+    segment_ids, segment_mean, segment_var, RunningStats,
+    window_count, window_mean, window_var, WindowSize, long_range_similarity
+)
+from engine.preprocessing.context import AnalysisContext
+from engine.embeddings.encoder import FeatureEncoder
+
 
 class DriftAnalyzer:
     """
@@ -13,9 +21,45 @@ class DriftAnalyzer:
     Humans show more irregular drift patterns than AI.
     """
     
-    def __init__(self):
-        # Placeholder for embedding model (will use sentence-transformers)
-        self.embedding_model = None
+    # Shared artifacts read from the AnalysisContext
+    requires = ("sentence_lengths", "sentence_word_counts", "sentence_upper_counts")
+    
+    def __init__(
+        self,
+        encoder: Optional[FeatureEncoder] = None,
+        min_gap: int = 3,
+        return_threshold: float = 0.8,
+        block_size: int = 512,
+        long_range_max_sentences: int = 2048
+    ):
+        """
+        Initialize drift analyzer
+        
+        Args:
+            encoder: Sentence embedding encoder. Defaults to one using the
+                process-wide embedding backend when DRIFT_EMBEDDINGS is set,
+                otherwise drift is measured on four simple sentence features.
+            min_gap: Sentences closer than this are not compared by the
+                long-range metrics (neighbors are covered by drift itself)
+            return_threshold: Similarity to an earlier sentence that counts
+                as a return to its topic
+            block_size: Sentences per block of the long-range similarity matrix
+            long_range_max_sentences: Longer documents are compared on an
+                evenly spaced sample of this many sentences, which bounds the
+                quadratic cost of the long-range metrics (0: no limit)
+        """
+        if encoder is None and os.getenv("DRIFT_EMBEDDINGS", "0").lower() in ("1", "true", "yes"):
+            encoder = FeatureEncoder(use_embeddings=True)
+        self.encoder = encoder
+        self.min_gap = min_gap
+        self.return_threshold = return_threshold
+        self.block_size = block_size
+        self.long_range_max_sentences = long_range_max_sentences
+    
+    @property
+    def feature_key(self) -> str:
+        """Identifies the sentence features drift is measured on"""
+        return self.encoder.model_id if self.encoder is not None else "simple"
     
     def analyze(self, sentences: List[str]) -> Dict[str, Any]:
         """
@@ -27,30 +71,109 @@ class DriftAnalyzer:
         Returns:
             Dictionary with drift metrics
         """
-        if len(sentences) < 2:
-            return {
-                "drift_score": 0.5,
-                "drift_variance": 0.0,
-                "drift_vectors": [],
-                "mean_drift": 0.0
-            }
+        return self.analyze_batch([{"sentences": sentences}])[0]
+    
+    def analyze_batch(
+        self,
+        processed_texts: List[Dict[str, Any]],
+        include_series: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze semantic drift for several documents at once.
+        Sentence features for the whole batch are stacked into one matrix.
+        
+        Args:
+            processed_texts: Outputs from TextProcessor
+            include_series: Include the drift vectors and the long-range
+                metrics (skipped when only the summary metrics are needed)
+            
+        Returns:
+            List of drift metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
+        n_docs = len(contexts)
+        
+        # Sentence features of the whole batch, built once (one embedding call)
+        features = self._sentence_features(contexts)
+        
+        # Calculate drift vectors
+        drift_vectors, pair_counts = self._calculate_drift_vectors(features)
+        ids = segment_ids(pair_counts)
+        
+        # Calculate metrics
+        drift_magnitudes = np.linalg.norm(drift_vectors, axis=1)
+        mean_drift = segment_mean(drift_magnitudes, ids, n_docs)
+        drift_variance = segment_var(drift_magnitudes, ids, n_docs)
+        offsets = np.concatenate(([0], np.cumsum(pair_counts)))
+        
+        results = []
+        for i in range(n_docs):
+            result = self._build_result(int(pair_counts[i]), mean_drift[i], drift_variance[i])
+            if include_series:
+                result.update(self._long_range_metrics(features[i]))
+                result["drift_vectors"] = drift_vectors[offsets[i]:offsets[i + 1]].tolist()
+            results.append(result)
+        
+        return results
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence drift signal: magnitude of the drift into each sentence (0 for the first)"""
+        features = self._sentence_features([ctx])[0]
+        magnitudes = np.linalg.norm(features[1:] - features[:-1], axis=1)
+        return {"drift": np.concatenate(([0.0], magnitudes))[:len(features)]}
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Drift metrics of sentence windows [start, start + size), each
+        scored as if its sentences were the whole text
+        """
+        # Pairs inside a window are the drifts into all but its first sentence
+        magnitudes = series["drift"]
+        pair_counts = window_count(len(magnitudes), starts + 1, size - 1)
+        mean_drift = window_mean(magnitudes, starts + 1, size - 1)
+        drift_variance = window_var(magnitudes, starts + 1, size - 1)
         
-        # Calculate drift vectors (placeholder - will use embeddings)
-        drift_vectors = self._calculate_drift_vectors(sentences)
+        return [
+            self._build_result(int(pair_counts[w]), mean_drift[w], drift_variance[w])
+            for w in range(len(starts))
+        ]
+    
+    def init_stream(self) -> Dict[str, Any]:
+        """Running state for streaming analysis"""
+        return {"last_features": None, "magnitudes": RunningStats()}
+    
+    def update_stream(self, state: Dict[str, Any], ctx: AnalysisContext):
+        """Fold the sentences of one streamed segment into the running state"""
+        features = self._sentence_features([ctx])[0]
+        if not len(features):
+            return
         
-        if not drift_vectors:
+        # Drift into the segment's first sentence comes from the previous segment
+        if state["last_features"] is not None:
+            features = np.vstack([state["last_features"], features])
+        state["magnitudes"].update(np.linalg.norm(features[1:] - features[:-1], axis=1))
+        state["last_features"] = features[-1:]
+    
+    def finalize_stream(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Drift metrics of a streamed document"""
+        magnitudes = state["magnitudes"]
+        return self._build_result(magnitudes.count, magnitudes.mean, magnitudes.variance)
+    
+    def _build_result(self, n_pairs: int, mean_drift: float, drift_variance: float) -> Dict[str, Any]:
+        """Score drift from the statistics of drift magnitudes"""
+        if n_pairs == 0:
             return {
                 "drift_score": 0.5,
                 "drift_variance": 0.0,
-                "drift_vectors": [],
                 "mean_drift": 0.0
             }
         
-        # Calculate metrics
-        drift_magnitudes = [np.linalg.norm(dv) for dv in drift_vectors]
-        mean_drift = np.mean(drift_magnitudes)
-        drift_variance = np.var(drift_magnitudes)
-        
         # Higher variance in drift = more human-like
         # Normalize variance (heuristic threshold)
         normalized_variance = min(1.0, drift_variance / 0.1)
@@ -61,44 +184,86 @@ class DriftAnalyzer:
         return {
             "drift_score": float(drift_score),
             "drift_variance": float(drift_variance),
-            "drift_vectors": [dv.tolist() if isinstance(dv, np.ndarray) else dv for dv in drift_vectors],
             "mean_drift": float(mean_drift)
         }
     
-    def _calculate_drift_vectors(self, sentences: List[str]) -> List[np.ndarray]:
+    def _calculate_drift_vectors(self, features: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Calculate semantic drift vectors between consecutive sentences
         
-        TODO: Replace with actual sentence embeddings using sentence-transformers
-        For now, returns placeholder vectors based on simple features
+        Args:
+            features: Sentence feature matrix of each document
+        
+        Returns:
+            Tuple of (drift vectors for all documents stacked row-wise,
+            number of sentence pairs per document)
         """
-        if len(sentences) < 2:
-            return []
+        counts = np.array([len(f) for f in features], dtype=np.int64)
+        ids = segment_ids(counts)
         
-        drift_vectors = []
+        non_empty = [f for f in features if len(f)]
+        features = np.vstack(non_empty) if non_empty else np.zeros((0, 4))
         
-        # Placeholder: simple feature-based drift
-        # In production, this will use sentence embeddings
-        prev_features = self._extract_simple_features(sentences[0])
+        # Drift vector = difference in features, only within the same document
+        same_doc = ids[1:] == ids[:-1]
+        drift_vectors = (features[1:] - features[:-1])[same_doc]
         
-        for sentence in sentences[1:]:
-            curr_features = self._extract_simple_features(sentence)
-            # Drift vector = difference in features
-            drift = np.array(curr_features) - np.array(prev_features)
-            drift_vectors.append(drift)
-            prev_features = curr_features
+        return drift_vectors, np.maximum(counts - 1, 0)
+    
+    def _long_range_metrics(self, features: np.ndarray) -> Dict[str, Any]:
+        """
+        Similarity between sentences at least min_gap apart, computed in
+        blocks: catches a text circling back to earlier topics, which
+        consecutive drift cannot see. Topic returns need embeddings; on
+        simple features they only mark returns to a similar sentence shape.
+        Documents above long_range_max_sentences are compared on every k-th
+        sentence, with the gap scaled down accordingly.
+        """
+        if not self._uses_embeddings() and len(features):
+            # Simple features have unrelated scales; compare standardized values
+            std = features.std(axis=0)
+            features = np.divide(features - features.mean(axis=0), std, out=np.zeros(features.shape), where=std > 0)
         
-        return drift_vectors
+        min_gap = self.min_gap
+        if self.long_range_max_sentences > 0 and len(features) > self.long_range_max_sentences:
+            step = -(-len(features) // self.long_range_max_sentences)
+            features = features[::step]
+            min_gap = -(-min_gap // step)
+        
+        mean_similarity, _, best = long_range_similarity(features, min_gap, self.block_size)
+        best = best[~np.isnan(best)]
+        returns = int((best >= self.return_threshold).sum())
+        return {
+            "long_range_similarity": float(mean_similarity),
+            "topic_returns": returns,
+            "return_rate": returns / len(best) if len(best) else 0.0
+        }
+    
+    def _uses_embeddings(self) -> bool:
+        return self.encoder is not None and self.encoder.use_embeddings
     
-    def _extract_simple_features(self, sentence: str) -> List[float]:
+    def _sentence_features(self, contexts: List[AnalysisContext]) -> List[np.ndarray]:
         """
-        Extract simple features for placeholder implementation
-        TODO: Replace with proper sentence embeddings
+        Feature matrix of each document's sentences: sentence embeddings
+        when an encoder is configured, otherwise simple features
         """
-        words = sentence.lower().split()
-        return [
-            len(sentence),  # Length
-            len(words),  # Word count
-            sum(1 for c in sentence if c.isupper()) / max(1, len(sentence)),  # Capitalization ratio
-            sentence.count('?') + sentence.count('!'),  # Question/exclamation count
-        ]
+        if self._uses_embeddings():
+            documents = self.encoder.encode_documents([list(ctx["sentences"]) for ctx in contexts])
+            if self._uses_embeddings():  # False if the backend failed to load
+                return documents
+        return [self._extract_simple_features(ctx) for ctx in contexts]
+    
+    def _extract_simple_features(self, ctx: AnalysisContext) -> np.ndarray:
+        """
+        Extract simple features (used when no embedding encoder is configured)
+        
+        Returns:
+            Feature matrix (n_sentences, 4), built from shared context artifacts
+        """
+        lengths = ctx.sentence_lengths
+        return np.column_stack([
+            lengths,  # Length
+            ctx.sentence_word_counts,  # Word count
+            ctx.sentence_upper_counts / np.maximum(1, lengths),  # Capitalization ratio
+            [s.count('?') + s.count('!') for s in ctx["sentences"]],  # Question/exclamation count
+        ]).reshape(-1, 4)
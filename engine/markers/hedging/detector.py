@@ -4,7 +4,14 @@ Detects uncertainty markers and hedging patterns - humans use more varied hedgin
 """
 
 from typing import List, Dict, Any
-import re
+import numpy as np
+
+from engine.stats import (
+    segment_ids, segment_var, RunningStats,
+    window_sum, window_var, window_type_counts, WindowSize
+)
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.patterns import PatternScanner, DocumentScan, literal_pattern
 
 
 class HedgingDetector:
@@ -13,6 +20,9 @@ class HedgingDetector:
     Humans show more inconsistent and varied hedging than AI.
     """
     
+    # Shared artifacts read from the AnalysisContext
+    requires = ("text_lower", "sentences_lower", "sentence_word_sets_lower")
+    
     def __init__(self):
         # Comprehensive hedging word lists
         self.hedging_modals = {
@@ -44,6 +54,14 @@ class HedgingDetector:
             r"(maybe|perhaps|probably)",
             r"(hows|how\s+is|how\s+are)",
         ]
+        
+        self.hedging_words = self.hedging_modals | self.hedging_verbs | self.hedging_adverbs
+        
+        # All patterns are matched in one pass (shared with other markers by the engine)
+        self.scanner = PatternScanner({
+            "hedging.phrases": self.hedging_phrases,
+            "hedging.words": [literal_pattern(self.hedging_words)],
+        })
     
     def detect(self, text: str, sentences: List[str]) -> Dict[str, Any]:
         """
@@ -56,27 +74,143 @@ class HedgingDetector:
         Returns:
             Dictionary with hedging metrics
         """
-        text_lower = text.lower()
+        return self.detect_batch([{"cleaned": text, "sentences": sentences}])[0]
+    
+    def detect_batch(
+        self,
+        processed_texts: List[Dict[str, Any]],
+        include_series: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect hedging patterns for several documents at once.
+        Per-sentence counts are reduced as flat arrays across the batch.
         
-        # Count hedging words
-        modal_count = sum(1 for word in self.hedging_modals if word in text_lower)
-        verb_count = sum(1 for word in self.hedging_verbs if word in text_lower)
-        adverb_count = sum(1 for word in self.hedging_adverbs if word in text_lower)
+        Args:
+            processed_texts: Outputs from TextProcessor
+            include_series: Include the per-sentence hedging counts (skipped when only
+                the summary metrics are needed)
+            
+        Returns:
+            List of hedging metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
+        scans = [ctx.scan(self.scanner) for ctx in contexts]
+        n_docs = len(contexts)
+        counts = [ctx["sentence_count"] for ctx in contexts]
+        ids = segment_ids(counts)
         
-        # Count hedging phrases
-        phrase_count = sum(
-            1 for pattern in self.hedging_phrases
-            if re.search(pattern, text_lower)
+        # Analyze distribution across sentences
+        sentence_hedging = np.concatenate([
+            self._sentence_hedging(ctx, scan) for ctx, scan in zip(contexts, scans)
+        ] + [np.zeros(0)])
+        hedging_variance = segment_var(sentence_hedging, ids, n_docs)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        
+        results = []
+        for i, (ctx, scan) in enumerate(zip(contexts, scans)):
+            # Count hedging words and phrases (from the same scan as the sentence counts)
+            found = scan.found_literals("hedging.words", self.hedging_words)
+            phrase_count = int((scan.document_counts("hedging.phrases") > 0).sum())
+            
+            result = self._build_result(
+                len(found & self.hedging_modals), len(found & self.hedging_verbs),
+                len(found & self.hedging_adverbs), phrase_count,
+                len(ctx["cleaned"].split()), hedging_variance[i]
+            )
+            if include_series:
+                result["sentence_hedging"] = sentence_hedging[offsets[i]:offsets[i + 1]].astype(int).tolist()
+            results.append(result)
+        
+        return results
+    
+    def init_stream(self) -> Dict[str, Any]:
+        """Running state for streaming detection"""
+        return {
+            "found": set(),
+            "phrases": np.zeros(len(self.hedging_phrases), dtype=bool),
+            "word_count": 0,
+            "ends_in_word": False,
+            "sentence_hedging": RunningStats(),
+        }
+    
+    def update_stream(self, state: Dict[str, Any], ctx: AnalysisContext):
+        """Fold one streamed segment into the running state"""
+        scan = ctx.scan(self.scanner)
+        state["found"] |= scan.found_literals("hedging.words", self.hedging_words)
+        state["phrases"] |= scan.document_counts("hedging.phrases") > 0
+        text = ctx["cleaned"]
+        if text:
+            # A word cut at the segment boundary must only be counted once
+            joined_word = state["ends_in_word"] and not text[0].isspace()
+            state["word_count"] += len(text.split()) - int(joined_word)
+            state["ends_in_word"] = not text[-1].isspace()
+        state["sentence_hedging"].update(self._sentence_hedging(ctx, scan))
+    
+    def finalize_stream(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Hedging metrics of a streamed document"""
+        found = state["found"]
+        return self._build_result(
+            len(found & self.hedging_modals), len(found & self.hedging_verbs),
+            len(found & self.hedging_adverbs), int(state["phrases"].sum()),
+            state["word_count"], state["sentence_hedging"].variance
         )
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence hedging signal"""
+        return {"hedging": self._sentence_hedging(ctx, ctx.scan(self.scanner))}
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Hedging metrics of sentence windows [start, start + size), each
+        scored as if its sentences were the whole text
+        """
+        scan = ctx.scan(self.scanner)
+        found = scan.sentence_literals("hedging.words", self.hedging_words, ctx.sentences_lower)
+        phrases = [np.flatnonzero(present).tolist() for present in (scan.sentence_counts("hedging.phrases") > 0).T]
         
-        total_hedging = modal_count + verb_count + adverb_count + phrase_count
+        # Distinct hedging words and phrases present in each window
+        modal_counts = window_type_counts([f & self.hedging_modals for f in found], starts, size)[0]
+        verb_counts = window_type_counts([f & self.hedging_verbs for f in found], starts, size)[0]
+        adverb_counts = window_type_counts([f & self.hedging_adverbs for f in found], starts, size)[0]
+        phrase_counts = window_type_counts(phrases, starts, size)[0]
+        word_counts = window_sum(ctx.sentence_word_counts, starts, size)
+        hedging_variance = window_var(series["hedging"], starts, size)
         
-        # Analyze distribution across sentences
-        sentence_hedging = [self._count_sentence_hedging(s) for s in sentences]
-        hedging_variance = self._calculate_variance(sentence_hedging) if len(sentence_hedging) > 1 else 0.0
+        return [
+            self._build_result(
+                int(modal_counts[w]), int(verb_counts[w]), int(adverb_counts[w]),
+                int(phrase_counts[w]), int(word_counts[w]), hedging_variance[w]
+            )
+            for w in range(len(starts))
+        ]
+    
+    def _build_result(
+        self,
+        modal_count: int,
+        verb_count: int,
+        adverb_count: int,
+        phrase_count: int,
+        word_count: int,
+        hedging_variance: float
+    ) -> Dict[str, Any]:
+        """
+        Score hedging from document-level counts
+        
+        Args:
+            modal_count, verb_count, adverb_count: Distinct hedging words present
+            phrase_count: Number of hedging phrase patterns present
+            word_count: Number of whitespace-separated words in the text
+            hedging_variance: Variance of per-sentence hedging counts
+        """
+        total_hedging = modal_count + verb_count + adverb_count + phrase_count
         
         # Normalize by text length
-        word_count = len(text.split())
         hedging_density = total_hedging / max(1, word_count / 100)  # Per 100 words
         
         # Score: higher density + higher variance = more human-like
@@ -94,32 +228,31 @@ class HedgingDetector:
             "adverb_count": adverb_count,
             "phrase_count": phrase_count,
             "hedging_density": float(hedging_density),
-            "hedging_variance": float(hedging_variance),
-            "sentence_hedging": sentence_hedging
+            "hedging_variance": float(hedging_variance)
         }
     
-    def _count_sentence_hedging(self, sentence: str) -> int:
-        """Count hedging markers in a single sentence"""
-        sentence_lower = sentence.lower()
+    def _sentence_hedging(self, ctx: AnalysisContext, scan: DocumentScan) -> np.ndarray:
+        """Count hedging words and phrases in each sentence"""
+        return (
+            self._count_sentence_hedging(ctx.sentence_word_sets_lower)
+            + (scan.sentence_counts("hedging.phrases") > 0).sum(axis=0)
+        )
+    
+    def _count_sentence_hedging(self, word_sets: List[set]) -> np.ndarray:
+        """Count hedging words in each sentence (phrases are counted from the scan)"""
+        return np.fromiter(
+            (self._count_hedging_words(words) for words in word_sets),
+            dtype=float,
+            count=len(word_sets)
+        )
+    
+    def _count_hedging_words(self, words: set) -> int:
+        """Count hedging words in a single sentence's word set"""
         count = 0
         
         # Count words
-        words = set(sentence_lower.split())
         count += len(words & self.hedging_modals)
         count += len(words & self.hedging_verbs)
         count += len(words & self.hedging_adverbs)
         
-        # Count phrases
-        for pattern in self.hedging_phrases:
-            if re.search(pattern, sentence_lower):
-                count += 1
-        
         return count
-    
-    def _calculate_variance(self, values: List[int]) -> float:
-        """Calculate variance of a list"""
-        if not values:
-            return 0.0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance
@@ -5,7 +5,14 @@ Humans produce more unique metaphors than AI
 """
 
 from typing import List, Dict, Any
-import re
+import numpy as np
+
+from engine.stats import (
+    segment_ids, segment_var, RunningStats,
+    window_sum, window_var, window_type_counts, WindowSize
+)
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.patterns import PatternScanner, DocumentScan, literal_pattern
 
 
 class MetaphorCounter:
@@ -14,6 +21,9 @@ class MetaphorCounter:
     Humans produce more unique and varied metaphors than AI.
     """
     
+    # Shared artifacts read from the AnalysisContext
+    requires = ("text_lower", "sentences_lower")
+    
     def __init__(self):
         # Common metaphorical patterns
         self.metaphor_patterns = [
@@ -27,6 +37,12 @@ class MetaphorCounter:
             "journey", "path", "road", "bridge", "foundation", "building",
             "key", "door", "window", "light", "darkness", "ocean", "wave"
         }
+        
+        # All patterns are matched in one pass (shared with other markers by the engine)
+        self.scanner = PatternScanner({
+            "metaphor.patterns": self.metaphor_patterns,
+            "metaphor.common": [literal_pattern(self.common_ai_metaphors)],
+        })
     
     def count(self, text: str, sentences: List[str]) -> Dict[str, Any]:
         """
@@ -39,26 +55,126 @@ class MetaphorCounter:
         Returns:
             Dictionary with metaphor metrics
         """
-        text_lower = text.lower()
+        return self.count_batch([{"cleaned": text, "sentences": sentences}])[0]
+    
+    def count_batch(
+        self,
+        processed_texts: List[Dict[str, Any]],
+        include_series: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Count and analyze metaphors for several documents at once.
+        Per-sentence counts are reduced as flat arrays across the batch.
         
-        # Detect potential metaphors
-        metaphors = []
-        for pattern in self.metaphor_patterns:
-            matches = re.finditer(pattern, text_lower)
-            metaphors.extend([m.group() for m in matches])
+        Args:
+            processed_texts: Outputs from TextProcessor
+            include_series: Include the per-sentence metaphor counts (skipped when only
+                the summary metrics are needed)
+            
+        Returns:
+            List of metaphor metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
+        scans = [ctx.scan(self.scanner) for ctx in contexts]
+        n_docs = len(contexts)
+        counts = [ctx["sentence_count"] for ctx in contexts]
+        ids = segment_ids(counts)
+        
+        # Analyze distribution
+        sentence_metaphors = np.concatenate(
+            [self._count_sentence_metaphors(scan) for scan in scans] + [np.zeros(0)]
+        )
+        metaphor_variance = segment_var(sentence_metaphors, ids, n_docs)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        
+        results = []
+        for i, scan in enumerate(scans):
+            # Detect potential metaphors (from the same scan as the sentence counts)
+            metaphors = scan.matched_strings("metaphor.patterns")
+            
+            # Count common AI metaphors (lower uniqueness score)
+            common = scan.found_literals("metaphor.common", self.common_ai_metaphors)
+            
+            result = self._build_result(len(metaphors), len(set(metaphors)), len(common), metaphor_variance[i])
+            if include_series:
+                result["sentence_metaphors"] = sentence_metaphors[offsets[i]:offsets[i + 1]].astype(int).tolist()
+            results.append(result)
+        
+        return results
+    
+    def init_stream(self) -> Dict[str, Any]:
+        """Running state for streaming counting"""
+        return {
+            "total": 0,
+            "distinct": set(),
+            "common": set(),
+            "sentence_metaphors": RunningStats(),
+        }
+    
+    def update_stream(self, state: Dict[str, Any], ctx: AnalysisContext):
+        """Fold one streamed segment into the running state"""
+        scan = ctx.scan(self.scanner)
+        metaphors = scan.matched_strings("metaphor.patterns")
+        state["total"] += len(metaphors)
+        state["distinct"].update(metaphors)
+        state["common"] |= scan.found_literals("metaphor.common", self.common_ai_metaphors)
+        state["sentence_metaphors"].update(self._count_sentence_metaphors(scan))
+    
+    def finalize_stream(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Metaphor metrics of a streamed document"""
+        return self._build_result(
+            state["total"], len(state["distinct"]), len(state["common"]),
+            state["sentence_metaphors"].variance
+        )
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence metaphor signal"""
+        return {"metaphors": self._count_sentence_metaphors(ctx.scan(self.scanner))}
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Metaphor metrics of sentence windows [start, start + size), each
+        scored as if its sentences were the whole text
+        """
+        scan = ctx.scan(self.scanner)
+        distinct = window_type_counts(scan.sentence_matches("metaphor.patterns"), starts, size)[0]
+        common = window_type_counts(
+            scan.sentence_literals("metaphor.common", self.common_ai_metaphors, ctx.sentences_lower),
+            starts, size
+        )[0]
+        totals = window_sum(series["metaphors"], starts, size)
+        metaphor_variance = window_var(series["metaphors"], starts, size)
         
-        # Count common AI metaphors (lower uniqueness score)
-        common_count = sum(1 for word in self.common_ai_metaphors if word in text_lower)
+        return [
+            self._build_result(int(totals[w]), int(distinct[w]), int(common[w]), metaphor_variance[w])
+            for w in range(len(starts))
+        ]
+    
+    def _build_result(
+        self,
+        total_metaphors: int,
+        unique_metaphors: int,
+        common_count: int,
+        metaphor_variance: float
+    ) -> Dict[str, Any]:
+        """
+        Score metaphor usage from document-level counts
         
+        Args:
+            total_metaphors: Number of metaphor pattern matches
+            unique_metaphors: Number of distinct matched metaphors
+            common_count: Number of common AI metaphor words present in the text
+            metaphor_variance: Variance of per-sentence metaphor counts
+        """
         # Analyze uniqueness
-        unique_metaphors = len(set(metaphors))
-        total_metaphors = len(metaphors)
         uniqueness_ratio = unique_metaphors / max(1, total_metaphors)
         
-        # Analyze distribution
-        sentence_metaphors = [self._count_sentence_metaphors(s) for s in sentences]
-        metaphor_variance = self._calculate_variance(sentence_metaphors) if len(sentence_metaphors) > 1 else 0.0
-        
         # Score: higher uniqueness + higher variance = more human-like
         # Penalize common AI metaphors
         uniqueness_score = uniqueness_ratio
@@ -82,22 +198,9 @@ class MetaphorCounter:
             "unique_metaphors": unique_metaphors,
             "uniqueness_ratio": float(uniqueness_ratio),
             "common_ai_metaphors": common_count,
-            "metaphor_variance": float(metaphor_variance),
-            "sentence_metaphors": sentence_metaphors
+            "metaphor_variance": float(metaphor_variance)
         }
     
-    def _count_sentence_metaphors(self, sentence: str) -> int:
-        """Count metaphors in a single sentence"""
-        sentence_lower = sentence.lower()
-        count = 0
-        for pattern in self.metaphor_patterns:
-            count += len(re.findall(pattern, sentence_lower))
-        return count
-    
-    def _calculate_variance(self, values: List[int]) -> float:
-        """Calculate variance of a list"""
-        if not values:
-            return 0.0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance
+    def _count_sentence_metaphors(self, scan: DocumentScan) -> np.ndarray:
+        """Count metaphors in each sentence"""
+        return scan.sentence_counts("metaphor.patterns").sum(axis=0).astype(float)
@@ -4,8 +4,14 @@ Extracts individual writing style fingerprint as a graph
 """
 
 from typing import List, Dict, Any
-import re
 from collections import Counter
+import numpy as np
+
+from engine.stats import (
+    concat_segments, segment_ids, segment_sum, segment_mean, segment_var, RunningStats,
+    window_count, window_sum, window_mean, window_var, window_type_counts, WindowSize
+)
+from engine.preprocessing.context import AnalysisContext
 
 
 class StylometricExtractor:
@@ -14,6 +20,11 @@ class StylometricExtractor:
     Humans show more unique and consistent stylometric patterns.
     """
     
+    # Shared artifacts read from the AnalysisContext
+    requires = ("sentence_word_counts", "char_classes")
+    
+    punct_chars = ".,!?;:—()[]{}'\""
+    
     def extract(self, text: str, sentences: List[str], tokens: List[str]) -> Dict[str, Any]:
         """
         Extract stylometric features
@@ -26,21 +37,211 @@ class StylometricExtractor:
         Returns:
             Dictionary with stylometric metrics
         """
-        # Character-level features
-        char_features = self._extract_char_features(text)
+        return self.extract_batch([{"cleaned": text, "sentences": sentences, "tokens": tokens}])[0]
+    
+    def extract_batch(self, processed_texts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract stylometric features for several documents at once.
+        Word- and sentence-level statistics are computed as flat arrays across the batch.
+        
+        Args:
+            processed_texts: Outputs from TextProcessor
+            
+        Returns:
+            List of stylometric metric dictionaries, one per document
+        """
+        contexts = [AnalysisContext.from_processed(p) for p in processed_texts]
         
         # Word-level features
-        word_features = self._extract_word_features(tokens)
+        word_features = self._extract_word_features([ctx["tokens"] for ctx in contexts])
         
         # Sentence-level features
-        sentence_features = self._extract_sentence_features(sentences)
+        sentence_features = self._extract_sentence_features(contexts)
+        
+        results = []
+        for i, ctx in enumerate(contexts):
+            text = ctx["cleaned"]
+            tokens = ctx["tokens"]
+            
+            # Character-level features
+            char_features = self._extract_char_features(text, ctx.char_classes)
+            
+            # Punctuation features
+            punct_features = self._extract_punctuation_features(text)
+            
+            # Vocabulary richness
+            vocab_features = self._extract_vocab_features(tokens)
+            
+            results.append(self._build_result(
+                char_features, word_features[i], sentence_features[i],
+                punct_features, vocab_features
+            ))
+        
+        return results
+    
+    def sentence_series(self, ctx: AnalysisContext) -> Dict[str, np.ndarray]:
+        """Per-sentence stylometric signals"""
+        sentence_tokens = ctx.sentence_tokens
+        n_sentences = len(sentence_tokens)
+        counts = [len(tokens) for tokens in sentence_tokens]
+        ids = segment_ids(counts)
+        token_lengths = np.fromiter(
+            (len(token) for tokens in sentence_tokens for token in tokens),
+            dtype=float,
+            count=sum(counts)
+        )
+        return {
+            "token_count": np.asarray(counts, dtype=float),
+            "token_length_sum": segment_sum(token_lengths, ids, n_sentences),
+            "token_length_sq_sum": segment_sum(token_lengths ** 2, ids, n_sentences),
+            "long_words": segment_sum((token_lengths > 6).astype(float), ids, n_sentences),
+            "short_words": segment_sum((token_lengths < 4).astype(float), ids, n_sentences),
+            "uppercase_ratio": ctx.sentence_upper_counts / np.maximum(1, ctx.sentence_lengths),
+        }
+    
+    def window_results(
+        self,
+        ctx: AnalysisContext,
+        series: Dict[str, np.ndarray],
+        starts: np.ndarray,
+        size: WindowSize
+    ) -> List[Dict[str, Any]]:
+        """
+        Stylometric metrics of sentence windows [start, start + size), each
+        scored as if its sentences (concatenated) were the whole text
+        """
+        sentences = ctx["sentences"]
+        n_windows = len(starts)
+        sums = {
+            name: window_sum(values, starts, size)
+            for name, values in series.items() if name != "uppercase_ratio"
+        }
+        char_counts = window_sum(ctx.sentence_lengths, starts, size)
+        word_counts = window_sum(ctx.sentence_word_counts, starts, size)
+        char_classes = {
+            name: window_sum(counts, starts, size)
+            for name, counts in ctx.sentence_char_classes.items()
+        }
+        punct_counts = {
+            char: window_sum([s.count(char) for s in sentences], starts, size)
+            for char in self.punct_chars
+        }
+        sentence_counts = window_count(len(sentences), starts, size)
+        sentence_means = window_mean(ctx.sentence_word_counts, starts, size)
+        sentence_variance = window_var(ctx.sentence_word_counts, starts, size)
+        unique_tokens, hapax = window_type_counts(ctx.sentence_tokens, starts, size)
+        
+        results = []
+        for w in range(n_windows):
+            n_tokens = sums["token_count"][w]
+            if n_tokens:
+                avg_length = sums["token_length_sum"][w] / n_tokens
+                word_features = {
+                    "avg_word_length": avg_length,
+                    "word_length_variance": max(0.0, sums["token_length_sq_sum"][w] / n_tokens - avg_length ** 2),
+                    "long_word_ratio": sums["long_words"][w] / n_tokens,
+                    "short_word_ratio": sums["short_words"][w] / n_tokens,
+                }
+                vocab_features = {
+                    "type_token_ratio": unique_tokens[w] / n_tokens,
+                    "hapax_ratio": hapax[w] / n_tokens,
+                    "unique_tokens": int(unique_tokens[w]),
+                    "total_tokens": int(n_tokens),
+                }
+            else:
+                word_features = vocab_features = {}
+            
+            sentence_features = {
+                "avg_sentence_length": sentence_means[w],
+                "sentence_length_variance": sentence_variance[w],
+                "sentence_count": int(sentence_counts[w]),
+            } if sentence_counts[w] else {}
+            
+            char_count = int(char_counts[w])
+            results.append(self._build_result(
+                self._char_features(
+                    char_count, int(word_counts[w]),
+                    {name: counts[w] for name, counts in char_classes.items()}
+                ),
+                word_features,
+                sentence_features,
+                self._punctuation_features({char: counts[w] for char, counts in punct_counts.items()}, char_count),
+                vocab_features
+            ))
+        
+        return results
+    
+    def init_stream(self) -> Dict[str, Any]:
+        """Running state for streaming extraction"""
+        return {
+            "char_count": 0,
+            "word_count": 0,
+            "ends_in_word": False,
+            "char_classes": Counter(),
+            "punct_counts": Counter(),
+            "word_lengths": RunningStats(),
+            "long_words": 0,
+            "short_words": 0,
+            "sentence_lengths": RunningStats(),
+            "token_counts": Counter(),
+        }
+    
+    def update_stream(self, state: Dict[str, Any], ctx: AnalysisContext):
+        """Fold one streamed segment into the running state"""
+        text = ctx["cleaned"]
+        if not text:
+            return
+        
+        # A word cut at the segment boundary must only be counted once
+        joined_word = state["ends_in_word"] and not text[0].isspace()
+        state["word_count"] += len(text.split()) - int(joined_word)
+        state["ends_in_word"] = not text[-1].isspace()
+        state["char_count"] += len(text)
+        state["char_classes"].update(ctx.char_classes)
+        state["punct_counts"].update({char: text.count(char) for char in self.punct_chars})
         
-        # Punctuation features
-        punct_features = self._extract_punctuation_features(text)
+        word_lengths = np.fromiter((len(t) for t in ctx["tokens"]), dtype=float, count=len(ctx["tokens"]))
+        state["word_lengths"].update(word_lengths)
+        state["long_words"] += int((word_lengths > 6).sum())
+        state["short_words"] += int((word_lengths < 4).sum())
+        state["sentence_lengths"].update(ctx.sentence_word_counts)
+        state["token_counts"].update(ctx["tokens"])
+    
+    def finalize_stream(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Stylometric metrics of a streamed document"""
+        char_count = state["char_count"]
+        word_lengths = state["word_lengths"]
+        sentence_lengths = state["sentence_lengths"]
         
-        # Vocabulary richness
-        vocab_features = self._extract_vocab_features(tokens)
+        char_features = self._char_features(char_count, state["word_count"], state["char_classes"])
+        word_features = {
+            "avg_word_length": word_lengths.mean,
+            "word_length_variance": word_lengths.variance,
+            "long_word_ratio": state["long_words"] / word_lengths.count,
+            "short_word_ratio": state["short_words"] / word_lengths.count,
+        } if word_lengths.count else {}
+        sentence_features = {
+            "avg_sentence_length": sentence_lengths.mean,
+            "sentence_length_variance": sentence_lengths.variance,
+            "sentence_count": sentence_lengths.count,
+        } if sentence_lengths.count else {}
+        punct_features = self._punctuation_features(state["punct_counts"], char_count)
+        vocab_features = self._vocab_features(state["token_counts"])
         
+        return self._build_result(
+            char_features, word_features, sentence_features,
+            punct_features, vocab_features
+        )
+    
+    def _build_result(
+        self,
+        char_features: Dict[str, float],
+        word_features: Dict[str, float],
+        sentence_features: Dict[str, float],
+        punct_features: Dict[str, float],
+        vocab_features: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Combine feature groups into a fingerprint and score it"""
         # Combine features into a fingerprint
         fingerprint = {
             **char_features,
@@ -64,74 +265,103 @@ class StylometricExtractor:
             "vocab_features": vocab_features
         }
     
-    def _extract_char_features(self, text: str) -> Dict[str, float]:
-        """Extract character-level features"""
-        if not text:
+    def _extract_char_features(self, text: str, char_classes: Dict[str, int]) -> Dict[str, float]:
+        """Extract character-level features from the shared character-class histogram"""
+        return self._char_features(len(text), len(text.split()), char_classes)
+    
+    def _char_features(self, char_count: int, word_count: int, char_classes: Dict[str, int]) -> Dict[str, float]:
+        """Character-level features from text length, word count and class histogram"""
+        if not char_count:
             return {}
         
         return {
-            "avg_char_per_word": len(text) / max(1, len(text.split())),
-            "uppercase_ratio": sum(1 for c in text if c.isupper()) / len(text),
-            "digit_ratio": sum(1 for c in text if c.isdigit()) / len(text),
-            "space_ratio": text.count(' ') / len(text),
+            "avg_char_per_word": char_count / max(1, word_count),
+            "uppercase_ratio": char_classes["upper"] / char_count,
+            "digit_ratio": char_classes["digit"] / char_count,
+            "space_ratio": char_classes["space"] / char_count,
         }
     
-    def _extract_word_features(self, tokens: List[str]) -> Dict[str, float]:
-        """Extract word-level features"""
-        if not tokens:
-            return {}
+    def _extract_word_features(self, token_lists: List[List[str]]) -> List[Dict[str, float]]:
+        """Extract word-level features for each document"""
+        n_docs = len(token_lists)
+        counts = [len(tokens) for tokens in token_lists]
+        ids = segment_ids(counts)
+        word_lengths = np.fromiter(
+            (len(token) for tokens in token_lists for token in tokens),
+            dtype=float,
+            count=sum(counts)
+        )
         
-        word_lengths = [len(token) for token in tokens]
-        return {
-            "avg_word_length": sum(word_lengths) / len(word_lengths),
-            "word_length_variance": sum((x - sum(word_lengths)/len(word_lengths))**2 for x in word_lengths) / len(word_lengths),
-            "long_word_ratio": sum(1 for w in tokens if len(w) > 6) / len(tokens),
-            "short_word_ratio": sum(1 for w in tokens if len(w) < 4) / len(tokens),
-        }
+        avg_length = segment_mean(word_lengths, ids, n_docs)
+        length_variance = segment_var(word_lengths, ids, n_docs)
+        long_ratio = segment_mean((word_lengths > 6).astype(float), ids, n_docs)
+        short_ratio = segment_mean((word_lengths < 4).astype(float), ids, n_docs)
+        
+        return [
+            {
+                "avg_word_length": float(avg_length[i]),
+                "word_length_variance": float(length_variance[i]),
+                "long_word_ratio": float(long_ratio[i]),
+                "short_word_ratio": float(short_ratio[i]),
+            } if counts[i] else {}
+            for i in range(n_docs)
+        ]
     
-    def _extract_sentence_features(self, sentences: List[str]) -> Dict[str, float]:
-        """Extract sentence-level features"""
-        if not sentences:
-            return {}
+    def _extract_sentence_features(self, contexts: List[AnalysisContext]) -> List[Dict[str, float]]:
+        """Extract sentence-level features for each document"""
+        n_docs = len(contexts)
+        counts = [ctx["sentence_count"] for ctx in contexts]
+        ids = segment_ids(counts)
+        sentence_lengths = concat_segments(ctx.sentence_word_counts for ctx in contexts)
         
-        sentence_lengths = [len(s.split()) for s in sentences]
-        return {
-            "avg_sentence_length": sum(sentence_lengths) / len(sentence_lengths),
-            "sentence_length_variance": sum((x - sum(sentence_lengths)/len(sentence_lengths))**2 for x in sentence_lengths) / len(sentence_lengths),
-            "sentence_count": len(sentences),
-        }
+        avg_length = segment_mean(sentence_lengths, ids, n_docs)
+        length_variance = segment_var(sentence_lengths, ids, n_docs)
+        
+        return [
+            {
+                "avg_sentence_length": float(avg_length[i]),
+                "sentence_length_variance": float(length_variance[i]),
+                "sentence_count": counts[i],
+            } if counts[i] else {}
+            for i in range(n_docs)
+        ]
     
     def _extract_punctuation_features(self, text: str) -> Dict[str, float]:
         """Extract punctuation features"""
-        punct_chars = ".,!?;:—()[]{}'\""
-        punct_counts = {char: text.count(char) for char in punct_chars}
-        total_chars = len(text)
-        
+        punct_counts = {char: text.count(char) for char in self.punct_chars}
+        return self._punctuation_features(punct_counts, len(text))
+    
+    def _punctuation_features(self, punct_counts: Dict[str, int], total_chars: int) -> Dict[str, float]:
+        """Punctuation features from per-character counts"""
         return {
-            f"punct_{char}_ratio": count / max(1, total_chars)
-            for char, count in punct_counts.items()
+            f"punct_{char}_ratio": punct_counts.get(char, 0) / max(1, total_chars)
+            for char in self.punct_chars
         }
     
     def _extract_vocab_features(self, tokens: List[str]) -> Dict[str, float]:
         """Extract vocabulary richness features"""
-        if not tokens:
+        return self._vocab_features(Counter(tokens))
+    
+    def _vocab_features(self, token_counts: Counter) -> Dict[str, float]:
+        """Vocabulary richness features from token frequencies (type counts)"""
+        total_tokens = sum(token_counts.values())
+        if not total_tokens:
             return {}
         
-        unique_tokens = len(set(tokens))
-        token_counts = Counter(tokens)
+        unique_tokens = len(token_counts)
         
         # Type-token ratio (vocabulary richness)
-        ttr = unique_tokens / len(tokens)
+        ttr = unique_tokens / total_tokens
         
         # Hapax legomena (words that appear only once)
         hapax_count = sum(1 for count in token_counts.values() if count == 1)
-        hapax_ratio = hapax_count / len(tokens)
+        hapax_ratio = hapax_count / total_tokens
         
         return {
             "type_token_ratio": ttr,
             "hapax_ratio": hapax_ratio,
             "unique_tokens": unique_tokens,
-            "total_tokens": len(tokens),
+            "total_tokens": total_tokens,
         }
     
     def _calculate_uniqueness(self, fingerprint: Dict[str, float]) -> float:
@@ -160,3 +390,27 @@ class StylometricExtractor:
         uniqueness = min(1.0, cv / 2.0)
         
         return uniqueness
+
+
+# Fixed schema of fingerprint vectors: style ratios and averages only
+# (absolute counts such as sentence_count grow with text length, not style)
+FINGERPRINT_FEATURES = (
+    "avg_char_per_word", "uppercase_ratio", "digit_ratio", "space_ratio",
+    "avg_word_length", "word_length_variance", "long_word_ratio", "short_word_ratio",
+    "avg_sentence_length", "sentence_length_variance",
+    *(f"punct_{char}_ratio" for char in StylometricExtractor.punct_chars),
+    "type_token_ratio", "hapax_ratio",
+)
+
+
+def fingerprint_vector(fingerprint: Dict[str, Any]) -> np.ndarray:
+    """
+    Fingerprint dictionary as a float32 vector in FINGERPRINT_FEATURES order
+    
+    Args:
+        fingerprint: "fingerprint" of a stylometry result (missing features are 0)
+        
+    Returns:
+        Array of shape (len(FINGERPRINT_FEATURES),)
+    """
+    return np.array([fingerprint.get(name, 0.0) for name in FINGERPRINT_FEATURES], dtype=np.float32)
@@ -0,0 +1,278 @@
+"""
+Stylometric Fingerprint Index
+Array-backed on-disk store of fingerprint vectors with top-k similarity
+search: brute force for modest sizes, an inverted-file (IVF) partition for
+millions of vectors
+
+On-disk layout:
+
+    meta.json     row count, last indexed source id, feature sums and schema
+    vectors.f32   append-only float32 rows (memory-mapped for search)
+    ids.i64       append-only source ids (history ids), one per row
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine.markers.stylometry.extractor import FINGERPRINT_FEATURES
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: appends from several processes are not serialized
+    fcntl = None
+
+
+class FingerprintIndex:
+    """
+    Top-k search over stylometric fingerprint vectors.
+
+    Features are standardized with the mean and standard deviation of all
+    indexed vectors (kept as running sums), then compared by cosine
+    similarity, so no single large-valued feature dominates.
+
+    Below ivf_min_rows rows (or with ivf_lists=0) every row is scored in
+    chunks. Above it, rows are partitioned by a k-means coarse quantizer and
+    a query scores only the nprobe closest partitions, plus rows appended
+    since the partition was built.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ivf_lists: int = 0,
+        ivf_min_rows: int = 100000,
+        nprobe: int = 8,
+        chunk_rows: int = 262144
+    ):
+        """
+        Initialize fingerprint index
+
+        Args:
+            directory: Index directory (created if missing)
+            ivf_lists: Partitions of the IVF index (0 = always brute force)
+            ivf_min_rows: Rows from which the IVF index is used
+            nprobe: Partitions scored per query
+            chunk_rows: Rows scored per block by brute-force search
+        """
+        self.path = Path(directory)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = len(FINGERPRINT_FEATURES)
+        self.ivf_lists = ivf_lists
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.chunk_rows = chunk_rows
+
+        self._count = -1
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._ivf: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across processes (on POSIX)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path / "LOCK", "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_meta(self) -> Dict[str, Any]:
+        """Index metadata (an empty index if missing or built with another schema)"""
+        empty = {
+            "count": 0,
+            "last_id": 0,
+            "sum": [0.0] * self.dim,
+            "sumsq": [0.0] * self.dim,
+            "schema": list(FINGERPRINT_FEATURES),
+        }
+        try:
+            meta = json.loads((self.path / "meta.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return empty
+        return meta if meta.get("schema") == list(FINGERPRINT_FEATURES) else empty
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.path / "meta.json")
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray, last_id: int):
+        """
+        Append fingerprint vectors
+
+        Sources must be added in increasing id order; ids at or below the
+        indexed last_id are skipped, so concurrent syncs never add a row twice.
+
+        Args:
+            ids: Source id of each vector
+            vectors: Fingerprint vectors (n, dim)
+            last_id: Highest source id processed (including sources
+                without a fingerprint), where the next sync continues
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._locked():
+            meta = self.read_meta()
+            fresh = ids > meta["last_id"]
+            ids, vectors = ids[fresh], vectors[fresh]
+            if meta["count"] == 0:
+                # New or reset index: drop rows of an older schema
+                for name in ("vectors.f32", "ids.i64"):
+                    (self.path / name).unlink(missing_ok=True)
+            count = meta["count"]
+            for name, data, width in (("vectors.f32", vectors, self.dim * 4), ("ids.i64", ids, 8)):
+                path = self.path / name
+                with open(path, "r+b" if path.exists() else "w+b") as f:
+                    f.seek(count * width)
+                    f.write(data.tobytes())
+
+            as_float = vectors.astype(np.float64)
+            meta["sum"] = (np.array(meta["sum"]) + as_float.sum(axis=0)).tolist()
+            meta["sumsq"] = (np.array(meta["sumsq"]) + (as_float ** 2).sum(axis=0)).tolist()
+            meta["count"] = count + len(vectors)
+            meta["last_id"] = max(meta["last_id"], int(last_id))
+            self._write_meta(meta)
+
+    def _refresh(self) -> Dict[str, Any]:
+        """Map the rows listed in the current metadata"""
+        meta = self.read_meta()
+        count = meta["count"]
+        if count != self._count:
+            if count < self._count:
+                self._ivf = None  # Index was reset
+            self._count = count
+            if count:
+                self._vectors = np.memmap(self.path / "vectors.f32", dtype=np.float32, mode="r", shape=(count, self.dim))
+                self._ids = np.memmap(self.path / "ids.i64", dtype=np.int64, mode="r", shape=(count,))
+            else:
+                self._vectors = self._ids = None
+        return meta
+
+    @staticmethod
+    def _scaler(meta: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Feature mean and standard deviation from the running sums"""
+        count = max(1, meta["count"])
+        mean = np.array(meta["sum"]) / count
+        std = np.sqrt(np.maximum(np.array(meta["sumsq"]) / count - mean ** 2, 0.0))
+        return mean.astype(np.float32), np.where(std > 0, std, 1.0).astype(np.float32)
+
+    @staticmethod
+    def _unit(rows: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+        """Standardized rows scaled to unit length"""
+        z = (np.asarray(rows, dtype=np.float32) - mean) / std
+        return z / np.maximum(np.linalg.norm(z, axis=-1, keepdims=True), 1e-12)
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        exclude_ids: Sequence[int] = ()
+    ) -> Dict[str, Any]:
+        """
+        Most similar indexed fingerprints
+
+        Args:
+            vector: Query fingerprint vector (dim,)
+            k: Number of results
+            exclude_ids: Source ids left out of the results
+
+        Returns:
+            Dictionary with ids and similarities (most similar first), the
+            search method and the number of rows scored
+        """
+        meta = self._refresh()
+        if not self._count:
+            return {"ids": [], "similarities": [], "method": "brute", "scored": 0}
+
+        mean, std = self._scaler(meta)
+        query = self._unit(vector, mean, std)
+        excluded = np.asarray(list(exclude_ids), dtype=np.int64)
+        want = k + len(excluded)
+
+        ivf = self._ivf_index(mean, std)
+        if ivf is not None:
+            probe = np.argsort(-(ivf["centroids"] @ query))[:self.nprobe]
+            candidates = np.sort(np.concatenate([ivf["lists"][p] for p in probe] + [np.arange(ivf["rows"], self._count)]))
+            similarities = self._unit(self._vectors[candidates], mean, std) @ query
+            method = "ivf"
+        else:
+            candidates, similarities = self._brute_force(query, mean, std, want)
+            method = "brute"
+
+        if len(excluded):
+            keep = ~np.isin(self._ids[candidates], excluded)
+            candidates, similarities = candidates[keep], similarities[keep]
+        order = np.argsort(-similarities, kind="stable")[:k]
+        return {
+            "ids": self._ids[candidates[order]].tolist(),
+            "similarities": similarities[order].astype(float).tolist(),
+            "method": method,
+            "scored": int(len(similarities)) if method == "ivf" else self._count,
+        }
+
+    def _brute_force(self, query: np.ndarray, mean: np.ndarray, std: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k rows of every chunk (the overall best k are among them)"""
+        rows, sims = [], []
+        for start in range(0, self._count, self.chunk_rows):
+            chunk = self._unit(self._vectors[start:start + self.chunk_rows], mean, std) @ query
+            best = np.argpartition(-chunk, k - 1)[:k] if len(chunk) > k else np.arange(len(chunk))
+            rows.append(best + start)
+            sims.append(chunk[best])
+        return np.concatenate(rows), np.concatenate(sims)
+
+    def _ivf_index(self, mean: np.ndarray, std: np.ndarray) -> Optional[Dict[str, Any]]:
+        """IVF partition of the rows, (re)built once the index grew by a quarter since the last build"""
+        if self.ivf_lists <= 0 or self._count < max(self.ivf_min_rows, self.ivf_lists):
+            return None
+        if self._ivf is None or self._count > self._ivf["rows"] * 1.25:
+            self._ivf = self._build_ivf(mean, std)
+        return self._ivf
+
+    def _build_ivf(self, mean: np.ndarray, std: np.ndarray, iterations: int = 10, sample: int = 50000) -> Dict[str, Any]:
+        """k-means coarse quantizer trained on a sample, then every row assigned to its closest centroid"""
+        rng = np.random.default_rng(0)
+        count = self._count
+        training = self._unit(self._vectors[np.sort(rng.choice(count, min(sample, count), replace=False))], mean, std)
+        centroids = training[rng.choice(len(training), self.ivf_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(training @ centroids.T, axis=1)
+            for c in range(self.ivf_lists):
+                members = training[assignment == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+
+        assignment = np.concatenate([
+            np.argmax(self._unit(self._vectors[start:start + self.chunk_rows], mean, std) @ centroids.T, axis=1)
+            for start in range(0, count, self.chunk_rows)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(self.ivf_lists + 1))
+        return {
+            "centroids": centroids,
+            "lists": [order[bounds[c]:bounds[c + 1]] for c in range(self.ivf_lists)],
+            "rows": count,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Row count, disk size and search mode"""
+        meta = self._refresh()
+        vectors_path = self.path / "vectors.f32"
+        return {
+            "path": str(self.path),
+            "rows": meta["count"],
+            "dim": self.dim,
+            "last_id": meta["last_id"],
+            "disk_bytes": vectors_path.stat().st_size if vectors_path.exists() and meta["count"] else 0,
+            "ivf_lists": self.ivf_lists,
+            "ivf_active": self.ivf_lists > 0 and meta["count"] >= max(self.ivf_min_rows, self.ivf_lists),
+        }
@@ -0,0 +1,309 @@
+"""
+Pipeline Metrics
+Latency histograms, input-size histograms and error counters of the
+scoring stages, and counters of work the API sheds under load, exported
+in the Prometheus text format
+
+Each process counts into its own file in the metrics directory (a
+memory-mapped float64 array, so recording is a few array increments with
+no system calls); an export sums the files of every process, e.g. the
+API process and its scoring workers.
+"""
+
+import bisect
+import hashlib
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHAR_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000, 3000000)
+SENTENCE_BUCKETS = (1, 3, 10, 30, 100, 300, 1000, 3000, 10000, 30000)
+
+# Timed stages: preprocessing, context artifacts, each built-in marker, fusion
+# and the API's writes (markers registered later are timed but not exported)
+STAGES = (
+    "preprocess", "context",
+    "drift", "cadence", "hedging", "metaphor", "coherence", "stylometry",
+    "fusion", "history", "logging"
+)
+
+# (name, help, label name, label values, buckets); buckets None for counters
+_FAMILIES = (
+    ("traceneuro_stage_duration_seconds", "Latency of each scoring stage (per batch for markers)", "stage", STAGES, LATENCY_BUCKETS),
+    ("traceneuro_stage_errors_total", "Errors raised by each scoring stage", "stage", STAGES, None),
+    ("traceneuro_input_chars", "Characters per processed text", None, (None,), CHAR_BUCKETS),
+    ("traceneuro_input_sentences", "Sentences per processed text", None, (None,), SENTENCE_BUCKETS),
+    ("traceneuro_executor_rejected_total", "Scoring tasks rejected because the queue was full", None, (None,), None),
+    ("traceneuro_log_dropped_total", "Log entries dropped because the queue was full", None, (None,), None),
+)
+
+
+def _build_layout() -> Tuple[Dict[Tuple[str, Optional[str]], int], int]:
+    """Offset of every series in the metrics array, and the array length"""
+    offsets = {}
+    size = 0
+    for name, _, _, values, buckets in _FAMILIES:
+        for value in values:
+            offsets[(name, value)] = size
+            # Histograms: one slot per bucket plus +Inf, then sum and count
+            size += len(buckets) + 3 if buckets is not None else 1
+    return offsets, size
+
+
+_OFFSETS, _SIZE = _build_layout()
+
+# Files written with another layout are ignored
+_SCHEMA = hashlib.blake2b(repr(_FAMILIES).encode(), digest_size=4).hexdigest()
+
+
+class _ThreadStages(threading.local):
+    """Stage durations collected by Metrics.record_stages in the current thread"""
+    stages: Optional[Dict[str, float]] = None
+
+
+class Metrics:
+    """
+    Process-safe pipeline metrics.
+
+    Without a directory, metrics are kept in memory and only cover the
+    current process.
+    """
+
+    def __init__(self, directory: Optional[str] = None, enabled: bool = True):
+        """
+        Initialize metrics
+
+        Args:
+            directory: Directory shared by the processes to aggregate
+            enabled: Record anything at all
+        """
+        self.path = Path(directory) if directory else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = _ThreadStages()
+        self._pid: Optional[int] = None
+        self._values = None
+
+    def _file(self, pid: int) -> Path:
+        return self.path / f"metrics.{_SCHEMA}.{pid}.f64"
+
+    def _array(self):
+        """This process's counters (a fresh array after a fork)"""
+        pid = os.getpid()
+        if self._pid != pid:
+            if self.path is None:
+                values = [0.0] * _SIZE
+            else:
+                self.path.mkdir(parents=True, exist_ok=True)
+                path = self._file(pid)
+                with open(path, "w+b") as f:
+                    f.write(bytes(_SIZE * 8))
+                    f.flush()
+                    # Float view of the mapping (cheaper element updates than np.memmap)
+                    values = memoryview(mmap.mmap(f.fileno(), _SIZE * 8)).cast("d")
+            self._values, self._pid = values, pid
+        return self._values
+
+    def _observe(self, offset: int, buckets: Tuple[float, ...], value: float):
+        with self._lock:
+            values = self._array()
+            values[offset + bisect.bisect_left(buckets, value)] += 1
+            values[offset + len(buckets) + 1] += value
+            values[offset + len(buckets) + 2] += 1
+
+    def observe(self, stage: str, seconds: float):
+        """Record the duration of a stage"""
+        stages = self._local.stages
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        offset = _OFFSETS.get(("traceneuro_stage_duration_seconds", stage))
+        if self.enabled and offset is not None:
+            self._observe(offset, LATENCY_BUCKETS, seconds)
+
+    def observe_input(self, chars: int, sentences: int):
+        """Record the size of a processed text"""
+        if self.enabled:
+            self._observe(_OFFSETS[("traceneuro_input_chars", None)], CHAR_BUCKETS, chars)
+            self._observe(_OFFSETS[("traceneuro_input_sentences", None)], SENTENCE_BUCKETS, sentences)
+
+    def error(self, stage: str):
+        """Count an error of a stage"""
+        offset = _OFFSETS.get(("traceneuro_stage_errors_total", stage))
+        if self.enabled and offset is not None:
+            with self._lock:
+                self._array()[offset] += 1
+
+    def count(self, name: str, value: float = 1):
+        """Increment an unlabeled counter (e.g. traceneuro_log_dropped_total)"""
+        offset = _OFFSETS[(name, None)]
+        if self.enabled:
+            with self._lock:
+                self._array()[offset] += value
+
+    def timed(self, stage: str) -> "_StageTimer":
+        """Time a with-block as a stage; exceptions are counted as stage errors and re-raised"""
+        return _StageTimer(self, stage) if self.enabled or self._local.stages is not None else _NULL_TIMER
+
+    @contextmanager
+    def record_stages(self) -> Iterator[Dict[str, float]]:
+        """
+        Collect the durations of the stages this thread runs within the
+        block (also while metrics are disabled), e.g. to profile one request
+
+        Yields:
+            Dictionary filled with seconds per stage
+        """
+        stages: Dict[str, float] = {}
+        previous = self._local.stages
+        self._local.stages = stages
+        try:
+            yield stages
+        finally:
+            self._local.stages = previous
+
+    def collect(self) -> np.ndarray:
+        """Counters summed over every process writing to the directory"""
+        if self.path is None:
+            return np.array(self._values if self._values is not None else [0.0] * _SIZE, dtype=np.float64)
+        total = np.zeros(_SIZE, dtype=np.float64)
+        for path in self.path.glob(f"metrics.{_SCHEMA}.*.f64"):
+            try:
+                values = np.fromfile(path, dtype=np.float64)
+            except OSError:
+                continue  # Removed while listing
+            if len(values) == _SIZE:
+                total += values
+        return total
+
+    def remove_stale(self) -> int:
+        """
+        Delete the files of processes that are no longer running (e.g. on
+        startup). Their counts disappear, which Prometheus treats as a
+        counter reset.
+
+        Returns:
+            Number of files removed
+        """
+        if self.path is None or not self.path.exists():
+            return 0
+        removed = 0
+        for path in self.path.glob("metrics.*.f64"):
+            try:
+                pid = int(path.name.split(".")[2])
+            except (IndexError, ValueError):
+                continue
+            if not _is_running(pid):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def render(self, gauges: Iterable[Tuple[str, str, float]] = ()) -> str:
+        """
+        Prometheus text exposition of the aggregated metrics
+
+        Args:
+            gauges: Extra (name, help, value) gauges of the exporting process
+
+        Returns:
+            Text in the Prometheus exposition format (version 0.0.4)
+        """
+        values = self.collect()
+        lines = []
+        for name, help_text, label, label_values, buckets in _FAMILIES:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {'histogram' if buckets is not None else 'counter'}")
+            for label_value in label_values:
+                offset = _OFFSETS[(name, label_value)]
+                labels = f'{label}="{label_value}"' if label else ""
+                if buckets is None:
+                    lines.append(f"{name}{{{labels}}} {_number(values[offset])}" if labels else f"{name} {_number(values[offset])}")
+                    continue
+                prefix = f"{labels}," if labels else ""
+                cumulative = np.cumsum(values[offset:offset + len(buckets) + 1])
+                for bound, count in zip(list(buckets) + ["+Inf"], cumulative):
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {_number(count)}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {_number(values[offset + len(buckets) + 1])}")
+                lines.append(f"{name}_count{suffix} {_number(values[offset + len(buckets) + 2])}")
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _StageTimer:
+    """Context manager of Metrics.timed (a class: cheaper than a generator-based one)"""
+
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics: Metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.metrics.error(self.stage)
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    """Timer of disabled metrics"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _is_running(pid: int) -> bool:
+    """Whether a process with this id exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
+
+
+def _number(value: float) -> str:
+    """Integers without a decimal point, other values in full precision"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Global metrics instance
+_metrics_instance = None
+
+
+def get_metrics() -> Metrics:
+    """Get or create global metrics"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        directory = Path(os.getenv("METRICS_DIR", "data/metrics"))
+        if not directory.is_absolute():
+            directory = Path(__file__).parent.parent / directory
+        _metrics_instance = Metrics(
+            str(directory),
+            enabled=os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+        )
+    return _metrics_instance
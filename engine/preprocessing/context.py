@@ -0,0 +1,239 @@
+"""
+Analysis Context
+Processed text plus derived artifacts shared across cognitive markers
+"""
+
+from typing import List, Dict, Any, Iterable, Optional, Tuple, TYPE_CHECKING
+from functools import cached_property
+import re
+import numpy as np
+
+if TYPE_CHECKING:
+    from engine.preprocessing.patterns import PatternScanner, DocumentScan
+
+
+# Word tokens, as matched by TextProcessor.tokenize
+_TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+# Highest code point covered by the vectorized character class tables
+_TABLE_SIZE = 0x10000
+_char_tables: Optional[Dict[str, np.ndarray]] = None
+
+
+def get_char_tables() -> Dict[str, np.ndarray]:
+    """Build (once) boolean lookup tables of character classes for the BMP"""
+    global _char_tables
+    if _char_tables is None:
+        chars = [chr(c) for c in range(_TABLE_SIZE)]
+        _char_tables = {
+            "upper": np.fromiter((c.isupper() for c in chars), dtype=bool, count=_TABLE_SIZE),
+            "digit": np.fromiter((c.isdigit() for c in chars), dtype=bool, count=_TABLE_SIZE),
+        }
+    return _char_tables
+
+
+def set_char_tables(tables: Dict[str, np.ndarray]):
+    """
+    Install precomputed character class tables (see engine.runtime.load_state)
+
+    Raises:
+        ValueError: A table is missing or has the wrong shape
+    """
+    global _char_tables
+    for name in ("upper", "digit"):
+        if name not in tables or tables[name].shape != (_TABLE_SIZE,):
+            raise ValueError(f"Invalid character table: {name}")
+    _char_tables = {name: np.asarray(tables[name], dtype=bool) for name in ("upper", "digit")}
+
+
+def code_points(text: str) -> np.ndarray:
+    """Code points of a string as a uint32 array"""
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+
+def char_class_mask(points: np.ndarray, char_class: str) -> np.ndarray:
+    """
+    Vectorized str.isupper / str.isdigit over an array of code points
+
+    Args:
+        points: Code points from code_points()
+        char_class: "upper" or "digit"
+
+    Returns:
+        Boolean mask, one entry per code point
+    """
+    table = get_char_tables()[char_class]
+    in_table = points < _TABLE_SIZE
+    mask = np.zeros(len(points), dtype=bool)
+    mask[in_table] = table[points[in_table]]
+
+    # Characters outside the BMP are rare; classify them one by one
+    for i in np.flatnonzero(~in_table):
+        char = chr(points[i])
+        mask[i] = char.isupper() if char_class == "upper" else char.isdigit()
+    return mask
+
+
+def char_class_counts(text: str) -> Dict[str, int]:
+    """
+    Character-class histogram of a text
+
+    Returns:
+        Dictionary with upper, digit and space counts
+    """
+    points = code_points(text)
+    return {
+        "upper": int(char_class_mask(points, "upper").sum()),
+        "digit": int(char_class_mask(points, "digit").sum()),
+        "space": text.count(" "),
+    }
+
+
+class AnalysisContext(dict):
+    """
+    Output of TextProcessor.process.
+
+    Behaves like the original processed-text dictionary (original, cleaned,
+    sentences, tokens and counts) and additionally exposes derived artifacts
+    that are computed lazily, at most once, and shared by every marker.
+    Markers declare the artifacts they use in a `requires` tuple.
+    """
+
+    ARTIFACTS = (
+        "text_lower",
+        "sentences_lower",
+        "sentence_words",
+        "sentence_word_sets_lower",
+        "sentence_word_counts",
+        "sentence_lengths",
+        "sentence_upper_counts",
+        "sentence_char_classes",
+        "sentence_tokens",
+        "char_classes",
+    )
+
+    def __init__(
+        self,
+        cleaned: str,
+        sentences: List[str],
+        tokens: List[str],
+        original: Optional[str] = None,
+        sentence_spans: Optional[List[Tuple[int, int]]] = None
+    ):
+        # Offsets of each sentence in the cleaned text, when known
+        self.sentence_spans = sentence_spans
+        super().__init__(
+            original=cleaned if original is None else original,
+            cleaned=cleaned,
+            sentences=sentences,
+            tokens=tokens,
+            sentence_count=len(sentences),
+            token_count=len(tokens),
+            char_count=len(cleaned),
+        )
+
+    @classmethod
+    def from_processed(cls, processed: Dict[str, Any]) -> "AnalysisContext":
+        """
+        Wrap a processed-text dictionary (or partial one) in a context.
+        Contexts are returned unchanged so their artifacts stay shared.
+        """
+        if isinstance(processed, AnalysisContext):
+            return processed
+        return cls(
+            cleaned=processed.get("cleaned", ""),
+            sentences=processed.get("sentences", []),
+            tokens=processed.get("tokens", []),
+            original=processed.get("original"),
+        )
+
+    def require(self, artifacts: Iterable[str]) -> "AnalysisContext":
+        """Compute the named artifacts now (they are otherwise computed on first use)"""
+        for name in artifacts:
+            if name not in self.ARTIFACTS:
+                raise ValueError(f"Unknown analysis artifact: {name}")
+            getattr(self, name)
+        return self
+
+    def scan(self, scanner: "PatternScanner") -> "DocumentScan":
+        """
+        Pattern matches for the whole document, attributed to sentences.
+        Computed once per scanner, so markers sharing a scanner share the scan.
+        """
+        scans = self.__dict__.setdefault("_scans", {})
+        cached = scans.get(id(scanner))
+        if cached is None or cached[0] is not scanner:
+            spans = getattr(self, "sentence_spans", None)
+            if spans is not None and len(self.text_lower) != len(self["cleaned"]):
+                # Lowercasing changed offsets (e.g. "İ"); scan the sentences instead
+                spans = None
+            cached = (scanner, scanner.scan_document(self.text_lower, self.sentences_lower, spans))
+            scans[id(scanner)] = cached
+        return cached[1]
+
+    @cached_property
+    def text_lower(self) -> str:
+        """Lowercased cleaned text"""
+        return self["cleaned"].lower()
+
+    @cached_property
+    def sentences_lower(self) -> List[str]:
+        """Lowercased sentences"""
+        return [s.lower() for s in self["sentences"]]
+
+    @cached_property
+    def sentence_words(self) -> List[List[str]]:
+        """Whitespace-split words of each sentence"""
+        return [s.split() for s in self["sentences"]]
+
+    @cached_property
+    def sentence_word_sets_lower(self) -> List[set]:
+        """Set of distinct lowercased words of each sentence"""
+        return [set(s.split()) for s in self.sentences_lower]
+
+    @cached_property
+    def sentence_word_counts(self) -> np.ndarray:
+        """Number of words in each sentence"""
+        words = self.sentence_words
+        return np.fromiter((len(w) for w in words), dtype=float, count=len(words))
+
+    @cached_property
+    def sentence_lengths(self) -> np.ndarray:
+        """Number of characters in each sentence"""
+        sentences = self["sentences"]
+        return np.fromiter((len(s) for s in sentences), dtype=float, count=len(sentences))
+
+    @cached_property
+    def sentence_upper_counts(self) -> np.ndarray:
+        """Number of uppercase characters in each sentence"""
+        return self.sentence_char_classes["upper"]
+
+    @cached_property
+    def sentence_char_classes(self) -> Dict[str, np.ndarray]:
+        """Character-class histogram (upper, digit, space) of each sentence"""
+        sentences = self["sentences"]
+        if not sentences:
+            return {name: np.zeros(0) for name in ("upper", "digit", "space")}
+        points = code_points("".join(sentences))
+        masks = {
+            "upper": char_class_mask(points, "upper"),
+            "digit": char_class_mask(points, "digit"),
+            "space": points == ord(" "),
+        }
+        lengths = self.sentence_lengths.astype(np.int64)
+        ends = np.cumsum(lengths)
+        counts = {}
+        for name, mask in masks.items():
+            totals = np.concatenate(([0], np.cumsum(mask)))
+            counts[name] = (totals[ends] - totals[ends - lengths]).astype(float)
+        return counts
+
+    @cached_property
+    def sentence_tokens(self) -> List[List[str]]:
+        """Lowercased word tokens of each sentence (as TextProcessor.tokenize)"""
+        return [_TOKEN_PATTERN.findall(s) for s in self.sentences_lower]
+
+    @cached_property
+    def char_classes(self) -> Dict[str, int]:
+        """Character-class histogram (upper, digit, space) of the cleaned text"""
+        return char_class_counts(self["cleaned"])
@@ -0,0 +1,273 @@
+"""
+Pattern Scanner
+Shared single-scan matcher for the regex patterns of every cognitive marker
+"""
+
+from typing import List, Dict, Tuple, Iterable, Sequence, Optional, FrozenSet
+from functools import lru_cache
+import re
+import numpy as np
+
+
+# Joins sentences when no sentence offsets are known; no marker pattern can match across it
+SENTENCE_SEPARATOR = "\x00"
+
+Span = Tuple[int, int]
+
+
+def literal_pattern(words: Iterable[str]) -> str:
+    """Alternation matching any of the literal words (longest first)"""
+    return "|".join(re.escape(w) for w in sorted(set(words), key=lambda w: (-len(w), w)))
+
+
+@lru_cache(maxsize=64)
+def _overlapping_words(words: FrozenSet[str]) -> FrozenSet[str]:
+    """
+    Words that can start inside another word's occurrence and end past it
+    (a proper suffix of one word is a proper prefix of the other). Only these
+    can be hidden by a non-overlapping scan of a literal_pattern.
+    """
+    return frozenset(
+        w for w in words
+        if any(
+            u[-k:] == w[:k]
+            for u in words
+            for k in range(1, min(len(u), len(w)))
+        )
+    )
+
+
+class PatternScanner:
+    """
+    Compiles the patterns of every marker once and scans a document once.
+
+    Patterns anchored at a word boundary (starting with \\b) are fused into a
+    single regex: one optional lookahead with its own named group per pattern,
+    tried only at word starts. One left-to-right pass therefore reports every
+    position where each pattern matches. Unanchored patterns (substring
+    phrases and word lists) are kept as individual compiled regexes, since
+    Python's re cannot fuse them without trying every pattern at every
+    character; each of them is still run once per document, not per sentence.
+
+    Results are attributed to sentences by offset, so per-sentence counts and
+    document totals come from the same scan.
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[str]]):
+        """
+        Initialize pattern scanner
+
+        Args:
+            groups: Category name -> list of regex patterns. Patterns are
+                matched against lowercased text.
+        """
+        self.groups: Dict[str, Tuple[str, ...]] = {
+            name: tuple(patterns) for name, patterns in groups.items()
+        }
+
+        # Flat list of patterns; a slot is a pattern's index in this list
+        self._patterns: List[str] = [p for patterns in self.groups.values() for p in patterns]
+        self._group_slots: Dict[str, List[int]] = {}
+        start = 0
+        for name, patterns in self.groups.items():
+            self._group_slots[name] = list(range(start, start + len(patterns)))
+            start += len(patterns)
+
+        self._anchored = [i for i, p in enumerate(self._patterns) if p.startswith(r"\b")]
+        self._unanchored = [
+            (i, re.compile(p)) for i, p in enumerate(self._patterns) if not p.startswith(r"\b")
+        ]
+        self._fused = self._compile_fused()
+
+    @classmethod
+    def combine(cls, scanners: Iterable["PatternScanner"]) -> "PatternScanner":
+        """Merge the pattern groups of several scanners into one scanner"""
+        groups: Dict[str, Tuple[str, ...]] = {}
+        for scanner in scanners:
+            for name, patterns in scanner.groups.items():
+                if groups.get(name, patterns) != patterns:
+                    raise ValueError(f"Conflicting patterns for category: {name}")
+                groups[name] = patterns
+        return cls(groups)
+
+    def _compile_fused(self) -> Optional["re.Pattern"]:
+        """Build the fused lookahead regex for word-anchored patterns"""
+        if not self._anchored:
+            return None
+
+        lookaheads = "".join(
+            f"(?=(?P<p{slot}>{self._patterns[slot][2:]})?)" for slot in self._anchored
+        )
+        # Only stop at positions where at least one pattern matched
+        guard = "(?!)"
+        for slot in reversed(self._anchored):
+            guard = f"(?(p{slot})|{guard})"
+        return re.compile(r"\b(?=\w)" + lookaheads + guard)
+
+    def scan(self, text: str) -> List[List[Span]]:
+        """
+        Scan text once
+
+        Args:
+            text: Lowercased text
+
+        Returns:
+            For every pattern slot, its non-overlapping matches in order,
+            identical to re.finditer(pattern, text)
+        """
+        matches: List[List[Span]] = [[] for _ in self._patterns]
+
+        if self._fused is not None:
+            positional: List[List[Span]] = [[] for _ in self._patterns]
+            group_indices = [(slot, self._fused.groupindex[f"p{slot}"]) for slot in self._anchored]
+            for match in self._fused.finditer(text):
+                regs = match.regs
+                for slot, index in group_indices:
+                    span = regs[index]
+                    if span[0] >= 0:
+                        positional[slot].append(span)
+
+            # Keep the leftmost non-overlapping matches, as finditer would
+            for slot in self._anchored:
+                last_end = 0
+                for start, end in positional[slot]:
+                    if start >= last_end:
+                        matches[slot].append((start, end))
+                        last_end = max(end, start + 1)
+
+        for slot, regex in self._unanchored:
+            matches[slot] = [m.span() for m in regex.finditer(text)]
+
+        return matches
+
+    def scan_document(
+        self,
+        text: str,
+        sentences: List[str],
+        sentence_spans: Optional[List[Span]] = None
+    ) -> "DocumentScan":
+        """
+        Scan a document and attribute matches to its sentences
+
+        Args:
+            text: Lowercased document text
+            sentences: Lowercased sentences
+            sentence_spans: Offsets of each sentence in text. When omitted the
+                sentences are joined and scanned instead of text.
+
+        Returns:
+            DocumentScan with per-sentence and document-level results
+        """
+        if sentence_spans is None:
+            text = SENTENCE_SEPARATOR.join(sentences)
+            sentence_spans = []
+            offset = 0
+            for sentence in sentences:
+                sentence_spans.append((offset, offset + len(sentence)))
+                offset += len(sentence) + 1
+
+        return DocumentScan(self, text, self.scan(text), sentence_spans)
+
+
+class DocumentScan:
+    """Matches of every scanner pattern in one document"""
+
+    def __init__(
+        self,
+        scanner: PatternScanner,
+        text: str,
+        matches: List[List[Span]],
+        sentence_spans: List[Span]
+    ):
+        self.scanner = scanner
+        self.text = text
+        self.matches = matches
+        self.n_sentences = len(sentence_spans)
+
+        starts = np.array([s for s, _ in sentence_spans], dtype=np.int64)
+        ends = np.array([e for _, e in sentence_spans], dtype=np.int64)
+
+        # owners[slot][k]: sentence containing the k-th match (-1 if outside every sentence)
+        self.owners: List[np.ndarray] = []
+        for slot_matches in matches:
+            if not slot_matches or not len(starts):
+                self.owners.append(np.full(len(slot_matches), -1, dtype=np.int64))
+                continue
+            spans = np.array(slot_matches, dtype=np.int64)
+            owner = np.searchsorted(starts, spans[:, 0], side="right") - 1
+            inside = (owner >= 0) & (spans[:, 1] <= ends[np.maximum(owner, 0)])
+            self.owners.append(np.where(inside, owner, -1))
+
+    def _slots(self, group: str) -> List[int]:
+        return self.scanner._group_slots.get(group, [])
+
+    def sentence_counts(self, group: str) -> np.ndarray:
+        """
+        Per-sentence findall counts
+
+        Returns:
+            Array (n_patterns_in_group, n_sentences)
+        """
+        rows = []
+        for slot in self._slots(group):
+            owner = self.owners[slot]
+            rows.append(np.bincount(owner[owner >= 0], minlength=self.n_sentences))
+        return np.array(rows, dtype=np.int64).reshape(len(rows), self.n_sentences)
+
+    def document_counts(self, group: str) -> np.ndarray:
+        """Findall count of each pattern in the category over the whole text"""
+        return np.array([len(self.matches[slot]) for slot in self._slots(group)], dtype=np.int64)
+
+    def matched_strings(self, group: str) -> List[str]:
+        """Matched substrings of every pattern in the category over the whole text"""
+        return [
+            self.text[start:end]
+            for slot in self._slots(group)
+            for start, end in self.matches[slot]
+        ]
+
+    def sentence_matches(self, group: str) -> List[List[str]]:
+        """Matched substrings of every pattern in the category, per sentence"""
+        per_sentence: List[List[str]] = [[] for _ in range(self.n_sentences)]
+        for slot in self._slots(group):
+            for (start, end), owner in zip(self.matches[slot], self.owners[slot]):
+                if owner >= 0:
+                    per_sentence[owner].append(self.text[start:end])
+        return per_sentence
+
+    def sentence_literals(self, group: str, words: Iterable[str], sentences: List[str]) -> List[set]:
+        """
+        Words of a literal_pattern category that occur in each sentence,
+        i.e. {w for w in words if w in sentence} for every sentence
+
+        Args:
+            sentences: Lowercased sentences the scan was attributed to
+        """
+        words = frozenset(words)
+        overlapping = _overlapping_words(words)
+        contained: Dict[str, set] = {}  # Matched string -> words it contains
+        present = []
+        for sentence, found in zip(sentences, self.sentence_matches(group)):
+            words_found = set()
+            for f in found:
+                if f not in contained:
+                    contained[f] = {w for w in words if w in f}
+                words_found |= contained[f]
+            words_found.update(w for w in overlapping - words_found if w in sentence)
+            present.append(words_found)
+        return present
+
+    def found_literals(self, group: str, words: Iterable[str]) -> set:
+        """
+        Words of a literal_pattern category that occur anywhere in the text,
+        i.e. {w for w in words if w in text}
+        """
+        words = frozenset(words)
+        found = set(self.matched_strings(group))
+        # Longer words are matched first; shorter words inside them count too
+        present = {w for w in words if any(w in f for f in found)}
+        # A word straddling the end of another match is not reported by the scan
+        for w in _overlapping_words(words) - present:
+            if w in self.text:
+                present.add(w)
+        return present
@@ -4,7 +4,19 @@ Handles cleaning, segmentation, and tokenization
 """
 
 import re
-from typing import List, Dict, Any
+from typing import List, Tuple, Iterable, Iterator
+
+from engine.metrics import get_metrics
+from engine.preprocessing.context import AnalysisContext
+
+
+# Patterns compiled once at import rather than looked up in re's cache on every call
+_WHITESPACE = re.compile(r'\s+')
+_URL = re.compile(r'http[s]?://\S+')
+_ELLIPSIS = re.compile(r'[.]{3,}')
+_SENTENCE_PIECE = re.compile(r'[^.!?]+')
+_SENTENCE_PUNCT = re.compile(r'[.!?]')
+_TOKEN = re.compile(r'\b\w+\b')
 
 
 class TextProcessor:
@@ -13,8 +25,11 @@ class TextProcessor:
     def __init__(self):
         self.min_sentence_length = 3
         self.max_sentence_length = 500
+        
+        # Streaming: longest run of text without sentence punctuation kept in memory
+        self.max_stream_buffer = 65536
     
-    def process(self, text: str) -> Dict[str, Any]:
+    def process(self, text: str) -> AnalysisContext:
         """
         Main processing pipeline
         
@@ -22,57 +37,147 @@ class TextProcessor:
             text: Raw input text
             
         Returns:
-            Dictionary with processed text components
+            AnalysisContext: dictionary with processed text components,
+            plus lazily derived artifacts shared by the markers
+        """
+        metrics = get_metrics()
+        with metrics.timed("preprocess"):
+            cleaned = self.clean(text)
+            sentence_spans = self.sentence_spans(cleaned)
+            sentences = [cleaned[start:end] for start, end in sentence_spans]
+            tokens = self.tokenize(cleaned)
+        metrics.observe_input(len(text), len(sentences))
+        
+        return AnalysisContext(
+            cleaned=cleaned,
+            sentences=sentences,
+            tokens=tokens,
+            original=text,
+            sentence_spans=sentence_spans
+        )
+    
+    def process_stream(self, chunks: Iterable[str]) -> Iterator[AnalysisContext]:
+        """
+        Process a text delivered in chunks, one segment at a time
+        
+        Segments are cut right after sentence punctuation, so sentences and
+        tokens never straddle two segments. Concatenated, the segments'
+        cleaned texts equal process(whole text)["cleaned"] and their
+        sentences equal its sentences. Memory is bounded by the chunk size
+        plus max_stream_buffer, whatever the document length.
+        
+        Args:
+            chunks: Raw text chunks, in order (split anywhere)
+            
+        Yields:
+            AnalysisContext for each segment
+        """
+        raw = ""  # Raw text not cleaned yet
+        pending = ""  # Cleaned text after the last sentence punctuation
+        started = False  # Whether any non-whitespace text was cleaned yet
+        in_long_piece = False  # Whether pending continues an over-long sentence
+        
+        for chunk in chunks:
+            raw += chunk
+            
+            # Text up to the last whitespace run cleans the same as in the whole
+            # text: no URL, whitespace run or "..." run crosses that point
+            last_space = None
+            for last_space in _WHITESPACE.finditer(raw):
+                pass
+            if last_space is None or last_space.start() == 0:
+                continue
+            stable, raw = raw[:last_space.start()], raw[last_space.start():]
+            pending += (" " if started and stable[0].isspace() else "") + self.clean(stable)
+            started = True
+            
+            # Cut right after the last run of sentence punctuation
+            cut = max(pending.rfind("."), pending.rfind("!"), pending.rfind("?")) + 1
+            if cut > 0:
+                yield self._process_segment(pending[:cut], in_long_piece)
+                pending, in_long_piece = pending[cut:], False
+            elif len(pending) > self.max_stream_buffer:
+                # No punctuation for a long stretch: the sentence is too long
+                # to be kept anyway, so flush it at a word boundary
+                cut = pending.rfind(" ")
+                if cut > 0:
+                    yield self._process_segment(pending[:cut], True)
+                    pending, in_long_piece = pending[cut:], True
+        
+        tail = self.clean(raw)
+        if tail:
+            pending += (" " if started else "") + tail
+        if pending:
+            yield self._process_segment(pending, in_long_piece)
+    
+    def _process_segment(self, text: str, continues_sentence: bool) -> AnalysisContext:
         """
-        cleaned = self.clean(text)
-        sentences = self.segment_sentences(cleaned)
-        tokens = self.tokenize(cleaned)
+        Process one streamed segment of already cleaned text
         
-        return {
-            "original": text,
-            "cleaned": cleaned,
-            "sentences": sentences,
-            "tokens": tokens,
-            "sentence_count": len(sentences),
-            "token_count": len(tokens),
-            "char_count": len(cleaned)
-        }
+        Args:
+            text: Cleaned segment text (exact slice of the cleaned document)
+            continues_sentence: Whether the segment starts inside an
+                over-long sentence, whose remainder must not be kept
+        """
+        sentence_spans = self.sentence_spans(text)
+        if continues_sentence:
+            first_break = _SENTENCE_PUNCT.search(text)
+            boundary = first_break.start() if first_break else len(text)
+            sentence_spans = [span for span in sentence_spans if span[0] > boundary]
+        
+        return AnalysisContext(
+            cleaned=text,
+            sentences=[text[start:end] for start, end in sentence_spans],
+            tokens=self.tokenize(text),
+            sentence_spans=sentence_spans
+        )
     
     def clean(self, text: str) -> str:
         """Remove artifacts and normalize text"""
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE.sub(' ', text)
         
         # Remove URLs (keep structure)
-        text = re.sub(r'http[s]?://\S+', '[URL]', text)
+        text = _URL.sub('[URL]', text)
         
         # Normalize quotes
         text = text.replace('"', '"').replace('"', '"')
         text = text.replace("'", "'").replace("'", "'")
         
         # Remove excessive punctuation (keep sentence structure)
-        text = re.sub(r'[.]{3,}', '...', text)
+        text = _ELLIPSIS.sub('...', text)
         
         return text.strip()
     
     def segment_sentences(self, text: str) -> List[str]:
         """Split text into sentences"""
-        # Simple sentence splitting (can be enhanced with NLTK/spaCy)
-        sentences = re.split(r'[.!?]+', text)
+        return [text[start:end] for start, end in self.sentence_spans(text)]
+    
+    def sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Locate sentences in text
         
-        # Filter and clean sentences
-        sentences = [
-            s.strip() 
-            for s in sentences 
-            if len(s.strip()) >= self.min_sentence_length
-            and len(s.strip()) <= self.max_sentence_length
-        ]
+        Returns:
+            (start, end) offsets of each kept sentence, so that
+            text[start:end] is the stripped sentence
+        """
+        # Simple sentence splitting (can be enhanced with NLTK/spaCy):
+        # pieces between runs of [.!?] are sentences
+        spans = []
+        for match in _SENTENCE_PIECE.finditer(text):
+            piece = match.group()
+            stripped = piece.strip()
+            
+            # Filter and clean sentences
+            if self.min_sentence_length <= len(stripped) <= self.max_sentence_length:
+                start = match.start() + len(piece) - len(piece.lstrip())
+                spans.append((start, start + len(stripped)))
         
-        return sentences
+        return spans
     
     def tokenize(self, text: str) -> List[str]:
         """Tokenize text into words"""
         # Simple tokenization (can be enhanced)
-        tokens = re.findall(r'\b\w+\b', text.lower())
+        tokens = _TOKEN.findall(text.lower())
         return tokens
 
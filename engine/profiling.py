@@ -0,0 +1,138 @@
+"""
+Scoring Profiler
+Stage-by-stage cost breakdown of scoring one text: wall time per stage
+and marker, hottest functions, regex calls and peak allocated memory
+"""
+
+import cProfile
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from engine.humanscore.scorer import HumanScoreEngine, ENGINE_VERSION
+from engine.metrics import get_metrics
+from engine.preprocessing.text_processor import TextProcessor
+
+
+# cProfile and tracemalloc are process-wide; profile one text at a time
+_profile_lock = threading.Lock()
+
+_PROJECT_ROOT = Path(__file__).parent.parent
+
+# Scored before profiling, so one-time setup (e.g. character tables) is not in the report
+_WARM_UP_TEXT = "Warm up the engine first. Then profile the real text, maybe?"
+
+
+def _location(filename: str, line: int) -> str:
+    """Source location, relative to the project root when inside it"""
+    if filename == "~":
+        return "built-in"
+    try:
+        filename = str(Path(filename).relative_to(_PROJECT_ROOT))
+    except ValueError:
+        pass
+    return f"{filename}:{line}"
+
+
+def _hot_functions(stats: pstats.Stats, top: int) -> List[Dict[str, Any]]:
+    """Functions with the most time spent in their own code"""
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return [
+        {
+            "function": name,
+            "location": _location(filename, line),
+            "calls": calls,
+            "self_s": round(self_time, 6),
+            "cumulative_s": round(cumulative, 6),
+        }
+        for (filename, line, name), (_, calls, self_time, cumulative, _) in entries
+    ]
+
+
+def _regex_calls(stats: pstats.Stats) -> int:
+    """Calls to compiled pattern methods (search, finditer, sub, ...), which module-level re functions go through"""
+    return sum(
+        calls for (_, _, name), (_, calls, _, _, _) in stats.stats.items()
+        if "of 're.Pattern' objects" in name
+    )
+
+
+def profile_scoring(
+    text: str,
+    processor: Optional[TextProcessor] = None,
+    engine: Optional[HumanScoreEngine] = None,
+    detail: str = "full",
+    top: int = 15,
+    markers: Optional[Iterable[str]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Preprocess and score a text while measuring where the time goes
+
+    After a short warm-up text, the text is scored twice: under cProfile
+    and tracemalloc, for hot functions, regex calls and peak memory, then
+    plainly, for wall time per stage (the stages timed by engine.metrics).
+    Profiler overhead inflates the first run's times, so they are only
+    comparable with each other.
+
+    Args:
+        text: Raw input text
+        processor: Text processor (default: a new one)
+        engine: Scoring engine (default: a new one)
+        detail: Result detail level (see DETAIL_LEVELS)
+        top: Hot functions listed
+        markers: Markers to run (default: all)
+
+    Returns:
+        Tuple of the score dictionary and the profile report
+    """
+    processor = processor or TextProcessor()
+    engine = engine or HumanScoreEngine()
+
+    with _profile_lock:
+        engine.score(processor.process(_WARM_UP_TEXT), detail=detail, markers=markers)
+
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            engine.score(processor.process(text), detail=detail, markers=markers)
+        finally:
+            profiler.disable()
+            profiled_time = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            if not was_tracing:
+                tracemalloc.stop()
+
+        with get_metrics().record_stages() as stages:
+            started = time.perf_counter()
+            processed = processor.process(text)
+            result = engine.score(processed, detail=detail, markers=markers)
+            wall_time = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler)
+    report = {
+        "engine_version": ENGINE_VERSION,
+        "config_key": engine.config_key_for(markers),
+        "input": {
+            "chars": len(text),
+            "sentences": processed["sentence_count"],
+            "tokens": processed["token_count"],
+        },
+        "wall_time_s": round(wall_time, 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "profiled_time_s": round(profiled_time, 6),
+        "function_calls": stats.total_calls,
+        "regex_calls": _regex_calls(stats),
+        "peak_memory_bytes": max(0, peak - baseline),
+        "hot_functions": _hot_functions(stats, top),
+    }
+    return result, report
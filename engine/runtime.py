@@ -0,0 +1,154 @@
+"""
+Engine Runtime
+Process-wide text processor and scoring engine, built once and warmed up
+before the process serves requests
+
+Engine state that is expensive to compute on a cold start (the character
+class tables) can be snapshotted at build time:
+
+    python -m engine.runtime [--output engine/state.npz]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from engine.humanscore.scorer import HumanScoreEngine, DETAIL_LEVELS
+from engine.preprocessing.context import get_char_tables, set_char_tables
+from engine.preprocessing.text_processor import TextProcessor
+
+
+# Sample exercising every marker's patterns and lazy setup: hedges,
+# metaphors, transitions, a URL, an ellipsis, digits, capitals and a
+# character outside the Basic Multilingual Plane
+WARM_UP_TEXT = (
+    "I think the river is like a journey, maybe. However, the data suggests otherwise... "
+    "Perhaps we should check https://example.com again! In 2024, SOME results were roughly 42% higher; "
+    "therefore the argument holds. Honestly, it seems the foundation was a bridge of light \U0001D400. "
+    "Furthermore, the committee explains the results. Actually, wait: could it be the key?"
+)
+
+# Instances are stateless between calls: all per-text state lives in the
+# AnalysisContext, so one instance serves every thread of the process
+_processor: Optional[TextProcessor] = None
+_engine: Optional[HumanScoreEngine] = None
+_lock = threading.Lock()
+
+# Build-time snapshot of precomputed engine state
+DEFAULT_STATE_FILE = Path(__file__).parent / "state.npz"
+
+
+def get_processor() -> TextProcessor:
+    """Get or create the process-wide text processor"""
+    if _processor is None:
+        _build()
+    return _processor
+
+
+def get_engine() -> HumanScoreEngine:
+    """Get or create the process-wide scoring engine"""
+    if _engine is None:
+        _build()
+    return _engine
+
+
+def _build():
+    """Create both instances once, even when threads race for them"""
+    global _processor, _engine
+    with _lock:
+        if _engine is None:
+            load_state()
+            _processor = TextProcessor()
+            _engine = HumanScoreEngine()
+
+
+def warm_up(text: str = WARM_UP_TEXT) -> Dict[str, Any]:
+    """
+    Run a sample through every scoring path of the process-wide engine
+
+    Triggers lazy initialization (character tables, cached pattern sets,
+    embedding models) so the first real request does not pay for it.
+
+    Returns:
+        Dictionary with the warm-up duration in seconds
+    """
+    started = time.perf_counter()
+    processor = get_processor()
+    engine = get_engine()
+    for detail in DETAIL_LEVELS:
+        engine.score(processor.process(text), detail=detail)
+    engine.score_windows(processor.process(text), window=2, stride=1)
+    engine.score_stream([text[:len(text) // 2], text[len(text) // 2:]], processor=processor)
+    return {"seconds": time.perf_counter() - started}
+
+
+def _state_file(path: Optional[str] = None) -> Path:
+    return Path(path or os.getenv("ENGINE_STATE_FILE", str(DEFAULT_STATE_FILE)))
+
+
+def save_state(path: Optional[str] = None) -> Path:
+    """
+    Snapshot precomputed engine state (the character class tables, bit-packed)
+
+    Character classes come from the interpreter's Unicode database, so a
+    snapshot is only used by interpreters with the same Unicode version;
+    build it with the Python version that serves requests.
+
+    Args:
+        path: Snapshot file (default: ENGINE_STATE_FILE or engine/state.npz)
+
+    Returns:
+        Path of the written file
+    """
+    path = _state_file(path)
+    tables = get_char_tables()
+    np.savez_compressed(
+        path,
+        unidata_version=np.array(unicodedata.unidata_version),
+        **{name: np.packbits(table) for name, table in tables.items()}
+    )
+    return path
+
+
+def load_state(path: Optional[str] = None) -> bool:
+    """
+    Install a build-time snapshot of engine state, if there is a usable one
+
+    Returns:
+        Whether the snapshot was loaded (otherwise the state is computed on
+        first use, as without a snapshot)
+    """
+    path = _state_file(path)
+    if not path.exists():
+        return False
+    try:
+        with np.load(path) as state:
+            if str(state["unidata_version"]) != unicodedata.unidata_version:
+                return False
+            tables = {name: np.unpackbits(state[name]).astype(bool) for name in ("upper", "digit")}
+        set_char_tables(tables)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Warning: Engine state {path} not loaded: {e}")
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Write the engine state snapshot"""
+    parser = argparse.ArgumentParser(prog="python -m engine.runtime", description="Snapshot precomputed engine state")
+    parser.add_argument("--output", help="Snapshot file (default: ENGINE_STATE_FILE or engine/state.npz)")
+    args = parser.parse_args(argv)
+    path = save_state(args.output)
+    print(f"Engine state written to {path} (Unicode {unicodedata.unidata_version})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
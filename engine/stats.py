@@ -0,0 +1,222 @@
+"""
+Vectorized Statistics Helpers
+Segment-wise reductions for analyzing many documents in one pass
+"""
+
+from typing import Sequence, Iterable, Hashable, List, Tuple, Union
+from collections import Counter
+import numpy as np
+
+
+# Window length: one for every window, or one per window
+WindowSize = Union[int, np.ndarray]
+
+
+def segment_ids(lengths: Sequence[int]) -> np.ndarray:
+    """
+    Map every flattened item to the index of the segment it belongs to
+
+    Args:
+        lengths: Number of items in each segment
+
+    Returns:
+        Integer array with one segment index per item
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    return np.repeat(np.arange(len(lengths)), lengths)
+
+
+def concat_segments(arrays: Sequence[np.ndarray]) -> np.ndarray:
+    """Concatenate per-segment arrays into one flat float array (empty-safe)"""
+    return np.concatenate(list(arrays) + [np.zeros(0)]).astype(float, copy=False)
+
+
+def segment_sum(values: np.ndarray, ids: np.ndarray, n_segments: int) -> np.ndarray:
+    """Sum of values per segment (0 for empty segments)"""
+    return np.bincount(ids, weights=values, minlength=n_segments).astype(float)
+
+
+def segment_mean(values: np.ndarray, ids: np.ndarray, n_segments: int) -> np.ndarray:
+    """Mean of values per segment (0 for empty segments)"""
+    counts = np.bincount(ids, minlength=n_segments)
+    sums = segment_sum(values, ids, n_segments)
+    return np.divide(sums, counts, out=np.zeros(n_segments), where=counts > 0)
+
+
+def segment_var(values: np.ndarray, ids: np.ndarray, n_segments: int) -> np.ndarray:
+    """Population variance of values per segment (0 for segments with < 2 items)"""
+    counts = np.bincount(ids, minlength=n_segments)
+    means = segment_mean(values, ids, n_segments)
+    sq_dev = (values - means[ids]) ** 2 if len(values) else values
+    sums = segment_sum(sq_dev, ids, n_segments)
+    return np.divide(sums, counts, out=np.zeros(n_segments), where=counts > 1)
+
+
+def window_sum(values: np.ndarray, starts: np.ndarray, size: WindowSize) -> np.ndarray:
+    """
+    Sum of values over the windows [start, start + size), from prefix sums
+
+    Windows are clipped to the end of the array. size is one length for
+    every window or an array with one length per window.
+    """
+    values = np.asarray(values, dtype=float)
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.minimum(starts + size, len(values))
+    return prefix[ends] - prefix[np.minimum(starts, ends)]
+
+
+def window_count(n: int, starts: np.ndarray, size: WindowSize) -> np.ndarray:
+    """Number of items in each (clipped) window over n items"""
+    return np.maximum(np.minimum(starts + size, n) - starts, 0)
+
+
+def window_mean(values: np.ndarray, starts: np.ndarray, size: WindowSize) -> np.ndarray:
+    """Mean of values per window (0 for empty windows)"""
+    counts = window_count(len(values), starts, size)
+    sums = window_sum(values, starts, size)
+    return np.divide(sums, counts, out=np.zeros(len(starts)), where=counts > 0)
+
+
+def window_var(values: np.ndarray, starts: np.ndarray, size: WindowSize) -> np.ndarray:
+    """Population variance of values per window (0 for windows with < 2 items)"""
+    values = np.asarray(values, dtype=float)
+    # Center first so the prefix sums of squares stay well conditioned
+    centered = values - values.mean() if len(values) else values
+    counts = window_count(len(values), starts, size)
+    means = window_mean(centered, starts, size)
+    sq_means = window_mean(centered ** 2, starts, size)
+    return np.where(counts > 1, np.maximum(sq_means - means ** 2, 0.0), 0.0)
+
+
+def window_type_counts(
+    items: List[Iterable[Hashable]],
+    starts: np.ndarray,
+    size: WindowSize
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distinct and once-only item counts per window, updated incrementally
+
+    Args:
+        items: Items of each position (e.g. the tokens of each sentence)
+        starts: Increasing window start positions
+        size: Window length in positions (one per window, or shared);
+            window ends must be non-decreasing
+
+    Returns:
+        Tuple of (number of distinct items, number of items seen exactly once)
+        per window
+    """
+    counts: Counter = Counter()
+    distinct = np.zeros(len(starts), dtype=np.int64)
+    hapax = np.zeros(len(starts), dtype=np.int64)
+    n_distinct = n_hapax = 0
+    ends = np.minimum(np.asarray(starts) + size, len(items))
+    lo = hi = 0
+
+    def add(position: int, step: int):
+        nonlocal n_distinct, n_hapax
+        for item in items[position]:
+            before = counts[item]
+            after = before + step
+            counts[item] = after
+            n_distinct += (after > 0) - (before > 0)
+            n_hapax += (after == 1) - (before == 1)
+            if after == 0:
+                del counts[item]
+
+    for w, (start, end) in enumerate(zip(starts, ends)):
+        # Drop positions that left the window, add the ones that entered
+        for position in range(lo, min(hi, start)):
+            add(position, -1)
+        if hi <= start:
+            hi = start
+        for position in range(hi, end):
+            add(position, 1)
+        lo, hi = start, max(hi, end)
+        distinct[w] = n_distinct
+        hapax[w] = n_hapax
+    return distinct, hapax
+
+
+def long_range_similarity(
+    vectors: np.ndarray,
+    min_gap: int,
+    block_size: int = 512
+) -> Tuple[float, int, np.ndarray]:
+    """
+    Cosine similarity between rows at least min_gap apart, in row blocks
+
+    Only a block_size x n slice of the similarity matrix exists at a time,
+    so memory grows linearly with the number of rows.
+
+    Args:
+        vectors: Row vectors (n, d)
+        min_gap: Smallest distance between compared rows (>= 1)
+        block_size: Rows per block
+
+    Returns:
+        Tuple of (mean similarity over all compared pairs, number of pairs,
+        each row's highest similarity to a row at least min_gap before it,
+        NaN for rows without one)
+    """
+    n = len(vectors)
+    min_gap = max(1, min_gap)
+    best = np.full(n, np.nan)
+    if n <= min_gap:
+        return 0.0, 0, best
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-12)
+    total, pairs = 0.0, 0
+    for start in range(min_gap, n, max(1, block_size)):
+        end = min(n, start + block_size)
+        sims = unit[start:end] @ unit[:end - min_gap].T
+        rows = np.arange(start, end)[:, None]
+        cols = np.arange(end - min_gap)[None, :]
+        mask = cols <= rows - min_gap
+        best[start:end] = np.where(mask, sims, -np.inf).max(axis=1)
+        total += float(sims[mask].sum())
+        pairs += int(mask.sum())
+    return total / pairs, pairs, best
+
+
+class RunningStats:
+    """
+    Mergeable running count, sum, mean and variance (Welford / Chan et al.).
+    Lets streaming analysis fold per-chunk values without keeping them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> "RunningStats":
+        """Fold a batch of values into the running statistics"""
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            batch = RunningStats()
+            batch.count = len(values)
+            batch.total = float(values.sum())
+            batch.mean = batch.total / batch.count
+            batch.m2 = float(((values - batch.mean) ** 2).sum())
+            self.merge(batch)
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Combine with statistics computed over another set of values"""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.total += other.total
+        self.count = count
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance (0 for fewer than 2 values), as segment_var"""
+        return self.m2 / self.count if self.count > 1 else 0.0
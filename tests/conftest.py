@@ -0,0 +1,17 @@
+"""
+Shared test configuration
+Points the API at a throwaway database, log file, fingerprint index and metrics
+"""
+
+import os
+import tempfile
+
+_test_dir = tempfile.mkdtemp(prefix="traceneuro-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_test_dir, 'test.db')}")
+os.environ.setdefault("SCORING_LOG_FILE", os.path.join(_test_dir, "scoring_logs.jsonl"))
+os.environ.setdefault("FINGERPRINT_INDEX_DIR", os.path.join(_test_dir, "fingerprints"))
+os.environ.setdefault("METRICS_DIR", os.path.join(_test_dir, "metrics"))
+
+from api.database import init_db  # noqa: E402
+
+init_db()
@@ -3,6 +3,7 @@ Basic API tests
 """
 
 import pytest
+import numpy as np
 from fastapi.testclient import TestClient
 from api.main import app
 
@@ -54,3 +55,725 @@ def test_score_endpoint_short_text():
     # Should fail validation
     assert response.status_code == 422
 
+
+def test_score_batch_endpoint():
+    """Test batch scoring returns one ScoreResponse per text, in order"""
+    texts = [
+        "This is a sample text for testing. It contains multiple sentences. Maybe we can analyze it?",
+        "Another document entirely. It is shorter, but still fine!",
+    ]
+    response = client.post(
+        "/api/v1/score/batch",
+        json={"texts": texts, "options": {}}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 2
+    assert len(data["results"]) == 2
+
+    single = client.post("/api/v1/score", json={"text": texts[0], "options": {}}).json()
+    assert data["results"][0]["humanscore"] == single["humanscore"]
+    assert data["results"][0]["breakdown"] == single["breakdown"]
+
+
+def test_score_batch_endpoint_validation():
+    """Test batch scoring rejects empty batches and short texts"""
+    response = client.post("/api/v1/score/batch", json={"texts": []})
+    assert response.status_code == 422
+
+    response = client.post("/api/v1/score/batch", json={"texts": ["Short"]})
+    assert response.status_code == 422
+
+
+def test_score_endpoint_uses_result_cache():
+    """Test resubmitting the same text is served from the cache"""
+    payload = {
+        "text": "A unique text for the cache test. It should only be scored once. Probably!",
+        "options": {}
+    }
+    first = client.post("/api/v1/score", json=payload)
+    second = client.post("/api/v1/score", json=payload)
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "memory"
+    assert first.json() == second.json()
+
+    stats = client.get("/api/v1/cache/stats").json()
+    assert stats["memory_hits"] >= 1
+    assert stats["misses"] >= 1
+
+
+def test_score_batch_served_from_persistent_tier():
+    """Test batch texts missing from memory are found in history with one bulk lookup"""
+    from api.routes.history import lookup_cached_results
+    from api.utils.cache import get_result_cache
+    from api.utils.hashing import hash_text
+    from api.utils.history_writer import get_history_writer
+    from engine.runtime import get_engine
+
+    texts = [f"Persistent tier batch text number {i}. It is stored, then looked up again." for i in range(3)]
+    first = client.post("/api/v1/score/batch", json={"texts": texts, "detail": "summary"}).json()
+    get_history_writer().flush()
+    get_result_cache().clear()
+
+    cache_key = f"{get_engine().config_key}:summary"
+    hashes = [hash_text(text) for text in texts]
+    found = lookup_cached_results(hashes + ["unknown"], cache_key)
+    assert sorted(found) == sorted(hashes)
+    assert [found[text_hash]["humanscore"] for text_hash in hashes] == [result["humanscore"] for result in first["results"]]
+
+    hits = get_result_cache().stats()["persistent_hits"]
+    second = client.post("/api/v1/score/batch", json={"texts": texts, "detail": "summary"}).json()
+    assert second == first
+    assert get_result_cache().stats()["persistent_hits"] == hits + 3
+
+
+def test_score_detail_levels():
+    """Test lower detail levels return the same score with fewer marker details"""
+    text = "Detail level test text. It has several sentences, perhaps enough. " * 6
+    full = client.post("/api/v1/score", json={"text": text}).json()
+    markers = client.post("/api/v1/score", json={"text": text, "detail": "markers"}).json()
+    summary = client.post("/api/v1/score", json={"text": text, "detail": "summary"}).json()
+
+    assert markers["humanscore"] == summary["humanscore"] == full["humanscore"]
+    assert isinstance(full["metadata"]["marker_details"]["drift"]["drift_vectors"], list)
+    assert "drift_vectors" not in markers["metadata"]["marker_details"]["drift"]
+    assert markers["metadata"]["detail"] == "markers"
+    assert "marker_details" not in summary["metadata"]
+
+    invalid = client.post("/api/v1/score", json={"text": text, "detail": "everything"})
+    assert invalid.status_code == 422
+
+
+def test_score_marker_selection():
+    """Test options.markers runs only the selected markers, cached apart from full results"""
+    text = "Marker selection test text. It is scored twice, maybe more. Then the full score follows!"
+    cadence = client.post("/api/v1/score", json={"text": text, "options": {"markers": ["cadence"]}})
+    full = client.post("/api/v1/score", json={"text": text})
+    light = client.post("/api/v1/score/batch", json={"texts": [text], "options": {"max_cost": "light"}})
+
+    assert cadence.status_code == full.status_code == light.status_code == 200
+    assert full.headers["X-Cache"] == "miss"
+    assert list(cadence.json()["breakdown"]) == ["cadence"]
+    assert cadence.json()["breakdown"]["cadence"] == full.json()["breakdown"]["cadence"]
+    assert set(light.json()["results"][0]["breakdown"]) == {"cadence", "stylometry"}
+
+    unknown = client.post("/api/v1/score", json={"text": text, "options": {"markers": ["telepathy"]}})
+    assert unknown.status_code == 422
+
+    markers = client.get("/api/v1/markers").json()
+    assert [marker["name"] for marker in markers["markers"]][:2] == ["drift", "cadence"]
+    assert sum(marker["weight"] for marker in markers["markers"]) == pytest.approx(1.0)
+
+
+def test_score_response_compression():
+    """Test large responses are gzip-compressed for clients that accept it"""
+    text = "Compression test sentence number one. Another sentence follows here! " * 20
+    response = client.post("/api/v1/score", json={"text": text}, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == "gzip"
+    assert response.json()["humanscore"] >= 0
+
+
+def test_score_segments_endpoint():
+    """Test segment scoring returns windows covering the text and scored segments"""
+    human = "I mean, honestly? I dunno. Wait, hold on, the cat knocked my coffee over again! Anyway, so yeah. "
+    ai = "Furthermore, the implementation provides a comprehensive framework. Moreover, the system ensures robust performance. "
+    response = client.post(
+        "/api/v1/score/segments",
+        json={"text": human * 10 + ai * 10, "window": 6, "stride": 3}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    windows = data["windows"]
+    assert windows[0]["start"] == 0
+    assert windows[-1]["end"] == data["sentence_count"]
+    assert all(0.0 <= w["humanscore"] <= 1.0 for w in windows)
+    assert [s["start"] for s in data["segments"]] == [0] + data["change_points"]
+
+
+def test_job_lifecycle():
+    """Test a queued job is drained by the worker and its results paged out in order"""
+    import asyncio
+    from api.utils.jobs import JobWorker
+
+    texts = [
+        "I mean, honestly? I dunno. Wait, the cat knocked my coffee over again!",
+        "Furthermore, the implementation provides a comprehensive framework for analysis.",
+        "I mean, honestly? I dunno. Wait, the cat knocked my coffee over again!",
+    ]
+    response = client.post("/api/v1/jobs", json={"texts": texts})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued"
+    assert job["counts"]["queued"] == 3
+
+    # The repeated text is resolved together with its first occurrence
+    assert asyncio.run(JobWorker(batch_size=2).drain()) == 2
+
+    status = client.get(f"/api/v1/jobs/{job['job_id']}").json()
+    assert status["status"] == "completed"
+    assert status["counts"]["done"] == 3
+    assert status["progress"] == 1.0
+
+    first = client.get(f"/api/v1/jobs/{job['job_id']}/results", params={"limit": 2}).json()
+    rest = client.get(
+        f"/api/v1/jobs/{job['job_id']}/results",
+        params={"after": first["next_after"], "limit": 2}
+    ).json()
+    results = first["results"] + rest["results"]
+    assert [r["position"] for r in results] == [0, 1, 2]
+    assert rest["next_after"] is None
+    assert results[0]["humanscore"] == results[2]["humanscore"]
+
+    single = client.post("/api/v1/score", json={"text": texts[1]}).json()
+    assert results[1]["humanscore"] == single["humanscore"]
+
+
+def test_job_options_and_busy_release(monkeypatch):
+    """Test job options reach scoring and a busy pool does not use up item attempts"""
+    import asyncio
+    from api.database import SessionLocal, ScoringJobItem
+    from api.utils import jobs
+    from api.utils.executor import ScoringExecutor
+
+    texts = ["Job options test text. Only cadence is scored here, maybe.", "Another job options text! It is short."]
+    assert client.post("/api/v1/jobs", json={"texts": texts, "options": {"markers": ["telepathy"]}}).status_code == 422
+    job = client.post("/api/v1/jobs", json={"texts": texts, "options": {"markers": ["cadence"], "detail": "summary"}}).json()
+
+    def items():
+        db = SessionLocal()
+        try:
+            return db.query(ScoringJobItem).filter(ScoringJobItem.job_id == job["job_id"]).order_by(ScoringJobItem.position).all()
+        finally:
+            db.close()
+
+    busy = ScoringExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(jobs, "get_scoring_executor", lambda: busy)
+    worker = jobs.JobWorker(batch_size=1000, poll_interval=0)
+    for _ in range(worker.max_attempts + 1):
+        asyncio.run(worker.run_once())
+    assert [(item.status, item.attempts) for item in items()] == [("queued", 0)] * 2
+
+    monkeypatch.undo()
+    asyncio.run(jobs.JobWorker(batch_size=1000).drain())
+    assert all(item.status == "done" and list(item.breakdown) == ["cadence"] for item in items())
+
+
+def test_job_upload_and_validation(monkeypatch):
+    """Test JSONL uploads create jobs with their options; malformed lines, options and oversized files are rejected"""
+    content = '{"text": "This is a sample text for a bulk scoring job."}\n"Another text given as a plain JSON string."\n'
+    response = client.post("/api/v1/jobs/upload", files={"file": ("texts.jsonl", content)})
+    assert response.status_code == 202
+    assert response.json()["total"] == 2
+
+    response = client.post("/api/v1/jobs/upload", files={"file": ("texts.jsonl", '{"text": "short"}\n')})
+    assert response.status_code == 422
+
+    # Uploaded jobs take their options from a JSON form field, validated as for POST /jobs
+    response = client.post(
+        "/api/v1/jobs/upload",
+        files={"file": ("texts.jsonl", content)},
+        data={"options": '{"detail": "summary", "markers": ["cadence"]}'}
+    )
+    assert response.status_code == 202
+    assert response.json()["options"] == {"detail": "summary", "markers": ["cadence"]}
+    for options in ('{"markers": ["telepathy"]}', '["cadence"]', "{not json"):
+        response = client.post("/api/v1/jobs/upload", files={"file": ("texts.jsonl", content)}, data={"options": options})
+        assert response.status_code == 422
+
+    from api.routes import jobs
+    monkeypatch.setattr(jobs, "MAX_JOB_UPLOAD_BYTES", len(content) - 1)
+    response = client.post("/api/v1/jobs/upload", files={"file": ("texts.jsonl", content)})
+    assert response.status_code == 413
+
+    assert client.get("/api/v1/jobs/does-not-exist").status_code == 404
+
+
+def test_history_writer_batches_rows():
+    """Test buffered history rows are written in bulk, by size, on demand and on close"""
+    from api.database import SessionLocal, ScoringHistory
+    from api.routes.history import history_row
+    from api.utils.history_writer import HistoryWriter, HistoryBackpressureError
+
+    def row(i):
+        return history_row(f"History writer test text {i}", 0.5, {"drift": 0.5}, {}, f"writer-{i}")
+
+    def written():
+        db = SessionLocal()
+        try:
+            return db.query(ScoringHistory).filter(ScoringHistory.text_hash.like("writer-%")).count()
+        finally:
+            db.close()
+
+    writer = HistoryWriter(flush_rows=3, flush_ms=60000, max_pending=3)
+    first = writer.submit([row(0), row(1)])
+    assert not first.done()
+
+    # Reaching flush_rows triggers a flush without waiting for the timer
+    second = writer.submit([row(2)])
+    assert len(first.result(timeout=5)) == 2
+    assert second.result(timeout=5)[0] == first.result()[1] + 1
+    assert written() == 3
+
+    # Callers that need the id get it right away
+    ids = writer.submit([row(3)], wait=True).result(timeout=5)
+    assert len(ids) == 1
+
+    # A full buffer pushes back on producers
+    writer.submit([row(4), row(5)])
+    with pytest.raises(HistoryBackpressureError):
+        writer.submit([row(6), row(7)], timeout=0.01)
+
+    writer.close()
+    assert written() == 6
+    stats = writer.stats()
+    assert stats["written"] == 6
+    assert stats["pending"] == 0
+    assert stats["max_flush_rows"] == 3
+
+
+def test_history_writer_builds_rows_in_writer_thread():
+    """Test raw scoring results submitted with a row builder are packed by the flusher thread"""
+    import threading
+    from api.database import SessionLocal, ScoringDetailBlob
+    from api.routes.history import result_history_row
+    from api.utils.history_writer import HistoryWriter
+
+    text = "Row builder test text. The writer thread packs its details before the insert. " * 20
+    result = client.post("/api/v1/score", json={"text": text}).json()
+    threads = []
+
+    def build(item):
+        threads.append(threading.current_thread().name)
+        return result_history_row(item)
+
+    writer = HistoryWriter(flush_rows=10, flush_ms=60000)
+    ids = writer.submit([(text, result, "builder-0", None)], wait=True, build=build).result(timeout=5)
+    writer.close()
+    assert threads == ["history-writer"]
+
+    db = SessionLocal()
+    try:
+        assert db.query(ScoringDetailBlob).filter(ScoringDetailBlob.history_id == ids[0]).count() == 1
+    finally:
+        db.close()
+
+
+def test_jsonl_logger_rotation_and_policy(tmp_path):
+    """Test the logger writes in the background, rotates, compresses and applies the text policy"""
+    import gzip
+    import json
+    import time
+    from api.utils.logger import JSONLLogger
+
+    log_file = tmp_path / "scores.jsonl"
+    logger = JSONLLogger(str(log_file), text_policy="hash", max_bytes=600, compress=True)
+    for i in range(10):
+        logger.log_scoring_request(text=f"Sample text number {i}", result={"humanscore": 0.5})
+        logger.flush()
+    logger.close()
+
+    stats = logger.stats()
+    assert stats["written"] == 10
+    assert stats["dropped"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["rotations"] >= 1
+
+    deadline = time.time() + 5
+    while time.time() < deadline and list(tmp_path.glob("scores.*.jsonl")):
+        time.sleep(0.01)  # Rotated files are compressed in the background
+    rotated = sorted(tmp_path.glob("scores.*.jsonl.gz"))
+    assert len(rotated) == stats["rotations"]
+
+    lines = [line for path in rotated for line in gzip.open(path, "rt")]
+    lines += log_file.read_text().splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert len(entries) == 10
+    assert all("text" not in entry and len(entry["text_hash"]) == 64 for entry in entries)
+
+
+def test_jsonl_logger_drops_when_queue_full(tmp_path):
+    """Test a full logger queue drops entries instead of blocking, counting them in the metrics"""
+    from api.utils.logger import JSONLLogger
+
+    def dropped_total():
+        return float(client.get("/metrics").text.split("\ntraceneuro_log_dropped_total ")[1].split()[0])
+
+    before = dropped_total()
+    logger = JSONLLogger(str(tmp_path / "scores.jsonl"), text_policy="truncate", text_max_chars=5, queue_size=1)
+    logger._start = lambda: None  # Keep the writer thread from draining the queue
+    logger.log_scoring_batch(texts=["First text here", "Second text here"], results=[{}, {}])
+    assert logger.stats()["dropped"] == 1
+    assert dropped_total() == before + 1
+    assert "# TYPE traceneuro_log_dropped_total counter" in client.get("/metrics").text
+    assert logger.stats()["queue_depth"] == 1
+
+    entry = logger._apply_text_policy(logger._queue.get_nowait())
+    assert entry["text"] == "First"
+    assert entry["text_truncated"] is True
+
+
+def test_history_keyset_pagination():
+    """Test history pages follow the cursor without gaps or repeats and honor filters"""
+    from datetime import datetime, timedelta
+    from api.database import SessionLocal, ScoringHistory
+
+    # Rows in a date range no other test writes to, with tied timestamps
+    base = datetime(2100, 1, 1)
+    db = SessionLocal()
+    db.add_all([
+        ScoringHistory(
+            text_hash=f"page-{i}",
+            text_preview=f"Pagination test {i}",
+            humanscore=i / 10,
+            breakdown={},
+            full_metadata={},
+            created_at=base + timedelta(minutes=i // 2)
+        )
+        for i in range(10)
+    ])
+    db.commit()
+    db.close()
+
+    params = {"since": "2100-01-01T00:00:00", "limit": 3}
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/v1/history", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [r["text_preview"] for r in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [f"Pagination test {i}" for i in reversed(range(10))]
+
+    filtered = client.get("/api/v1/history", params={
+        "since": "2100-01-01T00:00:00Z", "until": "2100-01-01T00:04:00", "min_score": 0.25, "max_score": 0.65
+    }).json()
+    assert [r["humanscore"] for r in filtered] == [0.6, 0.5, 0.4, 0.3]
+
+    assert client.get("/api/v1/history", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_history_details_packed_and_migrated():
+    """Test detail arrays are stored as packed blobs, served on demand and migrated from old rows"""
+    from api.database import SessionLocal, ScoringHistory
+    from api.utils.executor import score_texts
+    from api.utils.history_writer import get_history_writer
+    from api.utils.migrate_details import migrate_history_details
+
+    text = "I think maybe this works. Honestly, it might not. " * 20
+    result = score_texts([text])[0]
+    details = result["metadata"]["marker_details"]
+
+    client.post("/api/v1/score", json={"text": text})
+    get_history_writer().flush()
+    db = SessionLocal()
+    record = db.query(ScoringHistory).order_by(ScoringHistory.id.desc()).first()
+    assert record.full_metadata["marker_details"]["hedging"]["sentence_hedging"] is None
+    assert record.detail_blob.stored_bytes < record.detail_blob.raw_bytes
+
+    # An old-style row with the arrays inline in the metadata
+    legacy = ScoringHistory(
+        text_hash="legacy", text_preview=text[:500], humanscore=result["humanscore"],
+        breakdown=result["breakdown"], full_metadata=result["metadata"]
+    )
+    db.add(legacy)
+    db.commit()
+    legacy_id = legacy.id
+    db.close()
+
+    before = client.get(f"/api/v1/history/{legacy_id}/details").json()
+    assert before["storage"]["packed"] is False
+    assert before["marker_details"] == details
+
+    report = migrate_history_details()
+    assert report["rows_packed"] >= 1
+    assert report["bytes_saved"] > 0
+
+    after = client.get(f"/api/v1/history/{legacy_id}/details").json()
+    assert after["storage"]["packed"] is True
+    packed = after["marker_details"]
+    assert packed["hedging"]["sentence_hedging"] == details["hedging"]["sentence_hedging"]
+    assert np.allclose(packed["drift"]["drift_vectors"], details["drift"]["drift_vectors"], atol=1e-6)
+    assert list(packed["drift"]) == list(details["drift"])
+
+    assert client.get("/api/v1/history/details/stats").json()["bytes_saved"] > 0
+
+
+def test_score_reports_and_reuses_near_duplicates():
+    """Test a lightly edited resubmission finds the original and can reuse its result"""
+    from api.utils.history_writer import get_history_writer
+    from api.utils.near_duplicates import get_near_duplicate_index
+
+    original = "The committee met on Tuesday to review the budget. " + " ".join(
+        f"Item {i} was discussed at length and postponed again." for i in range(30)
+    )
+    edited = "Minutes. " + original.replace("Tuesday", "Thursday")
+
+    first = client.post("/api/v1/score", json={"text": original}).json()
+    assert first["metadata"]["near_duplicates"] == []
+    get_history_writer().flush()
+
+    second = client.post("/api/v1/score", json={"text": edited})
+    matches = second.json()["metadata"]["near_duplicates"]
+    assert matches and matches[0]["similarity"] >= 0.8
+    assert matches[0]["humanscore"] == first["humanscore"]
+    assert second.headers["X-Cache"] == "miss"
+
+    index = get_near_duplicate_index()
+    index.reuse_threshold = 0.8
+    try:
+        reused = client.post("/api/v1/score", json={"text": edited + " Adjourned."})
+    finally:
+        index.reuse_threshold = 0.0
+    assert reused.headers["X-Cache"] == "near-duplicate"
+    metadata = reused.json()["metadata"]
+    assert metadata["reused_from"] == metadata["near_duplicates"][0]["history_id"]
+
+
+def test_fingerprint_similarity_search():
+    """Test fingerprint search finds a document in the same style first and validates its input"""
+    from api.utils.history_writer import get_history_writer
+
+    terse = "Short words. Plain talk. No frills here. We go on. " * 8
+    ornate = ("Notwithstanding considerable institutional deliberation, comprehensive reconsideration "
+              "of longstanding administrative arrangements appears, regrettably, indispensable; ") * 6
+    for text in (terse, ornate):
+        client.post("/api/v1/score", json={"text": text})
+    get_history_writer().flush()
+
+    response = client.post("/api/v1/fingerprints/similar", json={"text": terse.replace("We go on", "We go"), "k": 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["method"] == "brute"
+    assert data["results"][0]["text_preview"] == terse[:500]
+    assert data["results"][0]["similarity"] > 0.9
+
+    by_id = client.post("/api/v1/fingerprints/similar", json={"history_id": data["results"][0]["history_id"]}).json()
+    assert data["results"][0]["history_id"] not in [r["history_id"] for r in by_id["results"]]
+
+    assert client.post("/api/v1/fingerprints/similar", json={"k": 3}).status_code == 400
+    assert client.post("/api/v1/fingerprints/similar", json={"history_id": 10 ** 9}).status_code == 404
+    assert client.get("/api/v1/fingerprints/stats").json()["rows"] >= 2
+
+
+def test_metrics_endpoint():
+    """Test /metrics exports stage latency, input size and gauges in the Prometheus text format"""
+    import re
+    from api.utils.history_writer import get_history_writer
+    from api.utils.logger import get_logger
+
+    def sample(text, series):
+        match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+        return float(match.group(1)) if match else None
+
+    before = client.get("/metrics").text
+    client.post("/api/v1/score", json={"text": "Metrics should see this text. It has two sentences, maybe three?"})
+    get_history_writer().flush()
+    get_logger().flush()
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for stage in ("preprocess", "drift", "stylometry", "fusion", "history"):
+        series = f'traceneuro_stage_duration_seconds_count{{stage="{stage}"}}'
+        assert sample(text, series) > sample(before, series)
+    assert sample(text, "traceneuro_input_chars_count") > sample(before, "traceneuro_input_chars_count")
+    assert sample(text, 'traceneuro_stage_errors_total{stage="drift"}') == 0
+    assert sample(text, "traceneuro_result_cache_entries") >= 1
+    assert "# TYPE traceneuro_stage_duration_seconds histogram" in text
+
+
+def test_profiling_admin_only_and_offline_replay(monkeypatch, capsys):
+    """Test profiled scoring needs the admin token and a stored request replays through the profiler"""
+    import json
+    from api.database import SessionLocal, ScoringHistory
+    from api.utils.hashing import hash_text
+    from api.utils.history_writer import get_history_writer
+    from api.utils.logger import get_logger
+    from api.utils.profiling import main as replay
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    text = "Profile this document, please. It is slow, maybe? Perhaps the regexes are to blame."
+    payload = {"text": text, "options": {"profile": True}}
+
+    assert client.post("/api/v1/score", json=payload).status_code == 403
+    assert client.post("/api/v1/score", json=payload, headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/api/v1/score", json={"text": text}, headers={"X-Profile": "1", "X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "profiled"
+    report = response.json()["metadata"]["profile"]
+    assert {"preprocess", "drift", "hedging", "fusion"} <= set(report["stages"])
+    assert report["regex_calls"] > 0 and report["peak_memory_bytes"] > 0
+    assert report["hot_functions"]
+    assert "profile" not in client.post("/api/v1/score", json={"text": text}).json()["metadata"]
+
+    get_history_writer().flush()
+    get_logger().flush()
+    db = SessionLocal()
+    try:
+        history_id = db.query(ScoringHistory.id).filter(ScoringHistory.text_hash == hash_text(text))\
+            .order_by(ScoringHistory.id.desc()).first().id
+    finally:
+        db.close()
+
+    assert replay(["--history-id", str(history_id), "--top", "3"]) == 0
+    replayed = json.loads(capsys.readouterr().out)
+    assert replayed["text_source"] == "log"
+    assert replayed["humanscore"] == replayed["stored_humanscore"]
+    assert len(replayed["profile"]["hot_functions"]) == 3
+    assert replay(["--history-id", str(10 ** 9)]) == 1
+
+
+def test_readiness_after_warm_up(monkeypatch):
+    """Test /ready answers 503 until the engine is warmed up, and the engine is shared per process"""
+    import asyncio
+    import api.main
+    from api.utils.executor import ScoringExecutor
+    from engine.runtime import get_engine, get_processor
+
+    executor = ScoringExecutor(max_workers=0, max_queue=1)
+    monkeypatch.setattr(api.main, "get_scoring_executor", lambda: executor)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False}
+    assert client.get("/health").json()["ready"] is False
+
+    warmup = asyncio.run(executor.warm_up())
+    assert warmup["workers"] == 0 and warmup["seconds"] > 0
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert get_engine() is get_engine() and get_processor() is get_processor()
+
+
+def test_failed_warm_up_is_reported_and_retried(monkeypatch):
+    """Test a failed warm-up shows its error in /health and /ready and is retried until it succeeds"""
+    import asyncio
+    import api.main
+    from api.utils import executor as executor_module
+    from api.utils.executor import ScoringExecutor
+
+    executor = ScoringExecutor(max_workers=0, max_queue=1)
+    monkeypatch.setattr(api.main, "get_scoring_executor", lambda: executor)
+    monkeypatch.setattr(api.main, "WARMUP_RETRY_SECONDS", 0)
+    monkeypatch.setattr(api.main, "WARMUP_MAX_ATTEMPTS", 2)
+
+    def broken():
+        raise RuntimeError("model files missing")
+
+    monkeypatch.setattr(executor_module, "warm_up", broken)
+    asyncio.run(api.main._warm_up())
+    assert executor.warmup == {"error": "model files missing", "attempts": 2}
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["warmup"]["error"] == "model files missing"
+    assert client.get("/health").json()["warmup"]["error"] == "model files missing"
+
+    # Fails once more, then succeeds on the retry
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("busy")
+
+    monkeypatch.setattr(executor_module, "warm_up", flaky)
+    monkeypatch.setattr(api.main, "WARMUP_MAX_ATTEMPTS", 0)
+    asyncio.run(api.main._warm_up())
+    assert len(calls) == 2
+    assert executor.ready and executor.warmup["attempts"] == 4
+    assert client.get("/ready").status_code == 200
+
+
+def test_executor_without_workers_keeps_loop_free():
+    """Test scoring without worker processes runs off the event loop"""
+    import asyncio
+    import threading
+    import time
+    from api.utils.executor import ScoringExecutor
+
+    executor = ScoringExecutor(max_workers=0, max_queue=1)
+
+    def slow_score(seconds):
+        time.sleep(seconds)
+        return threading.get_ident()
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        scored_in = await executor.run(slow_score, 0.2, size=10 ** 6)
+        task.cancel()
+        return scored_in, ticks
+
+    scored_in, ticks = asyncio.run(scenario())
+    # The loop kept running other tasks while the score ran in another thread
+    assert scored_in != threading.get_ident()
+    assert len(ticks) > 5
+    assert executor.stats()["inline"] == 1
+
+
+def test_serverless_entry_point(monkeypatch):
+    """Test the lean entry point scores like the full app, records history behind and delegates the rest"""
+    from api import serverless
+    from api.database import SessionLocal, ScoringHistory, schema_exists
+    from api.utils.hashing import hash_text
+    from api.utils.history_writer import get_history_writer
+
+    # The full app is already imported; skip its startup (job worker, warm-up)
+    monkeypatch.setattr(serverless, "_full_app", app)
+    lean = TestClient(serverless.app)
+    text = "Serverless cold starts matter. I believe this text is scored the same way, perhaps?"
+
+    response = lean.post("/api/v1/score", json={"text": text, "detail": "markers"})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "miss"
+    expected = client.post("/api/v1/score", json={"text": text, "detail": "markers"}).json()
+    assert response.json()["humanscore"] == expected["humanscore"]
+    assert response.json()["breakdown"] == expected["breakdown"]
+    assert lean.post("/api/v1/score", json={"text": text, "detail": "markers"}).headers["X-Cache"] == "memory"
+
+    serverless._recorder.submit(lambda: None).result()
+    get_history_writer().flush()
+    db = SessionLocal()
+    try:
+        assert db.query(ScoringHistory).filter(ScoringHistory.text_hash == hash_text(text)).count() >= 1
+    finally:
+        db.close()
+    assert schema_exists()
+
+    selected = lean.post("/api/v1/score", json={"text": text, "options": {"markers": ["cadence"]}})
+    assert selected.headers["X-Cache"] == "miss" and list(selected.json()["breakdown"]) == ["cadence"]
+
+    # Invalid and non-score requests are answered by the full app
+    assert lean.post("/api/v1/score", json={"text": "short"}).status_code == 422
+    assert lean.post("/api/v1/score", json={"text": text, "options": {"markers": ["telepathy"]}}).status_code == 422
+    assert lean.get("/api/v1/cache/stats").status_code == 200
+
+
+def test_engine_state_snapshot(tmp_path, monkeypatch):
+    """Test the build-time engine state snapshot round-trips and is ignored for another Unicode version"""
+    import unicodedata
+    from engine.preprocessing import context
+    from engine.runtime import save_state, load_state
+
+    path = save_state(str(tmp_path / "state.npz"))
+    expected = {name: table.copy() for name, table in context.get_char_tables().items()}
+    monkeypatch.setattr(context, "_char_tables", None)
+    assert load_state(str(path))
+    assert all((context.get_char_tables()[name] == table).all() for name, table in expected.items())
+
+    assert not load_state(str(tmp_path / "missing.npz"))
+    monkeypatch.setattr(unicodedata, "unidata_version", "0.0.0")
+    assert not load_state(str(path))
@@ -0,0 +1,529 @@
+"""
+Engine tests
+"""
+
+import asyncio
+import re
+
+import numpy as np
+import pytest
+
+from engine.preprocessing.text_processor import TextProcessor
+from engine.preprocessing.context import AnalysisContext
+from engine.preprocessing.patterns import PatternScanner, literal_pattern
+from engine.humanscore.scorer import HumanScoreEngine
+from engine.humanscore.registry import MarkerSpec, register_marker, unregister_marker
+from engine.humanscore.cache import ResultCache
+from engine.changepoint import pelt
+from engine.stats import long_range_similarity
+from engine.dedup.minhash import MinHasher, signature_similarity
+from engine.markers.stylometry.index import FingerprintIndex
+from engine.embeddings.backends import HashingEmbeddingBackend, CachedEmbeddingBackend, length_sorted_batches
+from engine.embeddings.cache import EmbeddingCache, sentence_key
+from engine.embeddings.encoder import FeatureEncoder
+from engine.markers.drift.analyzer import DriftAnalyzer
+from api.utils.executor import ScoringExecutor, ExecutorBusyError, score_texts
+from benchmarks.corpus import make_corpus, make_document
+from benchmarks.suite import build_cases, compare_results, run_suite
+
+SAMPLE_TEXTS = [
+    "This is a sample text for testing. It contains multiple sentences. Maybe we can analyze it?",
+    "I think, maybe, this is like a journey. Actually, wait; hold on. Furthermore the road is long!",
+    "Only one sentence here",
+]
+
+
+def test_score_batch_matches_single_scores():
+    """Scoring a batch gives the same results as scoring each text alone"""
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    processed = [processor.process(text) for text in SAMPLE_TEXTS]
+
+    batch = engine.score_batch(processed)
+    single = [engine.score(p) for p in processed]
+
+    assert batch == single
+    assert all(0.0 <= r["humanscore"] <= 1.0 for r in batch)
+
+
+def test_marker_selection_renormalizes_and_registry_extends():
+    """Selected markers alone are run and fused over their weights; registered markers join new engines"""
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    processed = processor.process(SAMPLE_TEXTS[1])
+    full = engine.score(processed)
+    scores = {name: details[f"{name}_score"] for name, details in full["metadata"]["marker_details"].items()}
+
+    cadence = engine.score(processed, markers=["cadence"])
+    assert list(cadence["breakdown"]) == ["cadence"]
+    assert cadence["humanscore"] == pytest.approx(scores["cadence"], abs=1e-4)
+    assert cadence["metadata"]["engine"]["markers"] == ["cadence"]
+    assert cadence["metadata"]["engine"]["config_key"] == engine.config_key_for(["cadence"]) != engine.config_key
+    assert "markers" not in full["metadata"]["engine"]
+
+    pair = engine.score(processed, markers=["stylometry", "hedging"])
+    assert list(pair["breakdown"]) == ["hedging", "stylometry"]
+    assert pair["humanscore"] == pytest.approx(
+        (scores["hedging"] * 0.15 + scores["stylometry"] * 0.20) / 0.35, abs=1e-4
+    )
+    assert engine.select_markers(max_cost="light") == ("cadence", "stylometry")
+    with pytest.raises(ValueError):
+        engine.select_markers(["cadence", "unknown"])
+
+    class LengthMarker:
+        requires = ("sentence_word_counts",)
+
+        def analyze_batch(self, contexts):
+            return [{"length_score": min(1.0, float(ctx.sentence_word_counts.mean()) / 20)} for ctx in contexts]
+
+    register_marker(MarkerSpec(
+        "length", LengthMarker, lambda analyzer, contexts, include_series: analyzer.analyze_batch(contexts),
+        0.25, "length_score", "light"
+    ))
+    try:
+        extended = HumanScoreEngine()
+        result = extended.score(processor.process(SAMPLE_TEXTS[1]))
+    finally:
+        unregister_marker("length")
+    assert "length" in result["breakdown"] and "length" not in HumanScoreEngine().weights
+    assert extended.config_key != engine.config_key
+    assert result["humanscore"] == pytest.approx(
+        (full["humanscore"] + result["breakdown"]["length"] * 0.25) / 1.25, abs=1e-3
+    )
+
+
+def test_result_cache_lru_eviction_and_ttl():
+    """LRU tier evicts the least recently used entry and expires stale ones"""
+    cache = ResultCache(max_size=2, ttl_seconds=0)
+    cache.put("a", "cfg", {"humanscore": 0.1})
+    cache.put("b", "cfg", {"humanscore": 0.2})
+    assert cache.get("a", "cfg")[1] == "memory"
+    cache.put("c", "cfg", {"humanscore": 0.3})
+
+    assert cache.get("b", "cfg") == (None, "miss")
+    assert cache.get("a", "cfg")[0] == {"humanscore": 0.1}
+    assert cache.get("a", "other-cfg") == (None, "miss")
+    assert cache.stats()["evictions"] == 1
+
+    expiring = ResultCache(max_size=2, ttl_seconds=1e-9)
+    expiring.put("a", "cfg", {"humanscore": 0.1})
+    assert expiring.get("a", "cfg") == (None, "miss")
+    assert expiring.stats()["expirations"] == 1
+
+
+def test_result_cache_persistent_tier_promotes_hits():
+    """Persistent hits are served without recomputation and promoted to memory"""
+    stored = {("h", "cfg"): {"humanscore": 0.5}}
+    cache = ResultCache(persistent_lookup=lambda h, c: stored.get((h, c)))
+
+    def fail():
+        raise AssertionError("should not recompute")
+
+    assert cache.get_or_compute("h", "cfg", fail) == ({"humanscore": 0.5}, "persistent")
+    assert cache.get_or_compute("h", "cfg", fail) == ({"humanscore": 0.5}, "memory")
+    stats = cache.stats()
+    assert stats["persistent_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_result_cache_get_many_uses_one_bulk_lookup():
+    """Batch lookups resolve in-memory misses with a single bulk persistent lookup"""
+    stored = {"h1": {"humanscore": 0.1}, "h3": {"humanscore": 0.3}}
+    calls = []
+
+    def bulk_lookup(hashes, config_key):
+        calls.append(list(hashes))
+        return {h: stored[h] for h in hashes if h in stored}
+
+    cache = ResultCache(persistent_bulk_lookup=bulk_lookup)
+    cache.put("h2", "cfg", {"humanscore": 0.2})
+    entries = cache.get_many(["h1", "h2", "h3", "h4"], "cfg")
+    assert [source for _, source in entries] == ["persistent", "memory", "persistent", "miss"]
+    assert entries[2][0] == {"humanscore": 0.3}
+    assert calls == [["h1", "h3", "h4"]]
+    assert cache.get("h1", "cfg")[1] == "memory"
+    stats = cache.stats()
+    assert (stats["persistent_hits"], stats["memory_hits"], stats["misses"]) == (2, 2, 1)
+
+
+def test_config_key_tracks_weights():
+    """Changing marker weights changes the engine config key"""
+    engine = HumanScoreEngine()
+    key = engine.config_key
+    engine.weights["drift"] = 0.5
+    assert engine.config_key != key
+
+
+def test_analysis_context_artifacts_are_shared():
+    """Derived artifacts are computed once and match the naive computations"""
+    context = TextProcessor().process("Hello World. This has 2 DIGITS and Ünïcødé! Short")
+
+    assert isinstance(context, AnalysisContext)
+    assert context.sentences_lower is context.sentences_lower
+    assert context.sentences_lower == [s.lower() for s in context["sentences"]]
+    assert list(context.sentence_upper_counts) == [
+        sum(1 for c in s if c.isupper()) for s in context["sentences"]
+    ]
+    assert context.char_classes == {
+        "upper": sum(1 for c in context["cleaned"] if c.isupper()),
+        "digit": sum(1 for c in context["cleaned"] if c.isdigit()),
+        "space": context["cleaned"].count(" "),
+    }
+
+
+def test_pattern_scanner_matches_individual_regexes():
+    """One fused scan reports the same matches as running each pattern alone"""
+    groups = {
+        "anchored": [r"\b(is|are)\s+like\s+\w+", r"\b(wait|hold\s+on)", r"\b\w+\s+is\s+\w+"],
+        "unanchored": [r"(maybe|perhaps)", literal_pattern(["then", "the", "hen", "next"])],
+    }
+    scanner = PatternScanner(groups)
+    text = "wait, the sky is like a sea. hold on maybe thenext one is it. perhaps then"
+    matches = scanner.scan(text)
+
+    patterns = groups["anchored"] + groups["unanchored"]
+    for slot, pattern in enumerate(patterns):
+        assert matches[slot] == [m.span() for m in re.finditer(pattern, text)]
+
+    context = TextProcessor().process(text)
+    scan = context.scan(scanner)
+    assert context.scan(scanner) is scan
+    for i, sentence in enumerate(context.sentences_lower):
+        expected = [len(re.findall(p, sentence)) for p in groups["anchored"]]
+        assert scan.sentence_counts("anchored")[:, i].tolist() == expected
+    words = ["then", "the", "hen", "next", "absent"]
+    assert scan.found_literals("unanchored", words) == {w for w in words if w in text}
+
+
+def test_score_stream_matches_whole_document():
+    """Streaming a document in arbitrary chunks gives the same score as scoring it whole"""
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    text = " ".join(SAMPLE_TEXTS * 5) + " See http://example.com/a.b. Done!"
+
+    whole = engine.score(processor.process(text))
+    for size in (1, 7, 64):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        streamed = engine.score_stream(chunks)
+
+        assert streamed["humanscore"] == whole["humanscore"]
+        assert streamed["breakdown"] == whole["breakdown"]
+        for key in ("sentence_count", "token_count", "char_count"):
+            assert streamed["metadata"][key] == whole["metadata"][key]
+
+
+def test_score_windows_match_scoring_each_window():
+    """Incrementally computed window scores equal scoring each window's sentences alone"""
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    processed = processor.process(" ".join(SAMPLE_TEXTS * 4))
+
+    result = engine.score_windows(processed, window=4, stride=3)
+    assert result["windows"][-1]["end"] == processed["sentence_count"]
+    for window in result["windows"]:
+        sentences = processed["sentences"][window["start"]:window["end"]]
+        alone = engine.score(AnalysisContext(" ".join(sentences), sentences, []))
+        for marker in ("drift", "cadence", "hedging", "metaphor", "coherence"):
+            assert abs(window["breakdown"][marker] - alone["breakdown"][marker]) <= 1e-4
+
+
+def test_score_windows_without_sentences():
+    """Texts whose preprocessing keeps no sentences get empty windows and segments"""
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    for text in ("Hi. Ok. No. Yo. Ab.", "!!!!!!!!!!!!"):
+        result = engine.score_windows(processor.process(text), window=2, stride=1)
+        assert result["sentence_count"] == 0
+        assert result["windows"] == result["change_points"] == result["segments"] == []
+
+
+def test_pelt_finds_mean_shift():
+    """PELT locates a clear shift in the mean of a series"""
+    rng = np.random.default_rng(0)
+    series = np.concatenate([rng.normal(0, 1, (60, 2)), rng.normal(3, 1, (40, 2))])
+    assert pelt(series, min_size=5) == [60]
+    assert pelt(rng.normal(0, 1, (100, 2)), min_size=5) == []
+
+
+def test_scoring_executor_pool_matches_inline():
+    """Scores computed in worker processes equal inline scores; a full queue is rejected"""
+    executor = ScoringExecutor(max_workers=2, max_queue=4, inline_max_chars=0)
+    try:
+        pooled = asyncio.run(executor.score_texts(SAMPLE_TEXTS))
+        assert pooled == score_texts(SAMPLE_TEXTS)
+        assert executor.stats()["pooled"] == 2
+    finally:
+        executor.shutdown()
+
+    busy = ScoringExecutor(max_workers=1, max_queue=0, inline_max_chars=0)
+    with pytest.raises(ExecutorBusyError):
+        asyncio.run(busy.score_texts(SAMPLE_TEXTS[:1]))
+
+
+def test_hashing_embeddings_batched_and_deterministic():
+    """Batched embeddings come back in input order, unit-length and identical across encoders"""
+    sentences = ["A short one.", "A considerably longer sentence about rivers and maps.", "Maps of rivers!", ""]
+    batches = length_sorted_batches([len(s) for s in sentences], 2)
+    assert sorted(np.concatenate(batches).tolist()) == [0, 1, 2, 3]
+
+    encoder = FeatureEncoder(use_embeddings=True, backend=HashingEmbeddingBackend(dim=64, batch_size=2))
+    assert encoder.embedding_model is None  # Loaded lazily
+    batched = encoder.encode_sentences(sentences)
+    assert batched.shape == (4, 64)
+    assert np.allclose(batched, np.stack([encoder.encode_text(s) for s in sentences]))
+    assert np.allclose(np.linalg.norm(batched[:3], axis=1), 1.0)
+    assert np.array_equal(batched, HashingEmbeddingBackend(dim=64).encode(sentences))
+
+    documents = encoder.encode_documents([sentences[:1], [], sentences[1:]])
+    assert [len(d) for d in documents] == [1, 0, 3]
+
+
+def test_drift_with_embeddings_matches_single_documents():
+    """Embedding-based drift batches like the simple features and changes the config key"""
+    processor = TextProcessor()
+    processed = [processor.process(text) for text in SAMPLE_TEXTS]
+    analyzer = DriftAnalyzer(FeatureEncoder(use_embeddings=True, backend=HashingEmbeddingBackend()))
+
+    batch = analyzer.analyze_batch(processed)
+    assert batch == [analyzer.analyze_batch([p])[0] for p in processed]
+    assert len(batch[0]["drift_vectors"][0]) == 256
+
+    engine = HumanScoreEngine()
+    simple_key = engine.config_key
+    engine.drift_analyzer = analyzer
+    assert engine.config_key != simple_key
+
+
+def test_embedding_cache_shared_and_compacted(tmp_path):
+    """Cached embeddings equal fresh ones, are visible to other cache instances and survive compaction"""
+    model = HashingEmbeddingBackend(dim=32)
+    sentences = ["Kind regards,  the team.", "Kind regards, the team.", "A quoted line.", "Another sentence!"]
+    expected = model.encode(sentences)
+
+    writer = CachedEmbeddingBackend(HashingEmbeddingBackend(dim=32), str(tmp_path), max_entries=8)
+    assert np.allclose(writer.encode(sentences)[1:], expected[1:])
+    assert writer.stats()["entries"] == 3  # Whitespace variants share an entry
+
+    reader = EmbeddingCache(str(tmp_path), model.model_id, 32, max_entries=8)
+    vectors, missing = reader.get_many([sentence_key(s, model.model_id) for s in sentences])
+    assert missing == []
+    assert np.allclose(vectors[1:], expected[1:])
+
+    more = [f"Templated intro number {i}." for i in range(7)]
+    assert np.allclose(writer.encode(more), model.encode(more))
+    stats = writer.stats()
+    assert stats["compactions"] == 1
+    assert stats["entries"] <= 8
+
+    vectors, missing = reader.get_many([sentence_key(s, model.model_id) for s in more])
+    assert missing == []
+    assert np.allclose(vectors, model.encode(more))
+    assert reader.stats()["hit_rate"] == 1.0
+
+
+def test_long_range_similarity_blocks_match_full_matrix():
+    """Blocked long-range similarity equals the full similarity matrix, for any block size"""
+    vectors = np.random.default_rng(1).normal(size=(120, 6))
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    full = unit @ unit.T
+    rows, cols = np.tril_indices(120, -3)
+    for block_size in (1, 16, 512):
+        mean, pairs, best = long_range_similarity(vectors, 3, block_size)
+        assert pairs == len(rows)
+        assert np.isclose(mean, full[rows, cols].mean())
+        assert np.allclose(best[3:], [full[i, :i - 2].max() for i in range(3, 120)])
+        assert np.isnan(best[:3]).all()
+
+
+def test_drift_long_range_detects_topic_return():
+    """A text that returns to an earlier sentence's topic counts a topic return"""
+    processor = TextProcessor()
+    analyzer = DriftAnalyzer(FeatureEncoder(use_embeddings=True, backend=HashingEmbeddingBackend()), min_gap=2)
+    sentences = [
+        "The harbor cranes unload containers at dawn.",
+        "My grandmother grew tomatoes in clay pots.",
+        "Quantum computers use qubits for computation.",
+        "Violin strings are tuned in perfect fifths.",
+        "At dawn the harbor cranes unload the containers.",
+    ]
+    result = analyzer.analyze(processor.process(" ".join(sentences))["sentences"])
+    assert result["topic_returns"] == 1
+    assert 0 < result["return_rate"] <= 1
+    assert "long_range_similarity" in result
+
+
+def test_drift_long_range_full_detail_only_and_capped(monkeypatch):
+    """Long-range metrics are computed at full detail only, on a bounded sample of long documents"""
+    from engine.humanscore.scorer import trim_result
+    from engine.markers.drift import analyzer as drift_module
+
+    processor = TextProcessor()
+    engine = HumanScoreEngine()
+    processed = processor.process(" ".join(SAMPLE_TEXTS * 4))
+    full = engine.score(processed)
+    markers = engine.score(processed, detail="markers")
+    assert "long_range_similarity" in full["metadata"]["marker_details"]["drift"]
+    assert "long_range_similarity" not in markers["metadata"]["marker_details"]["drift"]
+    assert trim_result(full, "markers")["metadata"]["marker_details"] == markers["metadata"]["marker_details"]
+
+    calls = []
+    compare = drift_module.long_range_similarity
+    monkeypatch.setattr(drift_module, "long_range_similarity", lambda vectors, min_gap, block_size: (
+        calls.append((len(vectors), min_gap)) or compare(vectors, min_gap, block_size)
+    ))
+    capped = DriftAnalyzer(min_gap=3, long_range_max_sentences=4)
+    result = capped.analyze_batch([processed])[0]
+    assert processed["sentence_count"] > 4 and len(calls) == 1
+    assert calls[0][0] <= 4 and calls[0][1] == 1
+    assert 0 <= result["return_rate"] <= 1
+
+
+def test_minhash_estimates_similarity_and_shares_buckets():
+    """MinHash similarity tracks shingle overlap; near duplicates share LSH buckets, unrelated texts do not"""
+    processor = TextProcessor()
+    hasher = MinHasher()
+    base = " ".join(f"Sentence {i} talks about the weather in town." for i in range(40))
+    edited = base.replace("Sentence 7 ", "Sentence seven ")
+    other = " ".join(f"Paragraph {i} lists ingredients for bread." for i in range(40))
+    a, b, c = (hasher.signature(processor.tokenize(t)) for t in (base, edited, other))
+
+    assert a.shape == (128,) and a.dtype == np.uint32
+    similarity = signature_similarity(a, np.stack([a, b, c]))
+    assert similarity[0] == 1.0
+    assert similarity[1] > 0.8
+    assert similarity[2] < 0.2
+    assert set(hasher.buckets(a)) & set(hasher.buckets(b))
+    assert not set(hasher.buckets(a)) & set(hasher.buckets(c))
+
+
+def test_minhash_signature_blocks_match_full_matrix(monkeypatch):
+    """Signatures folded block by block equal the minimum over the full permuted-hash matrix"""
+    from engine.dedup import minhash
+
+    hasher = MinHasher()
+    tokens = TextProcessor().tokenize(" ".join(f"Block {i} of the signature test, word {i * 7}." for i in range(300)))
+    hashes = hasher.shingle_hashes(tokens)
+    expected = ((np.outer(hashes, hasher._a) + hasher._b) % minhash._PRIME & minhash._MAX_HASH).min(axis=0)
+
+    for block_rows in (1, 7, 64, 1 << 20):
+        monkeypatch.setattr(minhash, "SIGNATURE_BLOCK_ROWS", block_rows)
+        assert np.array_equal(hasher.signature(tokens), expected.astype(np.uint32))
+
+
+def test_fingerprint_index_brute_force_and_ivf(tmp_path):
+    """Brute-force and IVF search find the same nearest fingerprint; re-adding old ids is a no-op"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(8, 27)) * 5
+    vectors = (centers[rng.integers(0, 8, 2000)] + rng.normal(size=(2000, 27))).astype(np.float32)
+    ids = np.arange(1, 2001)
+
+    brute = FingerprintIndex(str(tmp_path))
+    brute.add(ids[:1000], vectors[:1000], 1000)
+    brute.add(ids[1000:], vectors[1000:], 2000)
+    brute.add(ids[:10], vectors[:10], 2000)
+    assert brute.stats()["rows"] == 2000
+
+    ivf = FingerprintIndex(str(tmp_path), ivf_lists=16, ivf_min_rows=500, nprobe=4)
+    for i in (3, 777, 1999):
+        exact = brute.search(vectors[i], 5)
+        approx = ivf.search(vectors[i], 5)
+        assert exact["method"] == "brute" and approx["method"] == "ivf"
+        assert exact["ids"][0] == approx["ids"][0] == i + 1
+        assert approx["scored"] < 2000
+        assert i + 1 not in brute.search(vectors[i], 5, exclude_ids=[i + 1])["ids"]
+
+
+def test_benchmark_suite_and_regression_check():
+    """Corpus is reproducible, every stage is timed and slowdowns beyond the tolerance are flagged"""
+    assert make_document(1000, seed=3) == make_document(1000, seed=3)
+    assert len(make_document(1000)) == 1000
+
+    corpus = {"tweet": make_corpus()["tweet"]}
+    results = run_suite(build_cases(corpus, ("preprocess", "markers", "engine")), repeats=1, min_sample_time=0)
+    assert set(results["cases"]) == {
+        "preprocess/tweet", "engine/tweet", "engine.light/tweet",
+        *(f"marker.{name}/tweet" for name in ("drift", "cadence", "hedging", "metaphor", "coherence", "stylometry"))
+    }
+    assert all(case["min_s"] > 0 for case in results["cases"].values())
+
+    slower = {"cases": {name: {**case, "min_s": case["min_s"] * 2} for name, case in results["cases"].items()}}
+    assert set(compare_results(slower, results, tolerance=0.25)["regressions"]) == set(results["cases"])
+    assert compare_results(slower, results, tolerance=1.5)["regressions"] == []
+    assert set(compare_results(results, slower, tolerance=0.25)["improvements"]) == set(results["cases"])
+
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    """Stages timed in a forked process are summed into the export; errors are counted"""
+    import multiprocessing
+    from engine.metrics import Metrics
+
+    metrics = Metrics(str(tmp_path))
+    metrics.observe("drift", 0.002)
+    with pytest.raises(ValueError):
+        with metrics.timed("fusion"):
+            raise ValueError("boom")
+
+    def child():
+        metrics.observe("drift", 3.0)
+        metrics.observe_input(5000, 40)
+        metrics.count("traceneuro_executor_rejected_total")
+
+    process = multiprocessing.get_context("fork").Process(target=child)
+    process.start()
+    process.join()
+
+    text = metrics.render([("traceneuro_test_gauge", "Test gauge", 2.5)])
+    assert 'traceneuro_stage_duration_seconds_count{stage="drift"} 2' in text
+    assert 'traceneuro_stage_duration_seconds_bucket{stage="drift",le="0.0025"} 1' in text
+    assert 'traceneuro_stage_duration_seconds_bucket{stage="drift",le="+Inf"} 2' in text
+    assert 'traceneuro_stage_errors_total{stage="fusion"} 1' in text
+    assert 'traceneuro_input_sentences_bucket{le="100"} 1' in text
+    assert "traceneuro_test_gauge 2.5" in text
+    metrics.count("traceneuro_executor_rejected_total", 2)
+    assert "traceneuro_executor_rejected_total 3" in metrics.render()
+
+    assert metrics.remove_stale() == 1
+    assert 'traceneuro_stage_duration_seconds_count{stage="drift"} 1' in metrics.render()
+
+
+def test_bulk_scorer_orders_and_resumes(tmp_path, monkeypatch, capsys):
+    """Bulk scoring matches in any order and with workers; a crashed run resumes to the same output"""
+    import json
+    from engine import bulk
+
+    corpus = tmp_path / "corpus.jsonl"
+    texts = [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} Document {i}." for i in range(12)]
+    corpus.write_text("".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in enumerate(texts)) + "{broken\n")
+
+    expected = tmp_path / "expected.jsonl"
+    assert bulk.main([str(corpus), "-o", str(expected), "--workers", "0", "--batch-size", "5"]) == 1
+    # Unreadable records count as errors, not as scored texts
+    summary = capsys.readouterr().err
+    assert summary.startswith("Scored 12 texts") and "1 errors" in summary
+    lines = expected.read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [str(i) for i in range(12)] + ["corpus.jsonl:13"]
+    assert "error" in json.loads(lines[-1])
+
+    pooled = tmp_path / "pooled.jsonl"
+    bulk.main([str(corpus), "-o", str(pooled), "--workers", "2", "--batch-size", "2", "--order", "completion", "--quiet"])
+    assert sorted(pooled.read_text().splitlines()) == sorted(lines)
+
+    # Crash after two batches; results written past the checkpoint are dropped on resume
+    output = tmp_path / "resumed.jsonl"
+    score_items = bulk.score_items
+    calls = []
+
+    def crashing(items, detail, markers=None):
+        calls.append(len(items))
+        if len(calls) > 2:
+            raise KeyboardInterrupt
+        return score_items(items, detail, markers)
+
+    monkeypatch.setattr(bulk, "score_items", crashing)
+    with pytest.raises(KeyboardInterrupt):
+        bulk.main([str(corpus), "-o", str(output), "--workers", "0", "--batch-size", "3", "--checkpoint-every", "3", "--quiet"])
+    with open(output, "a") as f:
+        f.write('{"id": "partial"')
+    monkeypatch.setattr(bulk, "score_items", score_items)
+    bulk.main([str(corpus), "-o", str(output), "--workers", "0", "--resume", "--quiet"])
+    assert output.read_text().splitlines() == lines